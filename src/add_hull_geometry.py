@@ -15,6 +15,7 @@
 import argparse
 
 import geopandas as gpd
+import pandas as pd
 
 import pathlib
 from pathlib import Path
@@ -23,6 +24,8 @@ import os
 
 import time
 import datetime
+
+from axis_hull_matcher import fn_match_axis_to_hull, INT_NO_HULL
 # ************************************************************
 
 # ----------------------------------------------------
@@ -68,13 +71,21 @@ def fn_add_hull_geometry(str_input_dir, int_class):
                 # reproject gdf_hulls_per_file to gdf_mjr_axis_ln crs
                 gdf_hulls_per_file_local_prj = gdf_hulls_per_file.to_crs(gdf_mjr_axis_ln.crs)
                 
-                for index, row in gdf_majr_axis_ln_filepath.iterrows():
-                    int_hull_index = int(row['hull_idx'])
-                    geom = gdf_hulls_per_file_local_prj.loc[int_hull_index]['geometry']
-                    str_hull_geom = str(geom.wkt)
-                    
-                    # append the hull_wkt
-                    gdf_mjr_axis_ln.at[index, 'hull_wkt'] = str_hull_geom
+                # 2023.03.08 - hull_idx from step 8; axes without a valid
+                # hull_idx are matched with the shared axis to hull matcher
+                if 'hull_idx' in gdf_majr_axis_ln_filepath.columns:
+                    ser_hull_idx = gdf_majr_axis_ln_filepath['hull_idx'].fillna(INT_NO_HULL).astype(int)
+                else:
+                    ser_hull_idx = pd.Series(INT_NO_HULL, index=gdf_majr_axis_ln_filepath.index)
+                
+                arr_not_matched = ~ser_hull_idx.isin(gdf_hulls_per_file_local_prj.index)
+                if arr_not_matched.any():
+                    ser_hull_idx.loc[arr_not_matched] = fn_match_axis_to_hull(gdf_majr_axis_ln_filepath.loc[arr_not_matched],
+                                                                              gdf_hulls_per_file_local_prj)
+                
+                # hull geometry as wkt for every axis at once
+                ser_hull_wkt = gdf_hulls_per_file_local_prj.geometry.to_wkt()
+                gdf_mjr_axis_ln.loc[ser_hull_idx.index, 'hull_wkt'] = ser_hull_idx.map(ser_hull_wkt).fillna('').values
             else:
                 print("  ERROR: Required File Not Found: " + str_filepath_hulls)
         
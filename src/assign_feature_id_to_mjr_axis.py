@@ -14,7 +14,6 @@ import argparse
 import geopandas as gpd
 import pandas as pd
 import os
-import xarray as xr
 from shapely.geometry import Point, mapping
 import uuid
 import numpy as np
@@ -23,6 +22,9 @@ import warnings
 
 import time
 import datetime
+
+from nwm_recurrence_flows import fn_get_recurrence_flows
+from nearest_feature import fn_nearest_feature, STR_DIST_FIELD, FLT_NEAREST_STREAM_SEARCH
 # ************************************************************
 
 
@@ -68,7 +70,9 @@ def fn_determine_feature_id(list_input_files):
     local_prj = str(gdf_mjr_axis_ln.crs)
     
     # assign a uuid to every major axis line
-    gdf_mjr_axis_ln['uuid'] = [str(uuid.uuid4()) for _ in range(len(gdf_mjr_axis_ln.index))]
+    # 2023.03.10 - kept when already assigned - key of the profile store
+    if 'uuid' not in gdf_mjr_axis_ln.columns:
+        gdf_mjr_axis_ln['uuid'] = [str(uuid.uuid4()) for _ in range(len(gdf_mjr_axis_ln.index))]
     
     # Union of aoi polygons - creates shapely polygon
     shp_aoi_union = gdf_aoi_ar_nwm_prj.geometry.unary_union
@@ -83,11 +87,12 @@ def fn_determine_feature_id(list_input_files):
     # rename ID to feature_id
     gdf_stream_nwm_prj = gdf_stream_nwm_prj.rename(columns={"ID": "feature_id"})
     
-    # Load the netCDF file to pandas dataframe - 15 seconds
+    # 2023.03.09 - only the recurrence flows of the streams in the aoi
+    # (lazy netCDF selection, or the sorted sidecar if it was built)
     print("+-----------------------------------------------------------------+")
-    print('Loading the National Water Model Recurrence Flows ~ 15 sec')
-    ds = xr.open_dataset(str_netcdf_path)
-    df_all_nwm_streams = ds.to_dataframe()
+    print('Loading the National Water Model Recurrence Flows for the AOI streams')
+    df_all_nwm_streams = fn_get_recurrence_flows(str_netcdf_path,
+                                                 gdf_stream_nwm_prj['feature_id'].values)
     print("+-----------------------------------------------------------------+")
     
     # left join the stream geodataframe with the recurrance dataFrame
@@ -216,22 +221,15 @@ def fn_determine_feature_id(list_input_files):
     
     
         # if no match found, search for the nearest stream and populate feature_id and search distance
-    
-        for index, row in gdf_find_nearest_stream.iterrows():
-            # get the the nearest stream in gdf_stream_in_aoi_prj
-            pd_dist_to_nearest_stream = gdf_stream_in_aoi_prj.distance(row['geometry']).sort_values()
-            
-            # distance to nearest stream
-            flt_nearest_stream_dist = pd_dist_to_nearest_stream.iloc[0]
-            
-            # index in gdf_stream_in_aoi_prj of nearest stream
-            int_nearest_stream_index = gdf_stream_in_aoi_prj.distance(row['geometry']).sort_values().index[0]
-            
-            # append gdf_mjr_axis_ln with the 'feature_id', 'order_' and 'dist_river' of the nearest stream line
-            
-            gdf_find_nearest_stream.at[index, 'feature_id'] = gdf_stream_in_aoi_prj.loc[int_nearest_stream_index]['feature_id']
-            gdf_find_nearest_stream.at[index, 'order_'] = gdf_stream_in_aoi_prj.loc[int_nearest_stream_index]['order_']
-            gdf_find_nearest_stream.at[index, 'dist_river'] = flt_nearest_stream_dist
+        # 2023.03.09 - all of the unmatched lines in one nearest query
+        df_nearest = fn_nearest_feature(gdf_find_nearest_stream,
+                                        gdf_stream_in_aoi_prj,
+                                        ['feature_id', 'order_'],
+                                        FLT_NEAREST_STREAM_SEARCH)
+        
+        gdf_find_nearest_stream['feature_id'] = df_nearest['feature_id'].values
+        gdf_find_nearest_stream['order_'] = df_nearest['order_'].values
+        gdf_find_nearest_stream['dist_river'] = df_nearest[STR_DIST_FIELD].values
             
         # combine the gdf_find_nearest_stream and gdf_crosses_stream
         gdf_mjr_axis_ln_attributed = pd.concat([gdf_find_nearest_stream, gdf_crosses_stream])
@@ -247,22 +245,14 @@ def fn_determine_feature_id(list_input_files):
         gdf_mjr_axis_ln_attributed['order_'] = '' 
         gdf_mjr_axis_ln_attributed['dist_river'] = ''
         
-        for index, row in gdf_mjr_axis_ln_attributed.iterrows():
-            # get the the nearest stream in gdf_stream_in_aoi_prj
-            pd_dist_to_nearest_stream = gdf_stream_in_aoi_prj.distance(row['geometry']).sort_values()
-            
-            # distance to nearest stream
-            flt_nearest_stream_dist = pd_dist_to_nearest_stream.iloc[0]
-            
-            # index in gdf_stream_in_aoi_prj of nearest stream
-            int_nearest_stream_index = gdf_stream_in_aoi_prj.distance(row['geometry']).sort_values().index[0]
-            
-            # append gdf_mjr_axis_ln with the 'feature_id', 'order_' and 'dist_river' of the nearest stream line
-            
-            gdf_mjr_axis_ln_attributed.at[index, 'feature_id'] = gdf_stream_in_aoi_prj.loc[int_nearest_stream_index]['feature_id']
-            gdf_mjr_axis_ln_attributed.at[index, 'order_'] = gdf_stream_in_aoi_prj.loc[int_nearest_stream_index]['order_']
-            gdf_mjr_axis_ln_attributed.at[index, 'dist_river'] = flt_nearest_stream_dist
-            
+        df_nearest = fn_nearest_feature(gdf_mjr_axis_ln_attributed,
+                                        gdf_stream_in_aoi_prj,
+                                        ['feature_id', 'order_'],
+                                        FLT_NEAREST_STREAM_SEARCH)
+        
+        gdf_mjr_axis_ln_attributed['feature_id'] = df_nearest['feature_id'].values
+        gdf_mjr_axis_ln_attributed['order_'] = df_nearest['order_'].values
+        gdf_mjr_axis_ln_attributed['dist_river'] = df_nearest[STR_DIST_FIELD].values
     
     
     gdf_mjr_axis_ln_attributed["feature_id"] = gdf_mjr_axis_ln_attributed["feature_id"].astype(int)
@@ -0,0 +1,71 @@
+# Match each major axis line to the bridge hull polygon it belongs to.  The
+# candidate hulls come from one spatial join (intersects); when an axis
+# crosses more than one hull, the hull holding the longest part of the
+# axis wins.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.08
+# Last revised - 2023.03.08
+#
+# tx-bridge - shared by the 8th processing scripts (attribute major axis,
+# add hull geometry)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import geopandas as gpd
+import pandas as pd
+# ************************************************************
+
+
+INT_NO_HULL = -99 # hull_idx of a major axis that touches no hull
+
+
+# ----------------------------------------------------------
+def fn_match_axis_to_hull(gdf_mjr_axis_ln, gdf_hull_ar):
+
+    """
+    Index of the hull that each major axis line overlaps the most
+
+    Args:
+        gdf_mjr_axis_ln: geodataframe of the major axis lines
+        gdf_hull_ar: geodataframe of the hull polygons - its index is the
+            hull_idx (row of the hull file)
+
+    Returns:
+        pandas series of hull_idx (int) on the index of gdf_mjr_axis_ln,
+        INT_NO_HULL where the axis intersects no hull
+    """
+
+    ser_hull_idx = pd.Series(INT_NO_HULL, index=gdf_mjr_axis_ln.index, dtype='int64')
+
+    if len(gdf_mjr_axis_ln) == 0 or len(gdf_hull_ar) == 0:
+        return ser_hull_idx
+
+    if gdf_hull_ar.crs != gdf_mjr_axis_ln.crs:
+        gdf_hull_ar = gdf_hull_ar.to_crs(gdf_mjr_axis_ln.crs)
+
+    # candidate pairs from the spatial index
+    gdf_pairs = gpd.sjoin(gdf_mjr_axis_ln[['geometry']],
+                          gdf_hull_ar[['geometry']],
+                          how='inner',
+                          predicate='intersects')
+
+    if len(gdf_pairs) == 0:
+        return ser_hull_idx
+
+    # length of the axis inside each candidate hull - the tiebreak
+    gs_axis = gpd.GeoSeries(gdf_pairs.geometry.values, crs=gdf_mjr_axis_ln.crs)
+    gs_hull = gpd.GeoSeries(gdf_hull_ar.geometry.loc[gdf_pairs['index_right']].values, crs=gdf_mjr_axis_ln.crs)
+
+    df_pairs = pd.DataFrame({'axis_idx': gdf_pairs.index.values,
+                             'hull_idx': gdf_pairs['index_right'].values.astype('int64'),
+                             'overlap': gs_axis.intersection(gs_hull).length.values})
+
+    # longest overlap, then the highest hull index on a tie
+    df_pairs = df_pairs.sort_values(['axis_idx', 'overlap', 'hull_idx'])
+    df_best = df_pairs.drop_duplicates('axis_idx', keep='last')
+
+    ser_hull_idx.loc[df_best['axis_idx'].values] = df_best['hull_idx'].values
+
+    return ser_hull_idx
+# ----------------------------------------------------------
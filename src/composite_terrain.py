@@ -8,9 +8,12 @@
 # deck data can be added into the watershed's bare earth terrain to create
 # a 'healed' terrain.
 #
+# The healed terrain can be written as a tiled geotiff, a cloud optimized
+# geotiff (with internal overviews) or a VRT that references the source dems.
+#
 # Created by: Andy Carter, PE
 # Created - 2022.07.18
-# Last revised - 2022.07.18
+# Last revised - 2023.03.11
 #
 # tx-bridge - tenth (10) processing script
 # Uses the 'pdal' conda environment
@@ -22,17 +25,26 @@ warnings.filterwarnings('ignore')
 
 import argparse
 
-import xarray
-from rioxarray.merge import merge_arrays
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.warp import reproject, transform_bounds, Resampling
+from rasterio.windows import from_bounds, Window
+from osgeo import gdal
+
+from misc.validate_cloud_optimized_geotiff import validate
 
 import os
 
-from tqdm import tqdm
 
 import time
 import datetime
+
+from progress import fn_progress
 # ************************************************************
 
+INT_BLOCK_SIZE = 512 # block size of the tiled composite (pixels)
+
 
 # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 def is_valid_file(parser, arg):
@@ -44,8 +56,190 @@ def is_valid_file(parser, arg):
         return open(arg, 'r')  # return an open file handle
 # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
+# ..........................................................
+def fn_burn_small_raster(str_small_raster_path, dst):
+    
+    """
+    Reproject a small raster into the window of the overall raster that
+    it covers and write the valid cells over the overall raster
+
+    Args:
+        str_small_raster_path: path to the small raster (bridge deck dem)
+        dst: rasterio dataset of the composite, opened in 'w+' mode
+
+    Returns:
+        nothing
+    """
+    
+    with rasterio.open(str_small_raster_path) as src_small:
+        # footprint of the small raster in the overall raster
+        tup_bounds = transform_bounds(src_small.crs, dst.crs, *src_small.bounds)
+        
+        window = from_bounds(*tup_bounds, transform=dst.transform)
+        window = window.round_offsets(op='floor').round_lengths(op='ceil')
+        
+        try:
+            window = window.intersection(Window(0, 0, dst.width, dst.height))
+        except rasterio.errors.WindowError:
+            # small raster is outside of the overall raster
+            return
+        
+        if window.width <= 0 or window.height <= 0:
+            return
+        
+        arr_base = dst.read(1, window=window)
+        
+        flt_nodata = dst.nodata if dst.nodata is not None else np.nan
+        arr_small = np.full(arr_base.shape, flt_nodata, dtype=arr_base.dtype)
+        
+        reproject(source=rasterio.band(src_small, 1),
+                  destination=arr_small,
+                  dst_transform=dst.window_transform(window),
+                  dst_crs=dst.crs,
+                  dst_nodata=flt_nodata,
+                  resampling=Resampling.nearest)
+        
+        if np.isnan(flt_nodata):
+            arr_valid = ~np.isnan(arr_small)
+        else:
+            arr_valid = (arr_small != flt_nodata) & ~np.isnan(arr_small)
+        
+        if arr_valid.any():
+            arr_base[arr_valid] = arr_small[arr_valid]
+            dst.write(arr_base, 1, window=window)
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_composite_windowed(str_input_path, list_files, str_out_dem):
+    
+    """
+    Composite the small rasters into a tiled copy of the overall raster
+
+    Args:
+        str_input_path: path to the overall raster (bare earth dem)
+        list_files: list of small raster paths (bridge deck dems)
+        str_out_dem: path of the tiled geotiff to write
+
+    Returns:
+        nothing
+    """
+    
+    # 2023.03.06 - windowed compositing: the base dem is copied block by
+    # block into a tiled output and each deck dem is reprojected only into
+    # the window of its own footprint.  Memory is set by the largest
+    # bridge, not the size of the aoi times the number of bridges.
+    with rasterio.open(str_input_path) as src_base:
+        dict_profile = src_base.profile.copy()
+        dict_profile.update(driver='GTiff',
+                            tiled=True,
+                            blockxsize=INT_BLOCK_SIZE,
+                            blockysize=INT_BLOCK_SIZE,
+                            compress='deflate',
+                            BIGTIFF='IF_SAFER')
+        
+        with rasterio.open(str_out_dem, 'w+', **dict_profile) as dst:
+            
+            # copy the base dem
+            for ji, window in dst.block_windows(1):
+                dst.write(src_base.read(window=window), window=window)
+            
+            # merge order matches the earlier merge_arrays: the first
+            # deck dem listed wins where decks overlap, so write in reverse
+            for str_current_small_raster in fn_progress(list_files[::-1], len(list_files), 'Composite'):
+                fn_burn_small_raster(str_current_small_raster, dst)
+# ----------------------------------------------------------
+
+
+# ----------------------------------------------------------
+def fn_composite_vrt(str_input_path, list_files, str_out_vrt):
+    
+    """
+    Build a GDAL VRT that layers the small rasters over the overall raster.
+    Each small raster is referenced through a warped VRT on the grid of the
+    overall raster, so no raster data is copied.
+
+    Args:
+        str_input_path: path to the overall raster (bare earth dem)
+        list_files: list of small raster paths (bridge deck dems)
+        str_out_vrt: path of the vrt to write
+
+    Returns:
+        nothing
+    """
+    
+    # folder for the warped deck vrts - next to the output vrt
+    str_warp_dir = os.path.join(os.path.dirname(str_out_vrt),
+                                os.path.splitext(os.path.basename(str_out_vrt))[0] + '_decks')
+    os.makedirs(str_warp_dir, exist_ok=True)
+    
+    with rasterio.open(str_input_path) as src_base:
+        str_base_crs = src_base.crs.to_wkt()
+        tup_bounds = tuple(src_base.bounds)
+        flt_res_x, flt_res_y = src_base.res
+    
+    list_vrt_sources = [os.path.abspath(str_input_path)]
+    
+    # later sources in a vrt are drawn on top - the first deck dem listed
+    # wins where decks overlap, as in the tiled composite
+    for str_current_small_raster in fn_progress(list_files[::-1], len(list_files), 'Composite VRT'):
+        str_warp_vrt = os.path.join(str_warp_dir,
+                                    os.path.splitext(os.path.basename(str_current_small_raster))[0] + '.vrt')
+        
+        gdal.Warp(str_warp_vrt,
+                  os.path.abspath(str_current_small_raster),
+                  format='VRT',
+                  dstSRS=str_base_crs,
+                  xRes=flt_res_x,
+                  yRes=flt_res_y,
+                  targetAlignedPixels=True,
+                  resampleAlg='near')
+        list_vrt_sources.append(str_warp_vrt)
+    
+    ds_vrt = gdal.BuildVRT(str_out_vrt,
+                           list_vrt_sources,
+                           resolution='user',
+                           xRes=flt_res_x,
+                           yRes=flt_res_y,
+                           outputBounds=tup_bounds)
+    ds_vrt = None
+# ----------------------------------------------------------
+
+
+# ..........................................................
+def fn_validate_cog(str_cog_path):
+    
+    """
+    Check the output with misc/validate_cloud_optimized_geotiff.py
+
+    Args:
+        str_cog_path: path to the cloud optimized geotiff
+
+    Returns:
+        True - raises ValueError if the file is not a valid cloud
+        optimized geotiff (the file is left in place for inspection)
+    """
+    
+    ds = gdal.Open(str_cog_path)
+    list_warnings, list_errors, dict_details = validate(ds, full_check=True)
+    ds = None
+    
+    for str_warning in list_warnings:
+        print('  COG warning: ' + str_warning)
+    for str_error in list_errors:
+        print('  COG error: ' + str_error)
+    
+    if len(list_errors) > 0:
+        print('  *** WARNING: ' + str_cog_path + ' is NOT a valid cloud optimized geotiff ***')
+        raise ValueError('COG validation failed (' + str(len(list_errors)) +
+                         ' errors): ' + str_cog_path)
+        
+    return True
+# ..........................................................
+
+
 # `````````````````````````````````````````````````````````````
-def fn_composite_terrain(str_input_path,str_small_dem_dir_path,str_output_dir,str_output_dem_name):
+def fn_composite_terrain(str_input_path,str_small_dem_dir_path,str_output_dir,str_output_dem_name,str_output_format='tif'):
 
     print(" ")
     print("+=================================================================+")
@@ -60,6 +254,7 @@ def fn_composite_terrain(str_input_path,str_small_dem_dir_path,str_output_dir,st
     print("  ---(d) INPUT SMALL RASTER DIRECTORY: " + str_small_dem_dir_path)
     print("  ---(o) OUTPUT DIRECTORY: " + str_output_dir)
     print("  ---[c]   Optional: OUTPUT DEM NAME: " + str_output_dem_name )
+    print("  ---[t]   Optional: OUTPUT FORMAT: " + str_output_format )
     print("===================================================================")
     
     # create the output directory if it does not exist
@@ -77,34 +272,6 @@ def fn_composite_terrain(str_input_path,str_small_dem_dir_path,str_output_dir,st
     
     if len(list_files) > 0:
         
-        # open the base dem
-        xds_base_to_match = xarray.open_rasterio(str_input_path)
-        list_xds_rasters = []
-        
-        # loop through all the rasters 
-        # TODO - 2022.07.18 - this throws an error on the first pass
-        # 'Warning 1: +init=epsg:XXXX syntax is deprecated.'
-    
-        for str_current_small_raster in tqdm(list_files, 
-                                             desc='Composite',
-                                             bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                             ncols=65):
-
-            # open the smaller raster to allign
-            xds = xarray.open_rasterio(str_current_small_raster)
-
-            # reproject and resample the smaller raster to the larger reference
-            xds_repr_match = xds.rio.reproject_match(xds_base_to_match)
- 
-            list_xds_rasters.append(xds_repr_match)
- 
-        list_xds_rasters.append(xds_base_to_match)
-
-        print('Merging all rasters...')
-        
-        #merge the xarray raster
-        xds_merge = merge_arrays(list_xds_rasters)
-        
         # write out the raster
         if str_output_dem_name == '':
             # get the filename from input path
@@ -112,15 +279,44 @@ def fn_composite_terrain(str_input_path,str_small_dem_dir_path,str_output_dir,st
             str_filename_from_path = tail
             
             # split the filename
-            f_name, f_ext = os.path.splitext(str_filename_from_path)
-            str_filename = f_name + '_healed' + f_ext
+            f_name = os.path.splitext(str_filename_from_path)[0] + '_healed'
         else:
-            str_filename = str_output_dem_name + '.tif'
-        str_out_dem = os.path.join(str_output_dir, str_filename )
+            f_name = str_output_dem_name
         
-        xds_merge.rio.to_raster(str_out_dem)
+        if str_output_format == 'vrt':
+            # deck dems layered over the bare earth - no raster data is copied
+            str_out_dem = os.path.join(str_output_dir, f_name + '.vrt')
+            fn_composite_vrt(str_input_path, list_files, str_out_dem)
+            
+        elif str_output_format == 'cog':
+            # composite to a temporary tiled geotiff, then copy to a
+            # cloud optimized geotiff with internal overviews
+            str_out_dem = os.path.join(str_output_dir, f_name + '.tif')
+            str_temp_dem = os.path.join(str_output_dir, f_name + '_temp.tif')
+            
+            fn_composite_windowed(str_input_path, list_files, str_temp_dem)
+            
+            print('Writing cloud optimized geotiff...')
+            rasterio.shutil.copy(str_temp_dem,
+                                 str_out_dem,
+                                 driver='COG',
+                                 compress='deflate',
+                                 predictor='YES',
+                                 blocksize=INT_BLOCK_SIZE,
+                                 overview_resampling='average',
+                                 bigtiff='IF_SAFER')
+            os.remove(str_temp_dem)
+            
+            fn_validate_cog(str_out_dem)
+        else:
+            str_out_dem = os.path.join(str_output_dir, f_name + '.tif')
+            fn_composite_windowed(str_input_path, list_files, str_out_dem)
+                    
+        print('Composite DEM: ' + str_out_dem)
+        return str_out_dem
     else:
         print('No tifs found for compositing.')
+        return None
  
 # `````````````````````````````````````````````````````````````
 
@@ -161,18 +357,29 @@ if __name__ == '__main__':
                         metavar='STRING',
                         type=str)   
     
+    parser.add_argument('-t',
+                        dest = "str_output_format",
+                        help='OPTIONAL: output format - tif (tiled geotiff), cog (cloud optimized geotiff with overviews) or vrt: Default=tif',
+                        required=False,
+                        default='tif',
+                        choices=['tif', 'cog', 'vrt'],
+                        metavar='STRING',
+                        type=str)
+    
     args = vars(parser.parse_args())
     
     str_input_path = args['str_input_path']
     str_small_dem_dir_path = args['str_small_dem_dir_path']
     str_output_dir = args['str_output_dir']
     str_output_dem_name = args['str_output_dem_name']
+    str_output_format = args['str_output_format']
 
 
     fn_composite_terrain(str_input_path,
                          str_small_dem_dir_path,
                          str_output_dir,
-                         str_output_dem_name)
+                         str_output_dem_name,
+                         str_output_format)
 
     flt_end_run = time.time()
     flt_time_pass = (flt_end_run - flt_start_run) // 1
@@ -3,7 +3,7 @@
 #
 # Created by: Andy Carter, PE
 # Created - 2022.11.09
-# Last revised - 2022.11.09
+# Last revised - 2023.03.10
 #
 # tx-bridge - sub-process of the 8th processing script
 # Uses the 'pdal' conda environment
@@ -16,14 +16,15 @@ import argparse
 import geopandas as gpd
 import pandas as pd
 import numpy as np
-import ast # converting sting of list to list
 
 import os
 
-import difflib # compare two string and score
-
 import time
 import datetime
+
+from nearest_feature import fn_nearest_feature, STR_DIST_FIELD
+from nbi_store import fn_read_nbi_in_aoi
+from name_match import fn_name_similarity
 # ************************************************************
 
 
@@ -44,177 +45,144 @@ def fn_filelist(source, tpl_extenstion):
 # ````````````````````````````````````````
 
 
-# ----------------------------------------------  
-# Print iterations progress
-def fn_print_progress_bar (iteration,
-                           total,
-                           prefix = '', suffix = '',
-                           decimals = 0,
-                           length = 100, fill = '█',
-                           printEnd = "\r"):
-    """
-    from: https://stackoverflow.com/questions/3173320/text-progress-bar-in-the-console
-    Call in a loop to create terminal progress bar
-    Keyword arguments:
-        iteration   - Required  : current iteration (Int)
-        total       - Required  : total iterations (Int)
-        prefix      - Optional  : prefix string (Str)
-        suffix      - Optional  : suffix string (Str)
-        decimals    - Optional  : positive number of decimals in percent complete (Int)
-        length      - Optional  : character length of bar (Int)
-        fill        - Optional  : bar fill character (Str)
-        printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
-    """
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filledLength = int(length * iteration // total)
-    bar = fill * filledLength + '-' * (length - filledLength)
-    print(f'\r{prefix} |{bar}| {percent}% {suffix}', end = printEnd)
-    # Print New Line on Complete
-    if iteration == total: 
-        print()
-# ----------------------------------------------  
-
-
 # ==============================================
-def fn_percent_difference(flt_input_1, flt_input_2):
-    # note: both values must be greater than zero
-    if flt_input_1 <= 0 or flt_input_2 <= 0:
-        return(-1)
-    else:
-        flt_numerator = abs(flt_input_1 - flt_input_2)
-        flt_denominator = (flt_input_1 + flt_input_2) / 2
-        flt_decimal_difference = flt_numerator / flt_denominator
-        flt_perct_difference = flt_decimal_difference * 100
-        return(flt_perct_difference)
+def fn_percent_difference(arr_input_1, arr_input_2):
+    # note: both values must be greater than zero (-1 where they are not)
+    arr_input_1 = np.asarray(arr_input_1, dtype=np.float64)
+    arr_input_2 = np.asarray(arr_input_2, dtype=np.float64)
+    
+    arr_valid = (arr_input_1 > 0) & (arr_input_2 > 0)
+    
+    arr_perct_difference = np.full(arr_input_1.shape, -1.0)
+    arr_numerator = np.abs(arr_input_1 - arr_input_2)
+    arr_denominator = (arr_input_1 + arr_input_2) / 2
+    arr_perct_difference[arr_valid] = arr_numerator[arr_valid] / arr_denominator[arr_valid] * 100
+    
+    return(arr_perct_difference)
 # ==============================================
     
 
 # ----------------------------------------------
-def fn_dec_similar(flt_perct_difference):
-    if flt_perct_difference < 100 and flt_perct_difference > 0:
-        flt_dec_similar = 1 - (flt_perct_difference / 100)
-        return(flt_dec_similar)
-    else:
-        # percent differnce is either greater than 1 OR percent difference has an error
-        return(0)
+def fn_dec_similar(arr_perct_difference):
+    # percent differnce is either greater than 1 OR percent difference has an error = 0
+    arr_perct_difference = np.asarray(arr_perct_difference, dtype=np.float64)
+    
+    arr_dec_similar = np.where((arr_perct_difference < 100) & (arr_perct_difference > 0),
+                               1 - (arr_perct_difference / 100),
+                               0.0)
+    return(arr_dec_similar)
 # ----------------------------------------------
 
 
-# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def fn_calc_match_score(gdf_mjr_axis_with_current_nbi, gdf_current_nbi, flt_nearest_snap_dist):
+# ..............................................
+def fn_name_match_score(ser_name, ser_nbi_name):
+    # similarity of each (normalized) name pair - 0 where the name is missing
+    # returns numpy array of scores and numpy array of bool (name is valid)
+    
+    arr_valid = ser_name.apply(lambda x: isinstance(x, str)).values
+    arr_score = np.zeros(len(ser_name))
+    
+    if arr_valid.any():
+        arr_score[arr_valid] = fn_name_similarity(ser_name.values[arr_valid],
+                                                  ser_nbi_name.fillna('').values[arr_valid])
+        
+    return(arr_score, arr_valid)
+# ..............................................
 
-    # get pairing information for the current nbi point
 
-    # a matching nbi per 'Assest Name' was found
-    str_nbi_roadname = gdf_current_nbi.iloc[0]['Facility_C'].lower()
-    str_nbi_crossing = gdf_current_nbi.iloc[0]['Feature_In'].lower()
-    flt_nbi_span_length = gdf_current_nbi.iloc[0]['Structur_1']
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_calc_match_score(gdf_mjr_has_nbi, gdf_nbi_pnts, flt_nearest_snap_dist):
     
-    flt_max_score = 0.0
-
-    # get a list of gdf_current_duplicate indecies
-    list_nbi = gdf_mjr_axis_with_current_nbi.index.values.tolist()
+    """
+    Conflation score of every major axis line to its nearest nbi point
     
-    for index, row in gdf_mjr_axis_with_current_nbi.iterrows():
-        # loop through the geodataframe of major axis lines
-        
-        # ------------
-        flt_dist_from_nbi = row['nbi_dist']
-        # determine a weighted value from 0 to 1 where 1 = "on the line"
-        # and 0 = 'flt_nearest_snap_dist' from line (max allowed sanp distance)
-        flt_dist_score = (-1 * flt_dist_from_nbi / flt_nearest_snap_dist) + 1
-        
-        # -------------
-        flt_hull_len = row['hull_len']
-        # determine the percent similar span length (ranking from 0 to 1)
-        flt_similarity_len = fn_dec_similar(fn_percent_difference(flt_hull_len, flt_nbi_span_length))
-        
-        # -------------
-        # match Open Street Map name/ref to the NBI Name
-        b_valid_road_name = False
-        
-        if row['name'] != None:
-            str_name = row['name'].lower()
-            seq=difflib.SequenceMatcher(a=str_name, b=str_nbi_roadname)
-            flt_name_match_score = seq.ratio()
-            b_valid_road_name = True
-        else:
-            flt_name_match_score = 0
-        
-        if row['ref'] != None:
-            str_ref = row['ref'].lower()
-            seq=difflib.SequenceMatcher(a=str_ref, b=str_nbi_roadname)
-            flt_ref_match_score = seq.ratio()
-            b_valid_road_name = True
-        else:
-            flt_ref_match_score = 0
-            
-        flt_highest_road_name_match = max(flt_name_match_score, flt_ref_match_score)
-        # -------------
-        
-        # ------------
-        # determine if the "flt_nhd_name_match_score" should be given weight in 'score'
-        b_valid_stream = False
-        if row['dist_river'] <= flt_nearest_snap_dist:
-            # stream is within the "flt_nearest_snap_dist"
-            b_valid_stream = True
-        
-        if row['nhd_name'] == '99-No NHD Streams':
-            b_valid_stream = False
-        
-        # score of name of the stream (nhd vs nbi_crossing) that bridge is crossing
-        if row['nhd_name'] != None:
-            str_nhd_name = row['nhd_name'].lower()
-            seq=difflib.SequenceMatcher(a=str_nhd_name, b=str_nbi_crossing)
-            flt_nhd_name_match_score = seq.ratio()
-        else:
-            b_valid_stream = False
-            str_nhd_name = ''
-            flt_nhd_name_match_score = 0
-        # ------------
-        
-        
-        # ------------
-        # weighting of paramters for scoring
-        flt_dist_weight = 1.0 # weight of the distance between nbi and mjr_axis
-        flt_len_weight = 2.0  # weight of the difference between nbi span and 'hull_len'
-        flt_road_name_weight = 0.2 # weight string matching (nbi road and OpenStreetMap)
-        flt_stream_name_weight = 0.2 # weight string matching (nbi road and nhd)
+    Args:
+        gdf_mjr_has_nbi: major axis lines with an 'nbi_asset' and 'nbi_dist'
+        gdf_nbi_pnts: nbi points (the first point of an 'Asset_Name' is used)
+        flt_nearest_snap_dist: maximum snap distance (score of 0)
         
-        flt_total_weight = flt_dist_weight + flt_len_weight
-        flt_aggregate_score = (flt_dist_score * flt_dist_weight) + (flt_similarity_len * flt_len_weight)
-        
-        if b_valid_road_name:
-            flt_total_weight += flt_road_name_weight
-            flt_aggregate_score += (flt_highest_road_name_match * flt_road_name_weight)
-        
-        if b_valid_stream:
-            flt_total_weight += flt_stream_name_weight
-            flt_aggregate_score += (flt_nhd_name_match_score * flt_stream_name_weight)
-        
-        flt_match_score =  flt_aggregate_score / flt_total_weight
-        
-        if flt_match_score >= flt_max_score:
-            flt_max_score = flt_match_score
-            int_best_index = index
-            dict_best_match = {'best_index': int_best_index,
-                               'max_score': flt_max_score,
-                              'dist_score': flt_dist_score,
-                              'similar_len_score': flt_similarity_len,
-                              'road_match_score': flt_highest_road_name_match,
-                              'stream_score': flt_nhd_name_match_score,
-                              'list_nbi_remove': []}
-            
-    # remove the int_best_index from the list_nbi
-    list_nbi.remove(int_best_index)
-    
-    # update the list in the dictionary
-    dict_best_match.update({'list_nbi_remove': list_nbi})
-    
-    return(dict_best_match)
+    Returns:
+        pandas dataframe on the index of gdf_mjr_has_nbi with 'nbi_asset',
+        'score', 'score_dist', 'score_span', 'score_road' and 'score_strm'
+    """
+    
+    # get pairing information for each line's nbi point
+    df_nbi = gdf_nbi_pnts.drop_duplicates('Asset_Name', keep='first').set_index('Asset_Name')
+    ser_asset = gdf_mjr_has_nbi['nbi_asset']
+    
+    ser_nbi_roadname = ser_asset.map(df_nbi['Facility_C'])
+    ser_nbi_crossing = ser_asset.map(df_nbi['Feature_In'])
+    arr_nbi_span_length = ser_asset.map(df_nbi['Structur_1']).values
+    
+    # ------------
+    # determine a weighted value from 0 to 1 where 1 = "on the line"
+    # and 0 = 'flt_nearest_snap_dist' from line (max allowed sanp distance)
+    arr_dist_from_nbi = gdf_mjr_has_nbi['nbi_dist'].values.astype(np.float64)
+    arr_dist_score = (-1 * arr_dist_from_nbi / flt_nearest_snap_dist) + 1
+    
+    # -------------
+    # determine the percent similar span length (ranking from 0 to 1)
+    arr_similarity_len = fn_dec_similar(fn_percent_difference(gdf_mjr_has_nbi['hull_len'].values,
+                                                              arr_nbi_span_length))
+    
+    # -------------
+    # match Open Street Map name/ref to the NBI Name
+    arr_name_match_score, arr_valid_name = fn_name_match_score(gdf_mjr_has_nbi['name'], ser_nbi_roadname)
+    arr_ref_match_score, arr_valid_ref = fn_name_match_score(gdf_mjr_has_nbi['ref'], ser_nbi_roadname)
+    
+    arr_valid_road_name = arr_valid_name | arr_valid_ref
+    arr_highest_road_name_match = np.maximum(arr_name_match_score, arr_ref_match_score)
+    
+    # ------------
+    # score of name of the stream (nhd vs nbi_crossing) that bridge is crossing
+    arr_nhd_name_match_score, arr_valid_nhd_name = fn_name_match_score(gdf_mjr_has_nbi['nhd_name'], ser_nbi_crossing)
+    
+    # the stream name is given weight when the stream is within the "flt_nearest_snap_dist"
+    arr_valid_stream = ((gdf_mjr_has_nbi['dist_river'].values.astype(np.float64) <= flt_nearest_snap_dist) &
+                        (gdf_mjr_has_nbi['nhd_name'].values != '99-No NHD Streams') &
+                        arr_valid_nhd_name)
+    
+    # ------------
+    # weighting of paramters for scoring
+    flt_dist_weight = 1.0 # weight of the distance between nbi and mjr_axis
+    flt_len_weight = 2.0  # weight of the difference between nbi span and 'hull_len'
+    flt_road_name_weight = 0.2 # weight string matching (nbi road and OpenStreetMap)
+    flt_stream_name_weight = 0.2 # weight string matching (nbi road and nhd)
+    
+    arr_total_weight = (flt_dist_weight + flt_len_weight +
+                        arr_valid_road_name * flt_road_name_weight +
+                        arr_valid_stream * flt_stream_name_weight)
+    
+    arr_aggregate_score = ((arr_dist_score * flt_dist_weight) +
+                           (arr_similarity_len * flt_len_weight) +
+                           np.where(arr_valid_road_name, arr_highest_road_name_match * flt_road_name_weight, 0.0) +
+                           np.where(arr_valid_stream, arr_nhd_name_match_score * flt_stream_name_weight, 0.0))
+    
+    df_scores = pd.DataFrame({'nbi_asset': ser_asset.values,
+                              'score': arr_aggregate_score / arr_total_weight,
+                              'score_dist': arr_dist_score,
+                              'score_span': arr_similarity_len,
+                              'score_road': arr_highest_road_name_match,
+                              'score_strm': arr_nhd_name_match_score},
+                             index=gdf_mjr_has_nbi.index)
+    
+    return(df_scores)
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 
+# ..............................................
+def fn_best_line_per_asset(df_scores):
+    # there may be duplicate nbi_asset - the 'most likely' match is the
+    # highest score (last line on a tie)
+    # returns the rows of df_scores that are conflated (one per nbi_asset)
+    
+    df_order = df_scores.assign(int_order=np.arange(len(df_scores)))
+    df_best = df_order.sort_values(['score', 'int_order']).drop_duplicates('nbi_asset', keep='last')
+    
+    return(df_best.drop(columns='int_order'))
+# ..............................................
+
+
 # -----------------------------------------
 def fn_determine_nbi(list_input_files):
     
@@ -227,24 +195,16 @@ def fn_determine_nbi(list_input_files):
     str_input_dir = list_input_files[3]
     
     print("+-----------------------------------------------------------------+")
-    print('Loading the National Bridge Inventroy Data ~ 15 sec')
+    print('Loading the National Bridge Inventroy Data in area of interest...')
     # read the input shapefiles
     gdf_major_axis_ln = gpd.read_file(str_mjr_axis_ln_shp)
     gdf_aoi_ar = gpd.read_file(str_aoi_ar_shp)
-    gdf_nbi_pnt = gpd.read_file(str_texas_nbi_shp)
-    
-    # convert area-of-interest and nbi points to gdf_major_axis_ln projection
-    gdf_aoi_ar_local_prj = gdf_aoi_ar.to_crs(gdf_major_axis_ln.crs)
-    gdf_nbi_pnt_local_prj = gdf_nbi_pnt.to_crs(gdf_major_axis_ln.crs)
-    
-    print("+-----------------------------------------------------------------+")
-    print('Clipping NBI to area of interest...')
-    
-    # clip the nbi points to the area-of-interest
-    gdf_nbi_pnts_in_aoi_local_prj = gpd.clip(
-        gdf_nbi_pnt_local_prj,  gdf_aoi_ar_local_prj, keep_geom_type=True)
-    
     
+    # 2023.03.10 - nbi points in the area-of-interest, in the gdf_major_axis_ln
+    # projection - from the indexed nbi store (nbi_store.py) when there is one
+    gdf_nbi_pnts_in_aoi_local_prj = fn_read_nbi_in_aoi(str_texas_nbi_shp,
+                                                       gdf_aoi_ar,
+                                                       gdf_major_axis_ln.crs)
     
     # save a copy of the nbi points within the area of interest
     str_path_xs_folder = os.path.join(str_input_dir, '08_cross_sections')
@@ -254,76 +214,52 @@ def fn_determine_nbi(list_input_files):
     gdf_nbi_pnts_in_aoi_local_prj.to_file(str_major_axis_xs_file, driver='GPKG')
     
     gdf_major_axis_ln_nearest_nbi = gdf_major_axis_ln.copy()
-
-    # add the nbi fields
-    gdf_major_axis_ln_nearest_nbi['nbi_asset'] = ''
-    gdf_major_axis_ln_nearest_nbi['nbi_thick'] = ''
-    gdf_major_axis_ln_nearest_nbi['nbi_dist'] = ''
     
     print("+-----------------------------------------------------------------+")
-    int_count = 0
-    l = len(gdf_major_axis_ln)
-    str_prefix = "Find NBI " + str(int_count) + ' of ' + str(l)
-    fn_print_progress_bar(0, l, prefix = str_prefix , suffix = 'Complete', length = 29)
+    print('Find NBI of ' + str(len(gdf_major_axis_ln)) + ' major axis lines...')
     
-    for index, row in gdf_major_axis_ln.iterrows():
-        
-        time.sleep(0.05)
-        int_count += 1
-        str_prefix = "Find NBI " + str(int_count) + ' of ' + str(l)
-        fn_print_progress_bar(int_count, l, prefix = str_prefix , suffix = 'Complete', length = 29)
-        
-        # get the the nearest point in gdf_nbi_pnt
-        pd_dist_to_nearest_nbi = gdf_nbi_pnts_in_aoi_local_prj.distance(row['geometry']).sort_values()
-        
-        # distance to nearest nbi
-        flt_nearest_nbi_dist = pd_dist_to_nearest_nbi.iloc[0]
-        
-        # index in gdf_nbi_pnts_in_aoi_local_prj of nearest nbi
-        int_nearest_nbi_index = gdf_nbi_pnts_in_aoi_local_prj.distance(row['geometry']).sort_values().index[0]
-        
-        if flt_nearest_nbi_dist < flt_nearest_snap_dist:
-            # nbi point is within the provided search radius
-            # append the gdf_major_axis_ln
-            gdf_major_axis_ln_nearest_nbi.at[index, 'nbi_asset'] = gdf_nbi_pnts_in_aoi_local_prj.loc[int_nearest_nbi_index]['Asset_Name']
-            gdf_major_axis_ln_nearest_nbi.at[index, 'nbi_thick'] = gdf_nbi_pnts_in_aoi_local_prj.loc[int_nearest_nbi_index]['Bridge_Thi']
-            gdf_major_axis_ln_nearest_nbi.at[index, 'nbi_dist'] = round(flt_nearest_nbi_dist, 2)
+    # 2023.03.10 - nearest nbi point of all the lines in one query
+    df_nearest = fn_nearest_feature(gdf_major_axis_ln,
+                                    gdf_nbi_pnts_in_aoi_local_prj,
+                                    ['Asset_Name', 'Bridge_Thi'],
+                                    flt_nearest_snap_dist,
+                                    b_search_beyond=False)
+    
+    # nbi point is within the provided search radius
+    arr_dist = df_nearest[STR_DIST_FIELD].values.astype(np.float64)
+    arr_snap = arr_dist < flt_nearest_snap_dist
+    
+    # add the nbi fields ('' where no nbi is within the search radius)
+    arr_nbi_asset = np.full(len(df_nearest), '', dtype=object)
+    arr_nbi_thick = np.full(len(df_nearest), '', dtype=object)
+    arr_nbi_dist = np.full(len(df_nearest), '', dtype=object)
+    
+    arr_nbi_asset[arr_snap] = df_nearest['Asset_Name'].values[arr_snap]
+    arr_nbi_thick[arr_snap] = df_nearest['Bridge_Thi'].values[arr_snap]
+    arr_nbi_dist[arr_snap] = np.round(arr_dist[arr_snap], 2)
+    
+    gdf_major_axis_ln_nearest_nbi['nbi_asset'] = arr_nbi_asset
+    gdf_major_axis_ln_nearest_nbi['nbi_thick'] = arr_nbi_thick
+    gdf_major_axis_ln_nearest_nbi['nbi_dist'] = arr_nbi_dist
     
     # -----determine conflation score (likehood of correct match)-----
     gdf_mjr = gdf_major_axis_ln_nearest_nbi.copy()
-    gdf_mjr[['score', 'score_dist', 'score_span', 'score_road', 'score_strm']] = 0.0
+    list_score_fields = ['score', 'score_dist', 'score_span', 'score_road', 'score_strm']
+    gdf_mjr[list_score_fields] = 0.0
     
     # select only records with an 'nbi_asset' value
     gdf_mjr_has_nbi = gdf_mjr[gdf_mjr['nbi_asset'] != ''].copy()
     
-    # get a list of the unique nbi_assest - there may be duplicates
-    arr_nbi_unique = gdf_mjr_has_nbi.nbi_asset.unique()
-    
-    for str_current_nbi in arr_nbi_unique:
-        
-        # get a geodataframe major_axis lines with the 'str_current_nbi'
-        gdf_mjr_axis_with_current_nbi = gdf_mjr_has_nbi.loc[gdf_mjr_has_nbi['nbi_asset'] == str_current_nbi]
-        
-        # get a geodataframe of nbi with the 'Asset_Name' = str_current_nbi
-        gdf_current_nbi = gdf_nbi_pnts_in_aoi_local_prj.loc[gdf_nbi_pnts_in_aoi_local_prj['Asset_Name'] == str_current_nbi] 
+    if len(gdf_mjr_has_nbi) > 0:
+        df_scores = fn_calc_match_score(gdf_mjr_has_nbi, gdf_nbi_pnts_in_aoi_local_prj, flt_nearest_snap_dist)
         
-        # get a dictionary of the 'most likely' nbi match
-        dict_best_match = fn_calc_match_score(gdf_mjr_axis_with_current_nbi, gdf_current_nbi, flt_nearest_snap_dist)
+        df_best = fn_best_line_per_asset(df_scores)
         
-        int_index_to_append = dict_best_match['best_index']
-        gdf_mjr.at[int_index_to_append, 'score'] = round(dict_best_match['max_score'],3)
-        gdf_mjr.at[int_index_to_append, 'score_dist'] = round(dict_best_match['dist_score'],3)
-        gdf_mjr.at[int_index_to_append, 'score_span'] = round(dict_best_match['similar_len_score'],3)
-        gdf_mjr.at[int_index_to_append, 'score_road'] = round(dict_best_match['road_match_score'],3)
-        gdf_mjr.at[int_index_to_append, 'score_strm'] = round(dict_best_match['stream_score'],3)
+        gdf_mjr.loc[df_best.index, list_score_fields] = df_best[list_score_fields].round(3).values
         
-        if len(dict_best_match['list_nbi_remove']) > 0:
-            list_to_remove = dict_best_match['list_nbi_remove']
-            
-            for index_to_revise in list_to_remove:
-                gdf_mjr.at[index_to_revise, 'nbi_asset'] = ''
-                gdf_mjr.at[index_to_revise, 'nbi_thick'] = ''
-                gdf_mjr.at[index_to_revise, 'nbi_dist'] = ''
+        # the other lines with the same nbi_asset are not conflated
+        arr_nbi_remove = df_scores.index[~df_scores.index.isin(df_best.index)]
+        gdf_mjr.loc[arr_nbi_remove, ['nbi_asset', 'nbi_thick', 'nbi_dist']] = ''
     
     return(gdf_mjr)
     
@@ -396,7 +332,7 @@ if __name__ == '__main__':
     # TODO - Note the hard coded path to the file path for Tim's bridge shapefile (NBI) - 2022.11.09
     parser.add_argument('-n',
                         dest = "str_texas_nbi_filepath",
-                        help=r'OPTIONAL: directory to national water model input datasets: Example: G:\X-NBI\nbi_bridges_texas_4326.shp',
+                        help=r'OPTIONAL: path to texas nbi shapefile or nbi store (nbi_store.py): Example: G:\X-NBI\nbi_bridges_texas_4326.shp',
                         required=False,
                         default=r'G:\X-NBI\nbi_bridges_texas_4326.shp',
                         metavar='PATH',
@@ -3,7 +3,7 @@
 #
 # Created by: Andy Carter, PE
 # Created - 2022.05.16
-# Last revised - 2022.05.16
+# Last revised - 2023.03.11
 #
 # tx-bridge - fourth processing script
 # Uses the 'pdal' conda environment
@@ -16,10 +16,16 @@ import json
 import pdal
 import rioxarray as rxr
 import os
-import tqdm
+import multiprocessing as mp
+import numpy as np
+from shapely.ops import unary_union
 
 import time
 import datetime
+
+from hull_tile_table import fn_read_hull_tile_table, fn_group_hulls_by_tiles
+from progress import fn_progress, fn_progress_queue, fn_close_progress_queue
+from progress import fn_report_progress, fn_progress_from_queue
 # ************************************************************
 
 
@@ -63,8 +69,266 @@ def fn_delete_files(str_output_dir):
             os.remove(str_file_path)
 # -------------------------------------------
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_build_read_pipeline(list_clouds, str_crop_wkt):
+    
+    """
+    Build a pdal pipeline that reads the las tiles and crops the points to
+    the buffered hull(s) so only points near the bridges are kept
+
+    Args:
+        list_clouds: list of las file paths that contain the hull(s)
+        str_crop_wkt: well known text of the (multi)polygon to crop the points
+
+    Returns:
+        dictionary of the pdal pipeline
+    """
+    
+    list_pipeline = []
+    
+    # pdal readers for each tile
+    for str_las_path in list_clouds:
+        dict_current = {
+            "type":"readers.las",
+            "filename":str_las_path
+        }
+        list_pipeline.append(dict_current)
+    
+    # pdal merge multiple LAS tiles
+    if len(list_clouds) > 1:
+        dict_merge = {
+                "type" : "filters.merge"
+        }
+        list_pipeline.append(dict_merge)
+        
+    # pdal crop to the hull - the gridded extent is then the size of the
+    # bridge and not the size of the las tile(s)
+    dict_crop = {
+            "type" : "filters.crop",
+            "polygon": str_crop_wkt
+    }
+    list_pipeline.append(dict_crop)
+    
+    # create pipeline dictionary
+    # pdal pipelines are dictionaries with a list of dictionaries
+    dict_pipeline = {
+        "pipeline": list_pipeline
+    }
+    
+    return dict_pipeline
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_build_grid_pipeline(str_bridge_dem, flt_dem_resolution):
+    
+    """
+    Build a pdal pipeline that grids an in-memory array of points into a DEM
+
+    Args:
+        str_bridge_dem: path of the dem to create
+        flt_dem_resolution: resolution of the DEM to create
+
+    Returns:
+        dictionary of the pdal pipeline
+    """
+    
+    # pdal writers to create DEM
+    dict_create = {
+            "filename": str_bridge_dem,
+            "gdalopts": "tiled=yes,     compress=deflate",
+            "nodata": -9999,
+            "output_type": "idw",
+            "resolution": flt_dem_resolution,
+            "type": "writers.gdal"
+        }
+    
+    dict_pipeline = {
+        "pipeline": [dict_create]
+    }
+    
+    return dict_pipeline
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# -------------------------------------------
+def fn_finish_hull_dem(str_bridge_dem, gds_polygon, b_is_feet):
+    
+    """
+    Clip the gridded DEM to the hull, fill the missing pixels and write
+    the deck DEM in the requested vertical units
+
+    Args:
+        str_bridge_dem: path of the dem that was gridded from the points
+        gds_polygon: geoseries of the hull polygon
+        b_is_feet: T/F create data in vertical feet
+
+    Returns:
+        path of the deck DEM that was written
+    """
+    
+    with rxr.open_rasterio(str_bridge_dem, masked=True) as bridge_dem:
+        # read the DEM as a "Rioxarray"
+        
+        # TODO - processing error - 2022.12.03 - MAC
+        # clip the DEM from points to the polygon limits
+        #clipped = bridge_dem.rio.clip(gdf_singlerow.geometry,
+        #                              gdf_singlerow.geometry.crs,
+        #                              drop=True, invert=False)
+        
+        clipped = bridge_dem.rio.clip(gds_polygon,
+                      drop=True, invert=False)
+
+        # fill in the missing pixels
+        filled = clipped.rio.interpolate_na()
+
+        # clip the filled-in data to the polygon boundary
+        clipped2 = filled.rio.clip(gds_polygon,
+                                  drop=True, invert=False)
+        
+        # convert vertical values to meters
+        if b_is_feet:
+            # scale the raster from meters to feet
+            clipped2 = clipped2 * 3.28084
+
+            # write out the raster
+            bridge_dem_out = str_bridge_dem[:-4] + '_vert_ft.tif'
+            clipped2.rio.to_raster(bridge_dem_out, compress='LZW', dtype="float32")
+            
+        else:
+            # write out the raster
+            bridge_dem_out = str_bridge_dem[:-4] + '_vert_m.tif'
+            clipped2.rio.to_raster(bridge_dem_out, compress='LZW', dtype="float32")
+            
+    return bridge_dem_out
+# -------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_create_tile_group_dems(dict_params):
+    
+    """
+    Read the las tiles of a group of hulls once, partition the points to
+    each hull with a spatial index and grid a deck DEM for each hull
+
+    Args:
+        -- Getting these values from dictionary - for multiprocessing
+        list_hull_index: list of the hull index values (used to name dems)
+        list_hull_wkt: list of the hull polygons as well known text
+        list_clouds: list of las file paths shared by the hulls
+        flt_dem_resolution: resolution of the DEM to create
+        str_output_dir: where to write the road deck dems
+        b_is_feet: T/F create data in vertical feet
+        flt_crop_buffer: distance to buffer the hull when cropping points
+        queue_progress: optional queue to report each hull done to
+
+    Returns:
+        list of the deck DEM paths that were written
+    """
+    
+    list_hull_index = dict_params.get('list_hull_index')
+    list_hull_wkt = dict_params.get('list_hull_wkt')
+    list_clouds = dict_params.get('list_clouds')
+    flt_dem_resolution = dict_params.get('flt_dem_resolution')
+    str_output_dir = dict_params.get('str_output_dir')
+    b_is_feet = dict_params.get('b_is_feet')
+    flt_crop_buffer = dict_params.get('flt_crop_buffer')
+    queue_progress = dict_params.get('queue_progress')
+    
+    gds_hulls = gpd.GeoSeries.from_wkt(list_hull_wkt)
+    gds_crop = gds_hulls.buffer(flt_crop_buffer)
+    
+    # read the shared tiles once - cropped to all of the group's hulls
+    str_crop_wkt = unary_union(list(gds_crop)).wkt
+    dict_pipeline_read = fn_build_read_pipeline(list_clouds, str_crop_wkt)
+    
+    pipeline = pdal.Pipeline(json.dumps(dict_pipeline_read))
+    n_points = pipeline.execute()
+    
+    list_dem_files = []
+    
+    if n_points > 0:
+        arr_points = np.concatenate(pipeline.arrays)
+        
+        # partition the points to the buffered hulls (point-in-polygon
+        # with the geopandas spatial index) - buffers may overlap
+        gdf_points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(arr_points['X'],
+                                                                  arr_points['Y']))
+        gdf_crop = gpd.GeoDataFrame({'hull_pos': range(len(gds_crop))},
+                                    geometry=gds_crop)
+        
+        gdf_points_in_hull = gpd.sjoin(gdf_points, gdf_crop,
+                                       how='inner', predicate='within')
+        
+        for int_pos, df_hull_points in gdf_points_in_hull.groupby('hull_pos'):
+            index = list_hull_index[int_pos]
+            
+            # create a file name
+            str_bridge_dem = os.path.join(str_output_dir, str(index) + '_bridge_deck_dem.tif')
+            
+            # grid just this hull's points
+            arr_hull_points = arr_points[df_hull_points.index.values]
+            dict_pipeline_grid = fn_build_grid_pipeline(str_bridge_dem, flt_dem_resolution)
+            
+            pipeline_grid = pdal.Pipeline(json.dumps(dict_pipeline_grid),
+                                          arrays=[arr_hull_points])
+            pipeline_grid.execute()
+            
+            gds_polygon = gds_hulls.iloc[[int_pos]]
+            list_dem_files.append(fn_finish_hull_dem(str_bridge_dem, gds_polygon, b_is_feet))
+            fn_report_progress(queue_progress)
+            
+    # hulls without points are done too
+    fn_report_progress(queue_progress, len(list_hull_index) - len(list_dem_files))
+            
+    return list_dem_files
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ...........................................
+def fn_list_tile_group_params(gdf_bridge_ar, dict_hull_clouds, flt_dem_resolution, str_output_dir, b_is_feet, flt_crop_buffer):
+    
+    """
+    Create a list of dictionaries (one per group of hulls that need the
+    same las tiles - fn_group_hulls_by_tiles) for fn_create_tile_group_dems
+
+    Args:
+        gdf_bridge_ar: geodataframe of the bridge hull polygons
+        dict_hull_clouds: dictionary of hull_idx to list of las paths
+        flt_dem_resolution: resolution of the DEM to create
+        str_output_dir: where to write the road deck dems
+        b_is_feet: T/F create data in vertical feet
+        flt_crop_buffer: distance to buffer the hull when cropping points
+
+    Returns:
+        list of dictionaries of parameters
+    """
+    
+    # hull_idx is the row position in the hull file
+    list_hull_clouds = [dict_hull_clouds.get(i, []) for i in range(len(gdf_bridge_ar))]
+    list_groups = fn_group_hulls_by_tiles(list_hull_clouds)
+    
+    list_of_dict = []
+    for list_pos, list_clouds in list_groups:
+        if len(list_clouds) == 0:
+            # no las tiles recorded for this hull
+            continue
+        
+        dict_params = {'list_hull_index': [gdf_bridge_ar.index[i] for i in list_pos],
+                       'list_hull_wkt': [gdf_bridge_ar.geometry.iloc[i].wkt for i in list_pos],
+                       'list_clouds': list_clouds,
+                       'flt_dem_resolution': flt_dem_resolution,
+                       'str_output_dir': str_output_dir,
+                       'b_is_feet': b_is_feet,
+                       'flt_crop_buffer': flt_crop_buffer}
+        list_of_dict.append(dict_params)
+    
+    return list_of_dict
+# ...........................................
+
+
 # --------------------------------------------------------
-def fn_create_hull_dems(str_bridge_polygons_path,str_output_dir,flt_dem_resolution,b_is_feet):
+def fn_create_hull_dems(str_bridge_polygons_path,str_output_dir,flt_dem_resolution,b_is_feet,flt_crop_buffer=5.0,int_workers=0,int_chunksize=1):
     
     """
     Create DEMS of the hulls from the classified point clouds
@@ -74,11 +338,18 @@ def fn_create_hull_dems(str_bridge_polygons_path,str_output_dir,flt_dem_resoluti
         str_output_dir: where to write the road deck dems
         flt_dem_resolution: resolution of the DEM to create
         b_is_feet: T/F create data in vertical feet
+        flt_crop_buffer: distance to buffer the hull when cropping points
+        int_workers: number of worker processes (0 = all cores, less one;
+            1 = serial in this process)
+        int_chunksize: number of tile groups sent to a worker at a time
 
     Returns:
         nothing
     """
     
+    if int_workers <= 0 or int_workers >= mp.cpu_count():
+        int_workers = max(mp.cpu_count() - 1, 1)
+    
     print(" ")
     print("+=================================================================+")
     print("|      CREATE DEM FOR BRIDGE DECKS FROM LAS AND POLYGON HULL      |")
@@ -91,6 +362,9 @@ def fn_create_hull_dems(str_bridge_polygons_path,str_output_dir,flt_dem_resoluti
     print("  ---(o) OUTPUT DIRECTORY: " + str_output_dir)
     print("  ---[r]   Optional: RESOLUTION OF DEMS TO CREATE: " + str(flt_dem_resolution) )
     print("  ---[v]   Optional: VERTICAL DATA IN FEET: " + str(b_is_feet) )
+    print("  ---[b]   Optional: BUFFER TO CROP POINTS: " + str(flt_crop_buffer) )
+    print("  ---[n]   Optional: NUMBER OF WORKERS: " + str(int_workers) )
+    print("  ---[k]   Optional: CHUNKSIZE: " + str(int_chunksize) )
     print("===================================================================")
     
     # create the output directory if it does not exist
@@ -99,117 +373,47 @@ def fn_create_hull_dems(str_bridge_polygons_path,str_output_dir,flt_dem_resoluti
     # read the bridge polygons
     gdf_bridge_ar = gpd.read_file(str_bridge_polygons_path)
     
-    # TODO - Multiprocessing of this loop for speed - 20220516
-    for index, row in tqdm.tqdm(gdf_bridge_ar.iterrows(),
-                            total = gdf_bridge_ar.shape[0],
-                            desc='Create DEMs',
-                            bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                            ncols=65):
+    # hull to las tile relation written in step 2
+    dict_hull_clouds = fn_read_hull_tile_table(str_bridge_polygons_path, gdf_bridge_ar)
     
-        list_clouds = eval(gdf_bridge_ar.iloc[index]['las_paths'])
-        
-        # create a file name
-        str_bridge_dem = os.path.join(str_output_dir, str(index) + '_bridge_deck_dem.tif')
-        
-        # create a pdal pipeline dictionaries - specific tile request
+    list_of_dict = fn_list_tile_group_params(gdf_bridge_ar,
+                                             dict_hull_clouds,
+                                             flt_dem_resolution,
+                                             str_output_dir,
+                                             b_is_feet,
+                                             flt_crop_buffer)
     
-        # pdal readers for a single tile
-        dict_read_single_las = {
-            "type":"readers.las",
-            "filename":list_clouds[0],
-            "tag": "merge_las"
-        }
+    l = len(list_of_dict)
     
-        # pdal writers to create DEM
-        dict_create = {
-                "filename": str_bridge_dem,
-                "gdalopts": "tiled=yes,     compress=deflate",
-                "inputs": [ "merge_las" ],
-                "nodata": -9999,
-                "output_type": "idw",
-                "resolution": flt_dem_resolution,
-                "type": "writers.gdal"
-            }
-    
-        # pdal merge multiple LAS tiles
-        dict_merge = {
-                "type" : "filters.merge",
-                "tag": "merge_las"
-        }
-        
-        list_pipeline = []
-        
-        # create a pdal pipeline for just one tile
-        if len(list_clouds) == 1:
-            list_pipeline = [dict_read_single_las, dict_create]
-    
-        # create pdal pipeline to merge multiple tiles
-        if len(list_clouds) > 1:
-            for i in list_clouds:
-                # create pdal readers for each tile
-                dict_current = {
-                    "type":"readers.las",
-                    "filename":i
-                }
-                list_pipeline.append(dict_current)
-            list_pipeline.append(dict_merge)
-            list_pipeline.append(dict_create)
-        
-        # create pipeline dictionary
-        # pdal pipelines are dictionaries with a list of dictionaries
-        dict_pipeline_merge = {
-            "pipeline": list_pipeline
-        }
-        
-        #execute the pdal pipeline
-        pipeline = pdal.Pipeline(json.dumps(dict_pipeline_merge))
-        n_points = pipeline.execute()
-        
-        if n_points > 0:
-            #bridges were found
+    # one task per group of hulls that need the same las tiles
+    list_dem_files = []
     
-            with rxr.open_rasterio(str_bridge_dem, masked=True) as bridge_dem:
-                # read the DEM as a "Rioxarray"
-                #bridge_dem = rxr.open_rasterio(str_bridge_dem, masked=True).squeeze()
-                
-                # get a geodataframe of just one row
-                gdf_singlerow = gdf_bridge_ar.iloc[[index],:]
-        
-                # TODO - processing error - 2022.12.03 - MAC
-                # clip the DEM from points to the polygon limits
-                #clipped = bridge_dem.rio.clip(gdf_singlerow.geometry,
-                #                              gdf_singlerow.geometry.crs,
-                #                              drop=True, invert=False)
-                
-                clipped = bridge_dem.rio.clip(gdf_singlerow.geometry,
-                              drop=True, invert=False)
-        
-                # fill in the missing pixels
-                filled = clipped.rio.interpolate_na()
-        
-                # clip the filled-in data to the polygon boundary
-                # TODO - processing error - 2022.12.03 - MAC
-                #clipped2 = filled.rio.clip(gdf_singlerow.geometry,
-                #                           gdf_bridge_ar.geometry.crs,
-                #                           drop=True, invert=False)
-                
-                clipped2 = filled.rio.clip(gdf_singlerow.geometry,
-                                          drop=True, invert=False)
-                
+    if int_workers == 1 or l <= 1:
+        for dict_params in fn_progress(list_of_dict, l, 'Create DEMs'):
+            list_dem_files.extend(fn_create_tile_group_dems(dict_params))
+    else:
+        # 2023.03.11 - the workers report each hull done (a group holds up
+        # to 16 hulls) - the bar counts hulls, not groups
+        obj_manager, queue_progress = fn_progress_queue()
+        for dict_params in list_of_dict:
+            dict_params['queue_progress'] = queue_progress
         
-                # convert vertical values to meters
-                if b_is_feet:
-                    # scale the raster from meters to feet
-                    clipped2 = clipped2 * 3.28084
+        int_hulls = sum(len(dict_params['list_hull_index']) for dict_params in list_of_dict)
         
-                    # write out the raster
-                    bridge_dem_out = str_bridge_dem[:-4] + '_vert_ft.tif'
-                    clipped2.rio.to_raster(bridge_dem_out, compress='LZW', dtype="float32")
-                    
-                else:
-                    # write out the raster
-                    bridge_dem_out = str_bridge_dem[:-4] + '_vert_m.tif'
-                    clipped2.rio.to_raster(bridge_dem_out, compress='LZW', dtype="float32")
+        p = mp.Pool(processes = min(int_workers, l))
+        try:
+            async_result = p.map_async(fn_create_tile_group_dems,
+                                       list_of_dict,
+                                       chunksize = max(int_chunksize, 1))
+            
+            fn_progress_from_queue(queue_progress, int_hulls, 'Create DEMs', async_result)
+            
+            for list_group_dems in async_result.get():
+                list_dem_files.extend(list_group_dems)
+        finally:
+            p.close()
+            p.join()
+            fn_close_progress_queue(obj_manager)
                 
     fn_delete_files(str_output_dir)
 # --------------------------------------------------------
@@ -253,17 +457,47 @@ if __name__ == '__main__':
                         metavar='T/F',
                         type=str2bool)
     
+    parser.add_argument('-b',
+                        dest = "flt_crop_buffer",
+                        help='OPTIONAL: distance to buffer hull when cropping points: Default=5.0',
+                        required=False,
+                        default=5.0,
+                        metavar='FLOAT',
+                        type=float)
+    
+    parser.add_argument('-n', '--workers',
+                        dest = "int_workers",
+                        help='OPTIONAL: number of worker processes: Default=0 (will deploy all cores, less one for overhead), 1=serial',
+                        required=False,
+                        default=0,
+                        metavar='INTEGER',
+                        type=int)
+    
+    parser.add_argument('-k', '--chunksize',
+                        dest = "int_chunksize",
+                        help='OPTIONAL: number of tile groups sent to a worker at a time: Default=1',
+                        required=False,
+                        default=1,
+                        metavar='INTEGER',
+                        type=int)
+    
     args = vars(parser.parse_args())
     
     str_bridge_polygons_path = args['str_bridge_polygons_path']
     str_output_dir = args['str_output_dir']
     flt_dem_resolution = args['flt_dem_resolution']
     b_is_feet = args['b_is_feet']
+    flt_crop_buffer = args['flt_crop_buffer']
+    int_workers = args['int_workers']
+    int_chunksize = args['int_chunksize']
     
     fn_create_hull_dems(str_bridge_polygons_path,
                         str_output_dir,
                         flt_dem_resolution,
-                        b_is_feet)
+                        b_is_feet,
+                        flt_crop_buffer,
+                        int_workers,
+                        int_chunksize)
     
     flt_end_run = time.time()
     flt_time_pass = (flt_end_run - flt_start_run) // 1
@@ -22,8 +22,7 @@ from shapely.geometry import LineString
 import time
 import datetime
 
-import tqdm
-from time import sleep
+from progress import fn_progress
 # ************************************************************
 
 # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
@@ -195,13 +194,8 @@ def fn_determine_major_axis(str_bridge_polygons_path,str_trans_line_path,str_out
     list_major_axis_shp = []
     
     
-    for index, row in tqdm.tqdm(gdf_bridge_ar.iterrows(),
-                                total = gdf_bridge_ar.shape[0],
-                                desc='Determine axis',
-                                bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                ncols=65):
+    for index, row in fn_progress(gdf_bridge_ar.iterrows(), gdf_bridge_ar.shape[0], 'Determine axis'):
         shp_bridge_ar = row['geometry']
-        sleep(0)
         
         shp_major_axis = fn_get_major_axis_for_polygon(shp_bridge_ar, flt_buffer_hull, gdf_trans_with_bridges)
         list_major_axis_shp.append(shp_major_axis)
@@ -19,7 +19,6 @@ import math
 import numpy as np
 from shapely.geometry import LineString
 import os
-import tqdm
 
 import matplotlib.pyplot as plt
 import matplotlib.ticker as tick
@@ -27,6 +26,8 @@ import matplotlib.ticker as tick
 import time
 import datetime
 from datetime import date
+
+from progress import fn_progress
 # ************************************************************
 
 
@@ -109,11 +110,7 @@ def fn_extract_deck_profile(str_mjr_axis_shp_path,
     # buffer the input lines
     gdf_mjr_axis_ln_lambert['geometry'] = gdf_mjr_axis_ln_lambert.geometry.buffer(flt_mjr_axis)
     
-    for index, row in tqdm.tqdm(gdf_mjr_axis_ln_lambert.iterrows(),
-                                total =gdf_mjr_axis_ln_lambert.shape[0],
-                                desc='Extract Profiles',
-                                bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                ncols=65):
+    for index, row in fn_progress(gdf_mjr_axis_ln_lambert.iterrows(), gdf_mjr_axis_ln_lambert.shape[0], 'Extract Profiles'):
         
         # the geometry from the requested polygon as wellKnownText
         boundary_geom_WKT = gdf_mjr_axis_ln_lambert['geometry'][index]  # to WellKnownText
@@ -15,11 +15,11 @@ import json
 
 import multiprocessing as mp
 from multiprocessing import Pool
-import tqdm
-from time import sleep
 
 import time
 import datetime
+
+from progress import fn_progress
 # ************************************************************
 
  
@@ -32,7 +32,6 @@ def fn_create_las(dict_current_pipeline):
     except:
         print('File with issues: ' + dict_current_pipeline['pipeline'][0]['filename'])
         
-    sleep(0.01) # this allows the tqdm progress bar to update
         
     return 1
 # **********************************
@@ -144,11 +143,7 @@ def fn_extract_classification(str_input_directory,
             
         l = len(list_to_process)
         
-        list_return_values = list(tqdm.tqdm(p.imap(fn_create_las, list_pipeline_dict),
-                                            total = l,
-                                            desc='Extract Points',
-                                            bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                            ncols=65))
+        list_return_values = list(fn_progress(p.imap(fn_create_las, list_pipeline_dict), l, 'Extract Points'))
         
         p.close()
         p.join()
@@ -30,38 +30,10 @@ import os
 
 import time
 import datetime
-# ************************************************************
-
 
-# ----------------------------------------------  
-# Print iterations progress
-def fn_print_progress_bar (iteration,
-                           total,
-                           prefix = '', suffix = '',
-                           decimals = 0,
-                           length = 100, fill = '█',
-                           printEnd = "\r"):
-    """
-    from: https://stackoverflow.com/questions/3173320/text-progress-bar-in-the-console
-    Call in a loop to create terminal progress bar
-    Keyword arguments:
-        iteration   - Required  : current iteration (Int)
-        total       - Required  : total iterations (Int)
-        prefix      - Optional  : prefix string (Str)
-        suffix      - Optional  : suffix string (Str)
-        decimals    - Optional  : positive number of decimals in percent complete (Int)
-        length      - Optional  : character length of bar (Int)
-        fill        - Optional  : bar fill character (Str)
-        printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
-    """
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filledLength = int(length * iteration // total)
-    bar = fill * filledLength + '-' * (length - filledLength)
-    print(f'\r{prefix} |{bar}| {percent}% {suffix}', end = printEnd)
-    # Print New Line on Complete
-    if iteration == total: 
-        print()
-# ----------------------------------------------  
+from nearest_feature import fn_nearest_feature, STR_DIST_FIELD, FLT_NEAREST_STREAM_SEARCH
+from progress import fn_progress
+# ************************************************************
 
 
 # ````````````````````````````````````````
@@ -87,19 +59,63 @@ def fn_merge(list1, list2):
 # ...........................................................
 
 
-# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def fn_hydro_id_rating(str_segment_field_name, int_segment_id, str_hydro_table_csv):
-    # given a str_segment_field_name - get a list of tuples of the rating curve
+# -----------------------------------------------------------
+def fn_load_hydro_table_ratings(str_hydro_table_csv, str_segment_field_name, arr_segment_ids=None):
+    
+    """
+    Read the HAND hydro table once and split it into the rating curve of
+    each segment
+    
+    Args:
+        str_hydro_table_csv: path to the hydro table
+        str_segment_field_name: segment id field (like 'FATSGTID')
+        arr_segment_ids: segment ids to keep (None = all)
+        
+    Returns:
+        dictionary {segment id (int): (arr_discharge_cms, arr_stage)} in
+        the order of the hydro table
+    """
+    
+    # only the needed columns
+    df_hydro_table = pd.read_csv(str_hydro_table_csv,
+                                 usecols=[str_segment_field_name, 'stage', 'discharge_cms'],
+                                 dtype={'stage': np.float64, 'discharge_cms': np.float64})
+    
+    df_hydro_table = df_hydro_table.dropna(subset=[str_segment_field_name])
+    arr_segment = df_hydro_table[str_segment_field_name].values.astype(np.int64)
+    
+    if arr_segment_ids is not None:
+        arr_keep = np.isin(arr_segment, np.asarray(arr_segment_ids, dtype=np.int64))
+        df_hydro_table = df_hydro_table[arr_keep]
+        arr_segment = arr_segment[arr_keep]
+    
+    # group the rows of each segment (stable - keeps the table order)
+    arr_order = np.argsort(arr_segment, kind='stable')
+    arr_segment = arr_segment[arr_order]
+    arr_stage = df_hydro_table['stage'].values[arr_order]
+    arr_discharge = df_hydro_table['discharge_cms'].values[arr_order]
+    
+    arr_unique, arr_start = np.unique(arr_segment, return_index=True)
+    arr_end = np.append(arr_start[1:], len(arr_segment))
+    
+    dict_ratings = {}
+    for int_segment_id, int_start, int_end in zip(arr_unique.tolist(), arr_start, arr_end):
+        dict_ratings[int_segment_id] = (arr_discharge[int_start:int_end], arr_stage[int_start:int_end])
     
-    df_hydro_table = pd.read_csv(str_hydro_table_csv)
+    return(dict_ratings)
+# -----------------------------------------------------------
 
-    df_hydro_id = df_hydro_table.loc[df_hydro_table[str_segment_field_name] == int_segment_id]
 
-    list_stage = df_hydro_id['stage'].tolist()
-    list_discharge = df_hydro_id['discharge_cms'].tolist()
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_hydro_id_rating(int_segment_id, dict_ratings):
+    # given a segment id - get a list of tuples of the rating curve
+    # dict_ratings from fn_load_hydro_table_ratings
+    
+    tup_empty = (np.zeros(0), np.zeros(0))
+    arr_discharge, arr_stage = dict_ratings.get(int_segment_id, tup_empty)
 
-    list_stage_ft = [round(x * 3.28084,1) for x in list_stage]
-    list_discharge_cfs = [round(x * 35.314666212661,1) for x in list_discharge]
+    list_stage_ft = [round(x * 3.28084,1) for x in arr_stage.tolist()]
+    list_discharge_cfs = [round(x * 35.314666212661,1) for x in arr_discharge.tolist()]
 
     list_of_tuples = fn_merge(list_discharge_cfs, list_stage_ft)
     
@@ -269,23 +285,16 @@ def fn_determine_segment_id(list_input_files, str_segment_field_name):
         
         # --- when a major axis line does not intersect a stream line
         # if no match found, search for the nearest stream and populate str_segment_field_name and search distance
-    
-        for index, row in gdf_find_nearest_stream.iterrows():
-            # get the the nearest stream in gdf_stream_in_aoi_prj
-            pd_dist_to_nearest_stream = gdf_hand_stream_in_aoi_input_prj.distance(row['geometry']).sort_values()
-            
-            # distance to nearest stream
-            flt_nearest_stream_dist = pd_dist_to_nearest_stream.iloc[0]
-            
-            # index in gdf_stream_in_aoi_prj of nearest stream
-            int_nearest_stream_index = gdf_hand_stream_in_aoi_input_prj.distance(row['geometry']).sort_values().index[0]
-            
-            # append gdf_mjr_axis_ln with the 'feature_id', 'order_' and 'dist_river' of the nearest stream line
-            
-            gdf_find_nearest_stream.at[index, str_segment_field_name ] = gdf_hand_stream_in_aoi_input_prj.loc[int_nearest_stream_index][str_segment_field_name]
-            gdf_find_nearest_stream.at[index, 'order__left'] = gdf_hand_stream_in_aoi_input_prj.loc[int_nearest_stream_index]['order_']
-            gdf_find_nearest_stream.at[index, 'dst_new_rv'] = round(flt_nearest_stream_dist, 2)
-            gdf_find_nearest_stream.at[index, 'feature_id_right'] = gdf_hand_stream_in_aoi_input_prj.loc[int_nearest_stream_index]['feature_id']
+        # 2023.03.09 - all of the unmatched lines in one nearest query
+        df_nearest = fn_nearest_feature(gdf_find_nearest_stream,
+                                        gdf_hand_stream_in_aoi_input_prj,
+                                        [str_segment_field_name, 'order_', 'feature_id'],
+                                        FLT_NEAREST_STREAM_SEARCH)
+        
+        gdf_find_nearest_stream[str_segment_field_name] = df_nearest[str_segment_field_name].values
+        gdf_find_nearest_stream['order__left'] = df_nearest['order_'].values
+        gdf_find_nearest_stream['dst_new_rv'] = df_nearest[STR_DIST_FIELD].astype(float).round(2).values
+        gdf_find_nearest_stream['feature_id_right'] = df_nearest['feature_id'].values
             
         # combine the gdf_find_nearest_stream and gdf_crosses_stream
         gdf_mjr_axis_ln_attributed = pd.concat([gdf_find_nearest_stream, gdf_crosses_stream])
@@ -302,48 +311,39 @@ def fn_determine_segment_id(list_input_files, str_segment_field_name):
         gdf_mjr_axis_ln_attributed['feature_id_right'] = ''
         
         
-        for index, row in gdf_mjr_axis_ln_attributed.iterrows():
-            # get the the nearest stream in gdf_stream_in_aoi_prj
-            pd_dist_to_nearest_stream = gdf_hand_stream_in_aoi_input_prj.distance(row['geometry']).sort_values()
-            
-            # distance to nearest stream
-            flt_nearest_stream_dist = pd_dist_to_nearest_stream.iloc[0]
-            
-            # index in gdf_stream_in_aoi_prj of nearest stream
-            int_nearest_stream_index = gdf_hand_stream_in_aoi_input_prj.distance(row['geometry']).sort_values().index[0]
-            
-            # append gdf_mjr_axis_ln with the 'feature_id', 'order_' and 'dist_river' of the nearest stream line
-            
-            gdf_mjr_axis_ln_attributed.at[index, str_segment_field_name] = gdf_hand_stream_in_aoi_input_prj.loc[int_nearest_stream_index][str_segment_field_name]
-            gdf_mjr_axis_ln_attributed.at[index, 'dist_river'] = round(flt_nearest_stream_dist, 2)
-            gdf_mjr_axis_ln_attributed.at[index, 'feature_id_right'] = gdf_hand_stream_in_aoi_input_prj.loc[int_nearest_stream_index]['feature_id']
+        df_nearest = fn_nearest_feature(gdf_mjr_axis_ln_attributed,
+                                        gdf_hand_stream_in_aoi_input_prj,
+                                        [str_segment_field_name, 'feature_id'],
+                                        FLT_NEAREST_STREAM_SEARCH)
+        
+        gdf_mjr_axis_ln_attributed[str_segment_field_name] = df_nearest[str_segment_field_name].values
+        gdf_mjr_axis_ln_attributed['dist_river'] = df_nearest[STR_DIST_FIELD].astype(float).round(2).values
+        gdf_mjr_axis_ln_attributed['feature_id_right'] = df_nearest['feature_id'].values
             
             
     # convert 'feature_id' to integer
     gdf_mjr_axis_ln_attributed['feature_id_right'] = gdf_mjr_axis_ln_attributed['feature_id_right'].astype(int)
     
     # ----add the ranting curve to the geodataframe ----
-    int_count = 0
-    l = len(gdf_mjr_axis_ln_attributed)
-    str_prefix = "Fetch Rating " + str(int_count) + ' of ' + str(l)
-    fn_print_progress_bar(0, l, prefix = str_prefix , suffix = 'Complete', length = 29)
-    
-    
     gdf_mjr_axis_ln_attributed['hand_r'] = ''
+    
+    # 2023.03.10 - hydro table read once - rating curves of the segments
+    # in the area of interest
+    arr_segment_ids = pd.to_numeric(gdf_mjr_axis_ln_attributed[str_segment_field_name],
+                                    errors='coerce').dropna().astype(np.int64).values
+    dict_ratings = fn_load_hydro_table_ratings(str_hydro_table_csv,
+                                               str_segment_field_name,
+                                               arr_segment_ids)
 
-    for index, row in gdf_mjr_axis_ln_attributed.iterrows():
-        # -- update progress bar --
-        time.sleep(0.05)
-        int_count += 1
-        str_prefix = "Fetch Rating " + str(int_count) + ' of ' + str(l)
-        fn_print_progress_bar(int_count, l, prefix = str_prefix , suffix = 'Complete', length = 29)
+    for index, row in fn_progress(gdf_mjr_axis_ln_attributed.iterrows(),
+                                  len(gdf_mjr_axis_ln_attributed),
+                                  'Fetch Rating'):
         
         if row['feature_id'] == row['feature_id_right']:
             # get the 'hard_r' rating curve for the str_segment_field_name
             
-            str_list_of_tuples = fn_hydro_id_rating(str_segment_field_name,
-                                                    int(row[str_segment_field_name]),
-                                                    str_hydro_table_csv)
+            str_list_of_tuples = fn_hydro_id_rating(int(row[str_segment_field_name]),
+                                                    dict_ratings)
             
             row['hand_r'] = str_list_of_tuples
             gdf_mjr_axis_ln_attributed.at[index, 'hand_r'] = str_list_of_tuples
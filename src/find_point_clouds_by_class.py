@@ -27,11 +27,10 @@ import warnings
 #from multiprocessing.pool import ThreadPool
 
 import multiprocessing as mp
-import tqdm
-from time import sleep
 
 from dateutil.parser import parse
 
+from progress import fn_progress
 # ************************************************************
 
 
@@ -274,7 +273,6 @@ def fn_get_las_tiles(gdf_current_tile):
             pass
             # need to delete this file
     
-    sleep(0.01) # this allows the tqdm progress bar to update
     
 # ===================================================================
 
@@ -340,11 +338,7 @@ def fn_point_clouds_by_class(str_input_path,
     l = len(gdf_tiles)
     p = mp.Pool(processes = (mp.cpu_count() - 1))
         
-    list_return_values = list(tqdm.tqdm(p.imap(fn_get_las_tiles, list_of_gdf_tiles),
-                                        total = l,
-                                        desc='Get LAS Points',
-                                        bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                        ncols=65))
+    list_return_values = list(fn_progress(p.imap(fn_get_las_tiles, list_of_gdf_tiles), l, 'Get LAS Points'))
     p.close()
     p.join()
 
@@ -17,10 +17,12 @@ import urllib
 import math
 import numpy as np
 import os
-import tqdm
 
 import time
 import datetime
+
+from segment_intersection import fn_segment_crossings
+from progress import fn_progress
 # ************************************************************
 
 
@@ -35,40 +37,6 @@ def is_valid_file(parser, arg):
 # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
 
-# =========================================================
-#Functions to determine if two lines cross
-#https://www.kite.com/python/answers/how-to-check-if-two-line-segments-intersect-in-python
-
-def fn_on_segment(p, q, r):
-    if r[0] <= max(p[0], q[0]) and r[0] >= min(p[0], q[0]) and r[1] <= max(p[1], q[1]) and r[1] >= min(p[1], q[1]):
-        return True
-    return False
-
-def fn_orientation(p, q, r):
-    val = ((q[1] - p[1]) * (r[0] - q[0])) - ((q[0] - p[0]) * (r[1] - q[1]))
-    if val == 0 : return 0
-    return 1 if val > 0 else -1
-
-def fn_intersects(seg1, seg2):
-    p1, q1 = seg1
-    p2, q2 = seg2
-    
-    o1 = fn_orientation(p1, q1, p2)
-    o2 = fn_orientation(p1, q1, q2)
-    o3 = fn_orientation(p2, q2, p1)
-    o4 = fn_orientation(p2, q2, q1)
-    
-    if o1 != o2 and o3 != o4:
-        return True
-    
-    if o1 == 0 and fn_on_segment(p1, q1, p2) : return True
-    if o2 == 0 and fn_on_segment(p1, q1, q2) : return True
-    if o3 == 0 and fn_on_segment(p2, q2, p1) : return True
-    if o4 == 0 and fn_on_segment(p2, q2, q1) : return True
-    return False 
-# =========================================================
-
-
 # ..........................................................
 def fn_flip_major_axis(str_major_axis_ln_path,str_output_dir,flt_mjr_axis):
     
@@ -116,11 +84,7 @@ def fn_flip_major_axis(str_major_axis_ln_path,str_output_dir,flt_mjr_axis):
     # Query: Flowline - Large Scale (ID: 6)
     query_url_nhd = 'https://hydro.nationalmap.gov/arcgis/rest/services/nhd/MapServer/6/query/?'
     
-    for index_0, row_0 in tqdm.tqdm(gdf_mjr_axis_ln_lambert.iterrows(),
-                                    total =gdf_mjr_axis_ln_lambert.shape[0],
-                                    desc='Flip Lines',
-                                    bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                    ncols=65):
+    for index_0, row_0 in fn_progress(gdf_mjr_axis_ln_lambert.iterrows(), gdf_mjr_axis_ln_lambert.shape[0], 'Flip Lines'):
         
         # initialize default values
         str_nhd_name = "99-No NHD Streams"
@@ -188,51 +152,30 @@ def fn_flip_major_axis(str_major_axis_ln_path,str_output_dir,flt_mjr_axis):
         for index, row in gdf_from_url_local_prj.iterrows(): #For each stream
             river_geom_wkt = row['geometry'] #river geom to WellKnownText
             ls_river_points = list(river_geom_wkt.coords) #create list of river geom coordinates
-    
-            i = 0
-            #get each edge between the series of points on road
-    
-            for point in ls_mjr_axis_points[:-1]:
-                road_edge = tuple(ls_mjr_axis_points[i:i+2]) 
-                j = 0
-    
-                #get each edge between the series of points on river
-                for point_river in ls_river_points[:-1]:
-                    river_edge = tuple(ls_river_points[j:j+2])
-                    j +=1
-    
-                    if fn_intersects(road_edge, river_edge):
-                        int_road_count += 1 #number of times road crosses a waterway
-                        
-                        # TODO - 2022.12.30 - are the field names of NHD serivce lower case?
-                        try:
-                            str_nhd_name = row['GNIS_NAME']
-                        except:
-                            str_nhd_name = row['gnis_name']
-                        
-                        try:
-                            str_nhd_reachcode = row['REACHCODE']
-                        except:
-                            str_nhd_reachcode = row['reachcode']
-    
-                        # Get the river vector from the edge points
-                        d_xRiv = river_edge[1][0]-river_edge[0][0]
-                        d_yRiv = river_edge[1][1]-river_edge[0][1]
-                        river_vector = [d_xRiv, d_yRiv]
-    
-                        # Get the road vector from the edge points
-                        d_xRoad = road_edge[1][0]-road_edge[0][0]
-                        d_yRoad = road_edge[1][1]-road_edge[0][1]
-                        bridge_vector = [d_xRoad, d_yRoad]
-    
-                        # Cross product to determine if the road is left-to-right looking downstream
-                        a = np.cross(river_vector,bridge_vector)
-    
-                        # A negative cross-product means the road is in the correct direction
-                        if a > 0:
-                            #Set flag to reverse (flip) the bridge from OSM
-                            b_reverse_road = True
-                i += 1
+            
+            # 2023.03.06 - test every road edge against every river edge at once
+            arr_road_edge, arr_river_edge, arr_cross_sign = fn_segment_crossings(ls_mjr_axis_points,
+                                                                                 ls_river_points)
+            
+            if len(arr_road_edge) > 0:
+                int_road_count += len(arr_road_edge) #number of times road crosses a waterway
+                
+                # TODO - 2022.12.30 - are the field names of NHD serivce lower case?
+                try:
+                    str_nhd_name = row['GNIS_NAME']
+                except:
+                    str_nhd_name = row['gnis_name']
+                
+                try:
+                    str_nhd_reachcode = row['REACHCODE']
+                except:
+                    str_nhd_reachcode = row['reachcode']
+                
+                # Cross product (river x road) to determine if the road is left-to-right looking downstream
+                # A negative cross-product means the road is in the correct direction
+                if (arr_cross_sign > 0).any():
+                    #Set flag to reverse (flip) the bridge from OSM
+                    b_reverse_road = True
                 
         if b_reverse_road and ((int_road_count % 2)!= 0):
             # Reverse road is True and int_road_count is odd
@@ -14,12 +14,16 @@ import shapely.geometry
 from shapely.geometry import LineString
 import urllib
 import math
+import multiprocessing as mp
 import numpy as np
 import os
-import tqdm
 
 import time
 import datetime
+
+from segment_intersection import fn_segment_crossings
+from nhd_flowline_store import fn_is_nhd_store, fn_query_nhd_flowlines, LIST_NHD_FIELDS
+from progress import fn_progress
 # ************************************************************
 
 
@@ -34,38 +38,61 @@ def is_valid_file(parser, arg):
 # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
 
-# =========================================================
-#Functions to determine if two lines cross
-#https://www.kite.com/python/answers/how-to-check-if-two-line-segments-intersect-in-python
+# ----------------------------------------------------------
+def fn_flip_single_axis(dict_params):
+
+    """
+    Flip one major axis line if it crosses its streams right-to-left
+    looking downstream and pick the nhd name / reachcode
 
-def fn_on_segment(p, q, r):
-    if r[0] <= max(p[0], q[0]) and r[0] >= min(p[0], q[0]) and r[1] <= max(p[1], q[1]) and r[1] >= min(p[1], q[1]):
-        return True
-    return False
+    Args:
+        dict_params: dictionary with 'index' of the major axis,
+            'list_axis_points' (coordinates of the major axis) and
+            'list_streams' (list of coordinates, name, reachcode of each
+            stream in the major axis buffer)
 
-def fn_orientation(p, q, r):
-    val = ((q[1] - p[1]) * (r[0] - q[0])) - ((q[0] - p[0]) * (r[1] - q[1]))
-    if val == 0 : return 0
-    return 1 if val > 0 else -1
+    Returns:
+        tuple of index, flipped coordinates (None if not flipped),
+        nhd name and nhd reachcode
+    """
 
-def fn_intersects(seg1, seg2):
-    p1, q1 = seg1
-    p2, q2 = seg2
-    
-    o1 = fn_orientation(p1, q1, p2)
-    o2 = fn_orientation(p1, q1, q2)
-    o3 = fn_orientation(p2, q2, p1)
-    o4 = fn_orientation(p2, q2, q1)
-    
-    if o1 != o2 and o3 != o4:
-        return True
-    
-    if o1 == 0 and fn_on_segment(p1, q1, p2) : return True
-    if o2 == 0 and fn_on_segment(p1, q1, q2) : return True
-    if o3 == 0 and fn_on_segment(p2, q2, p1) : return True
-    if o4 == 0 and fn_on_segment(p2, q2, q1) : return True
-    return False 
-# =========================================================
+    # initialize default values
+    str_nhd_name = "99-No NHD Streams"
+    str_nhd_reachcode = np.nan
+    
+    int_road_count = 0 # number of times road crosses a waterway
+    b_reverse_road = False
+    
+    ls_mjr_axis_points = dict_params['list_axis_points']
+    
+    for ls_river_points, str_possible_nhd_name, str_possible_nhd_reachcode in dict_params['list_streams']: #For each stream
+        
+        # 2023.03.06 - test every road edge against every river edge at once
+        arr_road_edge, arr_river_edge, arr_cross_sign = fn_segment_crossings(ls_mjr_axis_points,
+                                                                             ls_river_points)
+        
+        if len(arr_road_edge) > 0:
+            # for roads with multiple stream crossings,
+            # change the name only if it isn't None
+            if int_road_count == 0 or str_possible_nhd_name != None:
+                str_nhd_name = str_possible_nhd_name
+                str_nhd_reachcode = str_possible_nhd_reachcode
+                
+            int_road_count += len(arr_road_edge) #number of times road crosses a waterway
+            
+            # Cross product (river x road) to determine if the road is left-to-right looking downstream
+            # A negative cross-product means the road is in the correct direction
+            if (arr_cross_sign > 0).any():
+                #Set flag to reverse (flip) the bridge from OSM
+                b_reverse_road = True
+    
+    list_flipped_points = None
+    if b_reverse_road and ((int_road_count % 2)!= 0):
+        # Reverse road is True and int_road_count is odd
+        list_flipped_points = ls_mjr_axis_points[::-1] # reverse the list of bridge points
+    
+    return (dict_params['index'], list_flipped_points, str_nhd_name, str_nhd_reachcode)
+# ----------------------------------------------------------
 
 
 # ..........................................................
@@ -73,15 +100,22 @@ def fn_flip_major_axis(str_major_axis_ln_path,
                        str_aoi_ar_path,
                        str_nhd_stream_path,
                        str_output_dir,
-                       flt_mjr_axis):
+                       flt_mjr_axis,
+                       int_workers=0):
     
     """
     Flip major axis lines to be 'left-to-right' looking downstream if the
     road crosses a stream line.  Attribute the major axis line with the nhd
     stream name
 
+    Args:
+        int_workers: number of worker processes (0 = all cores, less one;
+            1 = serial)
     """
     
+    if int_workers <= 0 or int_workers >= mp.cpu_count():
+        int_workers = max(mp.cpu_count() - 1, 1)
+    
     print(" ")
     print("+=================================================================+")
     print("|        FLIP MAJOR AXIS LINES (DOWNSTREAM LEFT-TO-RIGHT)         |")
@@ -96,159 +130,105 @@ def fn_flip_major_axis(str_major_axis_ln_path,
     print("  ---(n) NHD STREAM LINES: " + str_nhd_stream_path)
     print("  ---(o) OUTPUT DIRECTORY: " + str_output_dir)
     print("  ---[b]   Optional: BUFFER DISTANCE MAJOR AXIS: " + str(flt_mjr_axis) )
+    print("  ---[w]   Optional: NUMBER OF WORKERS: " + str(int_workers) )
     print("===================================================================")
     
     # create the output directory if it does not exist
     os.makedirs(str_output_dir, exist_ok=True)
     
-    # ---------------------------
-    # clip the NHD streamline geopackage to the area-of-interest 
-    # projection of nhd lines
-    prj_nhd = "epsg:4269"
-    
     # read the "area of interest" shapefile in to geopandas dataframe
     gdf_aoi_prj = gpd.read_file(str_aoi_ar_path)
     
-    # convert aoi to prj_nhd
-    gdf_aoi_prj_nhd = gdf_aoi_prj.to_crs(prj_nhd)
-    
-    # get the crs of the user supplied shapefile
-    source_crs = gdf_aoi_prj.crs
-    
-    # get geoDataFrame of the boundary of the input shapefile
-    gdf_bounds = gdf_aoi_prj_nhd.bounds
-    
-    # convert the pandas first row to list of bounding points
-    list_bbox = gdf_bounds.loc[0, :].values.tolist()
-    
-    # convert list to tuple
-    tup_bbox = tuple(list_bbox)
-    
-    print("Clipping NHD Stream line file to AOI ... ~1 minute")
-    
-    # read bounding line data within the bounding box
-    gdf_streams_in_bb = gpd.read_file(str_nhd_stream_path, layer='NHDFlowline', bbox=tup_bbox)
-    
-    # convert nhd streams to source crs
-    gdf_streams_in_bb_prj = gdf_streams_in_bb.to_crs(source_crs)
+    # read the major axis lines
+    gdf_mjr_axis_ln = gpd.read_file(str_major_axis_ln_path)
+    mjr_axis_crs = gdf_mjr_axis_ln.crs
     
-    # -- if there is a need to write out the clipped nhd lines
-    #print('Writing clipped nhd stream file ... ~1 minute')
-    #str_file_gpkg_to_write = os.path.join(str_output_dir, 'nhd_stream_clip.gpkg')
-    #gdf_streams_in_bb_prj.to_file(str_file_gpkg_to_write, driver="GPKG")
     # ---------------------------
+    if fn_is_nhd_store(str_nhd_stream_path):
+        # 2023.03.07 - partitioned nhd store (nhd_flowline_store.py) - only
+        # the partitions under the aoi are read, already in the pipeline crs
+        print("Querying NHD Stream line store for AOI ...")
+        gdf_streams_in_bb = fn_query_nhd_flowlines(str_nhd_stream_path,
+                                                   tuple(gdf_aoi_prj.total_bounds),
+                                                   gdf_aoi_prj.crs)
+    else:
+        # clip the NHD streamline geopackage to the area-of-interest 
+        # projection of nhd lines
+        prj_nhd = "epsg:4269"
+        
+        # bounding box of the aoi in prj_nhd
+        tup_bbox = tuple(gdf_aoi_prj.to_crs(prj_nhd).total_bounds)
+        
+        print("Clipping NHD Stream line file to AOI ... ~1 minute")
+        
+        # read bounding line data within the bounding box
+        gdf_streams_in_bb = gpd.read_file(str_nhd_stream_path, layer='NHDFlowline', bbox=tup_bbox)
+        
+        # keep only the fields that are used
+        gdf_streams_in_bb = gdf_streams_in_bb[[str_col for str_col in gdf_streams_in_bb.columns
+                                               if str_col.upper() in LIST_NHD_FIELDS or str_col == 'geometry']]
     
-    # read the major axis lines
-    gdf_mjr_axis_ln = gpd.read_file(str_major_axis_ln_path)
+    # convert nhd streams to crs of gdf_mjr_axis_ln (one reprojection)
+    if gdf_streams_in_bb.crs != mjr_axis_crs:
+        gdf_streams_in_bb = gdf_streams_in_bb.to_crs(mjr_axis_crs)
+    # ---------------------------
     
     # buffer the major axis lines
-    gdf_mjr_axis_ln['geometry'] = gdf_mjr_axis_ln.geometry.buffer(flt_mjr_axis)
-    
-    # reproject the gdf_streams_in_bb_prj to crs of gdf_mjr_axis_ln
-    mjr_axis_crs = gdf_mjr_axis_ln.crs
-    gdf_streams_in_bb_mjr_axis_crs = gdf_streams_in_bb_prj.to_crs(mjr_axis_crs)
+    gdf_mjr_axis_ar = gdf_mjr_axis_ln.copy()
+    gdf_mjr_axis_ar['geometry'] = gdf_mjr_axis_ar.geometry.buffer(flt_mjr_axis)
     
     print('Determining nhd stream lines within buffered major axis ...')
-    gdf_streams_within_mjr_axis_buffer = gpd.sjoin(gdf_streams_in_bb_mjr_axis_crs, gdf_mjr_axis_ln)
-    
-    str_file_gpkg_to_write = os.path.join(str_output_dir, 'nhd_stream_in_buffer.gpkg')
-    gdf_streams_within_mjr_axis_buffer.to_file(str_file_gpkg_to_write, driver="GPKG")
+    gdf_streams_within_mjr_axis_buffer = gpd.sjoin(gdf_streams_in_bb, gdf_mjr_axis_ar)
     
-    # re-read the major axis lines to convert back to lines
-    gdf_mjr_axis_ln = gpd.read_file(str_major_axis_ln_path)
+    # -- if there is a need to write out the nhd lines in the buffers
+    #str_file_gpkg_to_write = os.path.join(str_output_dir, 'nhd_stream_in_buffer.gpkg')
+    #gdf_streams_within_mjr_axis_buffer.to_file(str_file_gpkg_to_write, driver="GPKG")
 
+    # TODO - 2022.12.30 - are the field names of NHD serivce lower case?
+    str_name_field = 'GNIS_NAME' if 'GNIS_NAME' in gdf_streams_within_mjr_axis_buffer.columns else 'gnis_name'
+    str_reachcode_field = 'REACHCODE' if 'REACHCODE' in gdf_streams_within_mjr_axis_buffer.columns else 'reachcode'
+    
+    # 2023.03.06 - each worker gets only the streams that the sjoin found
+    # in the buffer of its major axis (coordinates, name, reachcode)
+    dict_streams_per_axis = {}
+    for int_axis_idx, gdf_crossing_streams in gdf_streams_within_mjr_axis_buffer.groupby('index_right', sort=False):
+        dict_streams_per_axis[int_axis_idx] = [(list(geom.coords), str_name, str_reachcode)
+                                               for geom, str_name, str_reachcode in zip(gdf_crossing_streams.geometry,
+                                                                                        gdf_crossing_streams[str_name_field],
+                                                                                        gdf_crossing_streams[str_reachcode_field])]
+    
+    list_of_dict = []
+    for index_mjr_axis, geom_mjr_axis in gdf_mjr_axis_ln.geometry.items():
+        list_of_dict.append({'index': index_mjr_axis,
+                             'list_axis_points': list(geom_mjr_axis.coords),
+                             'list_streams': dict_streams_per_axis.get(index_mjr_axis, [])})
+    
+    l = len(list_of_dict)
+    
+    # serial and multiprocessing share the same code path
+    # imap keeps the results in the order of the major axis lines
+    if int_workers == 1 or l <= 1:
+        p = None
+        iter_results = map(fn_flip_single_axis, list_of_dict)
+    else:
+        int_chunksize = max(l // (int_workers * 4), 1)
+        p = mp.Pool(processes = min(int_workers, l))
+        iter_results = p.imap(fn_flip_single_axis, list_of_dict, chunksize = int_chunksize)
+    
     list_nhd_names = []
     list_nhd_reachcode = []
     
-    for index_mjr_axis, row_0 in tqdm.tqdm(gdf_mjr_axis_ln.iterrows(),
-                                           total =gdf_mjr_axis_ln.shape[0],
-                                           desc='Flip Lines',
-                                           bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                           ncols=65):
-    
-    #for index_mjr_axis, row_0 in gdf_mjr_axis_ln.iterrows():
-        # initialize default values
-        str_nhd_name = "99-No NHD Streams"
-        str_nhd_reachcode = np.nan
-        
-        # get a geodataframe of the streams that cross
-        gdf_crossing_streams = gdf_streams_within_mjr_axis_buffer.loc[gdf_streams_within_mjr_axis_buffer['index_right'] == index_mjr_axis]
-        
-        int_road_count = 0 # number of times road crosses a waterway
-        b_reverse_road = False
-        
-        mjr_axis_wkt = gdf_mjr_axis_ln.geometry[index_mjr_axis] #road geom to WellKnownText
-        ls_mjr_axis_points = list(mjr_axis_wkt.coords)
-        
-        for index, row in gdf_crossing_streams.iterrows(): #For each stream
-            river_geom_wkt = row['geometry'] #river geom to WellKnownText
-            ls_river_points = list(river_geom_wkt.coords) #create list of river geom coordinates
-            
-            i = 0
-            #get each edge between the series of points on road
-    
-            for point in ls_mjr_axis_points[:-1]:
-                road_edge = tuple(ls_mjr_axis_points[i:i+2]) 
-                j = 0
-    
-                #get each edge between the series of points on river
-                for point_river in ls_river_points[:-1]:
-                    river_edge = tuple(ls_river_points[j:j+2])
-                    j +=1
-                    
-                    if fn_intersects(road_edge, river_edge):
-                        int_road_count += 1 #number of times road crosses a waterway
-    
-                        # TODO - 2022.12.30 - are the field names of NHD serivce lower case?
-                        try:
-                            str_possible_nhd_name = row['GNIS_NAME']
-                        except:
-                            str_possible_nhd_name = row['gnis_name']
-    
-                        try:
-                            str_possible_nhd_reachcode = row['REACHCODE']
-                        except:
-                            str_possible_nhd_reachcode = row['reachcode']
-                        
-                        # for roads with multiple stream crossings,
-                        # change the name only if it isn't None
-                        if int_road_count > 1:
-                            if str_possible_nhd_name != None:
-                                str_nhd_name = str_possible_nhd_name
-                                str_nhd_reachcode = str_possible_nhd_reachcode
-                        else:
-                            str_nhd_name = str_possible_nhd_name
-                            str_nhd_reachcode = str_possible_nhd_reachcode
-    
-                        # Get the river vector from the edge points
-                        d_xRiv = river_edge[1][0]-river_edge[0][0]
-                        d_yRiv = river_edge[1][1]-river_edge[0][1]
-                        river_vector = [d_xRiv, d_yRiv]
-    
-                        # Get the road vector from the edge points
-                        d_xRoad = road_edge[1][0]-road_edge[0][0]
-                        d_yRoad = road_edge[1][1]-road_edge[0][1]
-                        bridge_vector = [d_xRoad, d_yRoad]
-    
-                        # Cross product to determine if the road is left-to-right looking downstream
-                        a = np.cross(river_vector,bridge_vector)
-    
-                        # A negative cross-product means the road is in the correct direction
-                        if a > 0:
-                            #Set flag to reverse (flip) the bridge from OSM
-                            b_reverse_road = True
-                i += 1
-    
-        if b_reverse_road and ((int_road_count % 2)!= 0):
-            # Reverse road is True and int_road_count is odd
-            ls_mjr_axis_points.reverse() # reverse the list of bridge points
-    
-            flip_road_wkt = LineString(ls_mjr_axis_points) # convert list of points into WellKnownText
-            gdf_mjr_axis_ln.at[index_mjr_axis,'geometry'] = flip_road_wkt
+    for index_mjr_axis, list_flipped_points, str_nhd_name, str_nhd_reachcode in fn_progress(iter_results, l, 'Flip Lines'):
+        if list_flipped_points is not None:
+            gdf_mjr_axis_ln.at[index_mjr_axis,'geometry'] = LineString(list_flipped_points)
             
         list_nhd_names.append(str_nhd_name)
         list_nhd_reachcode.append(str_nhd_reachcode)
     
+    if p is not None:
+        p.close()
+        p.join()
+    
     gdf_mjr_axis_ln['nhd_name'] = list_nhd_names
     gdf_mjr_axis_ln['reachcode'] = list_nhd_reachcode
         
@@ -283,7 +263,7 @@ if __name__ == '__main__':
     
     parser.add_argument('-n',
                         dest = "str_nhd_stream_path",
-                        help=r'REQUIRED: path to nhd lines Example: D:\tx_bridge_input_datasets\nhd\NHD_H_Texas_State_GPKG\NHD_H_Texas_State_GPKG.gpkg',
+                        help=r'REQUIRED: path to nhd lines (GeoPackage or partitioned store from nhd_flowline_store.py) Example: D:\tx_bridge_input_datasets\nhd\NHD_H_Texas_State_GPKG\NHD_H_Texas_State_GPKG.gpkg',
                         required=True,
                         metavar='FILE',
                         type=lambda x: is_valid_file(parser, x))
@@ -303,6 +283,14 @@ if __name__ == '__main__':
                         metavar='FLOAT',
                         type=float)
     
+    parser.add_argument('-w', '--workers',
+                        dest = "int_workers",
+                        help='OPTIONAL: number of worker processes (-w here as -n is taken; --workers as the other scripts): Default=0 (will deploy all cores, less one for overhead), 1=serial',
+                        required=False,
+                        default=0,
+                        metavar='INTEGER',
+                        type=int)
+    
     args = vars(parser.parse_args())
     
     str_major_axis_ln_path = args['str_major_axis_ln_path']
@@ -310,13 +298,15 @@ if __name__ == '__main__':
     str_nhd_stream_path = args['str_nhd_stream_path']
     str_output_dir = args['str_output_dir']
     flt_mjr_axis = args['flt_mjr_axis']
+    int_workers = args['int_workers']
 
     
     fn_flip_major_axis(str_major_axis_ln_path,
                        str_aoi_ar_path,
                        str_nhd_stream_path,
                        str_output_dir,
-                       flt_mjr_axis)
+                       flt_mjr_axis,
+                       int_workers)
     
     flt_end_run = time.time()
     flt_time_pass = (flt_end_run - flt_start_run) // 1
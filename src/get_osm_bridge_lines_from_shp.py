@@ -14,11 +14,12 @@ import pandas as pd
 import shapely.geometry
 
 from multiprocessing.pool import ThreadPool
-from time import sleep
 
 import os
 import time
 import datetime
+
+from progress import fn_progress
 # ************************************************************
 
 
@@ -41,36 +42,6 @@ def fn_has_list(x):
 # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
 
-# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~   
-# Print iterations progress
-def fn_print_progress_bar (iteration,
-                           total,
-                           prefix = '', suffix = '',
-                           decimals = 0,
-                           length = 100, fill = '█',
-                           printEnd = "\r"):
-    """
-    from: https://stackoverflow.com/questions/3173320/text-progress-bar-in-the-console
-    Call in a loop to create terminal progress bar
-    Keyword arguments:
-        iteration   - Required  : current iteration (Int)
-        total       - Required  : total iterations (Int)
-        prefix      - Optional  : prefix string (Str)
-        suffix      - Optional  : suffix string (Str)
-        decimals    - Optional  : positive number of decimals in percent complete (Int)
-        length      - Optional  : character length of bar (Int)
-        fill        - Optional  : bar fill character (Str)
-        printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
-    """
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filledLength = int(length * iteration // total)
-    bar = fill * filledLength + '-' * (length - filledLength)
-    print(f'\r{prefix} |{bar}| {percent}% {suffix}', end = printEnd)
-    # Print New Line on Complete
-    if iteration == total: 
-        print()
-# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~   
-
 # -------------------------------------------------------
 def fn_fetch_osm_data(list_input_data):
     
@@ -268,22 +239,14 @@ def fn_get_osm_bridge_lines_from_shp(str_input_path,str_output_dir,str_field_nam
     # Multiple requested to OSM per polygon
     # on first pass ... each county could take up to 5 minutes
     
-    # Initial call to print 0% progress
     l = len(list_bboxes_all_polys)
     print(' ')
-
-    str_prefix = "Polygon " + str(1) + " of " + str(len(list_bboxes_all_polys))
-    fn_print_progress_bar(0, l, prefix = str_prefix , suffix = 'Complete', length = 36)
     
-    i = 0
     results = ThreadPool(10).imap_unordered(fn_fetch_osm_data,
                                             list_of_lists)
 
-    for str_requested_tile in results:
-        time.sleep(0.1)
-        i += 1
-        str_prefix = "Polygon " + str(i) + " of " + str(len(list_bboxes_all_polys))
-        fn_print_progress_bar(i, l, prefix = str_prefix, suffix = 'Complete', length = 36)
+    for str_requested_tile in fn_progress(results, l, 'Polygons'):
+        pass
     # **************************
     
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
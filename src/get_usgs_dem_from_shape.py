@@ -48,6 +48,8 @@ import rioxarray as rxr
 import time
 import datetime
 import warnings
+
+from progress import fn_progress
 # ************************************************************
 
 # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
@@ -141,37 +143,6 @@ def fn_get_features(gdf, int_poly_index):
     return [json.loads(gdf.to_json())['features'][int_poly_index]['geometry']]
 # >>>>>>>>>>>>>>>>>>>>>>>>
     
-# @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@    
-# Print iterations progress
-def fn_print_progress_bar (iteration,
-                           total,
-                           prefix = '', suffix = '',
-                           decimals = 0,
-                           length = 100, fill = '█',
-                           printEnd = "\r"):
-    """
-    from: https://stackoverflow.com/questions/3173320/text-progress-bar-in-the-console
-    Call in a loop to create terminal progress bar
-    Keyword arguments:
-        iteration   - Required  : current iteration (Int)
-        total       - Required  : total iterations (Int)
-        prefix      - Optional  : prefix string (Str)
-        suffix      - Optional  : suffix string (Str)
-        decimals    - Optional  : positive number of decimals in percent complete (Int)
-        length      - Optional  : character length of bar (Int)
-        fill        - Optional  : bar fill character (Str)
-        printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
-    """
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filledLength = int(length * iteration // total)
-    bar = fill * filledLength + '-' * (length - filledLength)
-    print(f'\r{prefix} |{bar}| {percent}% {suffix}', end = printEnd)
-    # Print New Line on Complete
-    if iteration == total: 
-        print()
-# @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@   
-
-
 
 def fn_get_usgs_dem_from_shape(str_input_path,
                                str_output_dir,
@@ -402,21 +373,16 @@ def fn_get_usgs_dem_from_shape(str_input_path,
         # Multi-threaded download
         # Downloading the DEM tiles from the list_str_url
         
-        # Initial call to print 0% progress
         l = len(list_str_url)
         print(' ')
 
-        str_prefix = "Polygon " + str(index_gdf_int + 1) + " of " + str(len(gdf_aoi_lambert))
-        fn_print_progress_bar(0, l, prefix = str_prefix , suffix = 'Complete', length = 36)
+        str_desc = "Polygon " + str(index_gdf_int + 1) + " of " + str(len(gdf_aoi_lambert))
         
-        i = 0
         results = ThreadPool(10).imap_unordered(fn_download_tiles,
                                                 list_merge_url_file)
     
-        for str_requested_tile in results:
-            time.sleep(0.1)
-            i += 1
-            fn_print_progress_bar(i, l, prefix = str_prefix, suffix = 'Complete', length = 36)
+        for str_requested_tile in fn_progress(results, l, str_desc):
+            pass
         # **************************
     
         dem_files = list_tile_download_path
@@ -0,0 +1,298 @@
+# Sample rasters at the points of a profile without reprojecting the
+# raster.  The points are moved to the crs of the raster and the cells are
+# found with the affine transform (nearest cell), reading only the window
+# that holds the points.
+#
+# Ground profiles are sampled from the bare earth DEM of the area of
+# interest (step 9) when its path is given.  Points that it does not cover are
+# filled from the USGS 3DEP WCS, requested as fixed grid tiles so that
+# bridges that share a tile share one request.  The tiles are downloaded
+# together on a thread pool.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.08
+# Last revised - 2023.03.11
+#
+# tx-bridge - used by the 8th processing script (attribute major axis)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import numpy as np
+import os
+
+import rasterio
+from rasterio.crs import CRS
+from rasterio.io import MemoryFile
+from rasterio.transform import from_origin
+from rasterio.warp import transform as warp_transform
+from rasterio.windows import Window
+
+from multiprocessing.pool import ThreadPool
+
+import urllib.request
+import time
+# ************************************************************
+
+
+STR_LAMBERT = "epsg:3857"
+INT_WCS_RESOLUTION = 1 # requested resolution in lambert units - meters
+INT_WCS_TILE = 512 # width of a requested ground tile - lambert units - meters
+INT_WCS_THREADS = 10 # simultaneous tile requests
+
+STR_WCS_URL_HEADER = r'https://elevation.nationalmap.gov/arcgis/services/3DEPElevation/ImageServer/WCSServer?'
+STR_WCS_URL_QUERY = r'SERVICE=WCS&VERSION=1.0.0&REQUEST=GetCoverage&coverage=DEP3Elevation&CRS=EPSG:3857&FORMAT=GeoTiff'
+
+# TODO - this is an override to use local WCS with geoserver - 2022.12.29
+# note that the coverage is 'cog'
+# note that format = 'geotiff' - all lower case
+#STR_WCS_URL_HEADER = r'http://localhost:8080/geoserver/fathom/wcs?'
+#STR_WCS_URL_QUERY = r'SERVICE=WCS&VERSION=1.0.0&REQUEST=GetCoverage&coverage=cog&CRS=EPSG:3857&FORMAT=geotiff'
+
+
+# .............................................
+def fn_sample_array_at_points(arr_raster, transform, flt_nodata, arr_x, arr_y, b_nearest_edge=False):
+
+    """
+    Value of the cell that contains each point (nan outside the array or
+    on nodata)
+
+    Args:
+        arr_raster: 2d numpy array
+        transform: affine transform of arr_raster
+        flt_nodata: nodata value of arr_raster (or None)
+        arr_x, arr_y: coordinates in the crs of the raster
+        b_nearest_edge: points outside the array get the nearest edge cell
+            (as xarray .sel(method="nearest")) instead of nan
+
+    Returns:
+        numpy array of float64
+    """
+
+    arr_col, arr_row = ~transform * (np.asarray(arr_x, dtype=np.float64),
+                                     np.asarray(arr_y, dtype=np.float64))
+    arr_col = np.floor(arr_col).astype(np.int64)
+    arr_row = np.floor(arr_row).astype(np.int64)
+
+    if b_nearest_edge:
+        arr_col = np.clip(arr_col, 0, arr_raster.shape[1] - 1)
+        arr_row = np.clip(arr_row, 0, arr_raster.shape[0] - 1)
+
+    arr_inside = ((arr_row >= 0) & (arr_row < arr_raster.shape[0]) &
+                  (arr_col >= 0) & (arr_col < arr_raster.shape[1]))
+
+    arr_values = np.full(len(arr_col), np.nan)
+    arr_values[arr_inside] = arr_raster[arr_row[arr_inside], arr_col[arr_inside]]
+
+    if flt_nodata is not None and not np.isnan(flt_nodata):
+        arr_values[arr_values == flt_nodata] = np.nan
+
+    return arr_values
+# .............................................
+
+
+# .............................................
+def fn_sample_raster_at_points(src, arr_x, arr_y, crs_points, b_nearest_edge=False):
+
+    """
+    Value of the cell that contains each point of an open raster (band 1).
+    The points are transformed to the crs of the raster and only the
+    window around the points is read.
+
+    Args:
+        src: open rasterio dataset
+        arr_x, arr_y: coordinates of the points
+        crs_points: crs of the points
+        b_nearest_edge: points outside the raster get the nearest edge cell
+            (as xarray .sel(method="nearest")) instead of nan
+
+    Returns:
+        numpy array of float64 (nan outside the raster - unless
+        b_nearest_edge - or on nodata)
+    """
+
+    if crs_points is not None and CRS.from_user_input(crs_points) != src.crs:
+        arr_x, arr_y = warp_transform(crs_points, src.crs, list(arr_x), list(arr_y))
+
+    arr_x = np.asarray(arr_x, dtype=np.float64)
+    arr_y = np.asarray(arr_y, dtype=np.float64)
+
+    arr_col, arr_row = ~src.transform * (arr_x, arr_y)
+    arr_col = np.floor(arr_col).astype(np.int64)
+    arr_row = np.floor(arr_row).astype(np.int64)
+
+    if b_nearest_edge:
+        arr_col = np.clip(arr_col, 0, src.width - 1)
+        arr_row = np.clip(arr_row, 0, src.height - 1)
+
+    arr_inside = ((arr_row >= 0) & (arr_row < src.height) &
+                  (arr_col >= 0) & (arr_col < src.width))
+
+    if not arr_inside.any():
+        return np.full(len(arr_x), np.nan)
+
+    int_row_min = int(arr_row[arr_inside].min())
+    int_col_min = int(arr_col[arr_inside].min())
+    window = Window(int_col_min,
+                    int_row_min,
+                    int(arr_col[arr_inside].max()) - int_col_min + 1,
+                    int(arr_row[arr_inside].max()) - int_row_min + 1)
+
+    arr_window = src.read(1, window=window).astype(np.float64)
+
+    return fn_sample_array_at_points(arr_window,
+                                     src.window_transform(window),
+                                     src.nodata,
+                                     arr_x,
+                                     arr_y,
+                                     b_nearest_edge)
+# .............................................
+
+
+# ---------------------------------------------
+def fn_fetch_wcs_tile(tup_tile):
+
+    """
+    Download one ground tile from the USGS WCS
+
+    Args:
+        tup_tile: (column, row) of the tile on the INT_WCS_TILE grid (lambert)
+
+    Returns:
+        tuple of tup_tile, numpy array (meters, nan on nodata) and affine
+        transform - array and transform are None if the download failed
+    """
+
+    flt_min_x = tup_tile[0] * INT_WCS_TILE
+    flt_min_y = tup_tile[1] * INT_WCS_TILE
+
+    str_bbox = (str(flt_min_x) + "," + str(flt_min_y) + "," +
+                str(flt_min_x + INT_WCS_TILE) + "," + str(flt_min_y + INT_WCS_TILE))
+
+    int_pixels = INT_WCS_TILE // INT_WCS_RESOLUTION
+
+    str_url = (STR_WCS_URL_HEADER + STR_WCS_URL_QUERY +
+               "&BBOX=" + str_bbox +
+               "&WIDTH=" + str(int_pixels) + "&HEIGHT=" + str(int_pixels))
+
+    int_num_retries = 5
+    int_backoff = 2 # exponential backoff delay
+    flt_delay_time = 0.5 # delay time in seconds
+
+    # TODO - 2022.11.15 - Service will retun strange ground (0 elevations and nan??)
+    for int_loop_count in range(1, int_num_retries + 1):
+        try:
+            # url request to get terrain
+            byte_response_raster = urllib.request.urlopen(str_url).read()
+
+            with MemoryFile(byte_response_raster) as memfile:
+                with memfile.open() as ground_terrain_src:
+                    arr_ground = ground_terrain_src.read(1).astype(np.float64)
+                    if ground_terrain_src.nodata is not None:
+                        arr_ground[arr_ground == ground_terrain_src.nodata] = np.nan
+
+                    # the tile transform - the response may not carry one
+                    transform = ground_terrain_src.transform
+                    if transform.is_identity:
+                        transform = from_origin(flt_min_x,
+                                                flt_min_y + INT_WCS_TILE,
+                                                INT_WCS_TILE / arr_ground.shape[1],
+                                                INT_WCS_TILE / arr_ground.shape[0])
+
+            return (tup_tile, arr_ground, transform)
+        except:
+            # exponential backoff
+            flt_loop_delay = int_loop_count ** int_backoff * flt_delay_time
+            print("error downloading " + str_url + " on trial no: " + str(int_loop_count))
+            time.sleep(flt_loop_delay) # backoff untill retry
+
+    return (tup_tile, None, None)
+# ---------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_get_ground_profiles(list_profile_xy, crs_points, str_bare_earth_dem, b_is_feet):
+
+    """
+    Ground elevation at the points of each profile
+
+    Args:
+        list_profile_xy: list of (arr_x, arr_y) - one per profile
+        crs_points: crs of the profile points
+        str_bare_earth_dem: path to the step 9 bare earth DEM ('' = none)
+            - vertical units are the same as b_is_feet (as step 9 writes it)
+        b_is_feet: return the elevations in feet
+
+    Returns:
+        list of numpy arrays of ground elevation (one per profile)
+    """
+
+    list_ground = [np.full(len(arr_x), np.nan) for arr_x, arr_y in list_profile_xy]
+
+    # ------------
+    # sample the bare earth DEM of the area of interest
+    if str_bare_earth_dem != '' and not os.path.isfile(str_bare_earth_dem):
+        print('  Bare earth DEM not found - ground from WCS: ' + str_bare_earth_dem)
+
+    if str_bare_earth_dem != '' and os.path.isfile(str_bare_earth_dem):
+        with rasterio.open(str_bare_earth_dem) as src:
+            for int_idx, (arr_x, arr_y) in enumerate(list_profile_xy):
+                if len(arr_x) > 0:
+                    list_ground[int_idx] = fn_sample_raster_at_points(src, arr_x, arr_y, crs_points)
+
+    # ------------
+    # points without ground - request the wcs tiles they fall on (once)
+    dict_missing_lambert = {}
+    set_tiles = set()
+
+    for int_idx, (arr_x, arr_y) in enumerate(list_profile_xy):
+        arr_missing = np.isnan(list_ground[int_idx])
+        if arr_missing.any():
+            list_x, list_y = warp_transform(crs_points, STR_LAMBERT,
+                                            list(np.asarray(arr_x)[arr_missing]),
+                                            list(np.asarray(arr_y)[arr_missing]))
+            arr_x_lambert = np.asarray(list_x)
+            arr_y_lambert = np.asarray(list_y)
+            dict_missing_lambert[int_idx] = (arr_missing, arr_x_lambert, arr_y_lambert)
+
+            arr_tile_col = np.floor(arr_x_lambert / INT_WCS_TILE).astype(np.int64)
+            arr_tile_row = np.floor(arr_y_lambert / INT_WCS_TILE).astype(np.int64)
+            set_tiles.update(zip(arr_tile_col.tolist(), arr_tile_row.tolist()))
+
+    if len(set_tiles) == 0:
+        return list_ground
+
+    print('  Requesting ' + str(len(set_tiles)) + ' ground tiles for ' +
+          str(len(dict_missing_lambert)) + ' profiles ...')
+
+    dict_tiles = {}
+    pool = ThreadPool(INT_WCS_THREADS)
+    for tup_tile, arr_tile, transform in pool.imap_unordered(fn_fetch_wcs_tile, sorted(set_tiles)):
+        if arr_tile is not None:
+            dict_tiles[tup_tile] = (arr_tile, transform)
+    pool.close()
+    pool.join()
+
+    # ------------
+    # fill the missing points from the tiles
+    flt_scale = 3.28084 if b_is_feet else 1.0
+
+    for int_idx, (arr_missing, arr_x_lambert, arr_y_lambert) in dict_missing_lambert.items():
+        arr_values = np.full(len(arr_x_lambert), np.nan)
+
+        arr_tile_col = np.floor(arr_x_lambert / INT_WCS_TILE).astype(np.int64)
+        arr_tile_row = np.floor(arr_y_lambert / INT_WCS_TILE).astype(np.int64)
+
+        for tup_tile in set(zip(arr_tile_col.tolist(), arr_tile_row.tolist())):
+            if tup_tile in dict_tiles:
+                arr_tile, transform = dict_tiles[tup_tile]
+                arr_in_tile = (arr_tile_col == tup_tile[0]) & (arr_tile_row == tup_tile[1])
+                arr_values[arr_in_tile] = fn_sample_array_at_points(arr_tile,
+                                                                    transform,
+                                                                    None,
+                                                                    arr_x_lambert[arr_in_tile],
+                                                                    arr_y_lambert[arr_in_tile])
+
+        list_ground[int_idx][arr_missing] = arr_values * flt_scale
+
+    return list_ground
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
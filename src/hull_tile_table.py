@@ -0,0 +1,163 @@
+# Many-to-many relation of the bridge hulls to the las tiles that contain
+# their points.  Written as an attribute table inside the hull GeoPackage
+# in step 2 and queried in step 5 - replaces the stringified 'las_paths'.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.06
+# Last revised - 2023.03.11
+#
+# tx-bridge - shared by the 2nd and 5th processing scripts
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import ast # converting sting of list to list (older hull files)
+import os
+import sqlite3
+# ************************************************************
+
+
+STR_HULL_TILE_TABLE = 'hull_las_tiles'
+INT_MAX_HULLS_PER_GROUP = 16 # most hulls gridded by one step 5 task
+
+
+# ..........................................................
+def fn_hull_tile_table_path(str_bridge_polygons_path):
+
+    """
+    Path of the GeoPackage that holds the hull-tile table.  Step 2 writes
+    a shapefile and a GeoPackage with the same name, so a shapefile path
+    is pointed at its GeoPackage.
+
+    Args:
+        str_bridge_polygons_path: path to the hull polygons (shp or gpkg)
+
+    Returns:
+        path to the GeoPackage
+    """
+
+    return os.path.splitext(str_bridge_polygons_path)[0] + '.gpkg'
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_write_hull_tile_table(str_gpkg_path, list_clouds_per_poly):
+
+    """
+    Write the hull to las tile relation as a GeoPackage attribute table
+
+    Args:
+        str_gpkg_path: path to the hull polygon GeoPackage (must exist)
+        list_clouds_per_poly: list (one per hull, in row order) of las paths
+
+    Returns:
+        nothing
+    """
+
+    list_rows = [(int_hull_idx, str_las_path)
+                 for int_hull_idx, list_clouds in enumerate(list_clouds_per_poly)
+                 for str_las_path in list_clouds]
+
+    conn = sqlite3.connect(str_gpkg_path)
+    try:
+        with conn:
+            conn.execute('DROP TABLE IF EXISTS ' + STR_HULL_TILE_TABLE)
+            conn.execute('CREATE TABLE ' + STR_HULL_TILE_TABLE +
+                         ' (hull_idx INTEGER NOT NULL, las_path TEXT NOT NULL)')
+            conn.executemany('INSERT INTO ' + STR_HULL_TILE_TABLE +
+                             ' (hull_idx, las_path) VALUES (?, ?)', list_rows)
+
+            # index both ways - by hull (step 5 lookup) and by tile (batching)
+            conn.execute('CREATE INDEX idx_' + STR_HULL_TILE_TABLE + '_hull ON ' +
+                         STR_HULL_TILE_TABLE + ' (hull_idx)')
+            conn.execute('CREATE INDEX idx_' + STR_HULL_TILE_TABLE + '_las ON ' +
+                         STR_HULL_TILE_TABLE + ' (las_path)')
+
+            # register as a (non-spatial) GeoPackage attributes table
+            conn.execute('DELETE FROM gpkg_contents WHERE table_name = ?',
+                         (STR_HULL_TILE_TABLE,))
+            conn.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier) " +
+                         "VALUES (?, 'attributes', ?)",
+                         (STR_HULL_TILE_TABLE, STR_HULL_TILE_TABLE))
+    finally:
+        conn.close()
+# ----------------------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_read_hull_tile_table(str_bridge_polygons_path, gdf_bridge_ar=None):
+
+    """
+    Read the hull to las tile relation
+
+    Args:
+        str_bridge_polygons_path: path to the hull polygons (shp or gpkg)
+        gdf_bridge_ar: hull geodataframe - only used as a fallback for
+            hull files written before the table existed ('las_paths' field)
+
+    Returns:
+        dictionary of hull_idx to list of las paths
+    """
+
+    dict_hull_clouds = {}
+
+    str_gpkg_path = fn_hull_tile_table_path(str_bridge_polygons_path)
+
+    b_has_table = False
+    if os.path.exists(str_gpkg_path):
+        conn = sqlite3.connect(str_gpkg_path)
+        try:
+            b_has_table = conn.execute("SELECT count(*) FROM sqlite_master " +
+                                       "WHERE type = 'table' AND name = ?",
+                                       (STR_HULL_TILE_TABLE,)).fetchone()[0] > 0
+            if b_has_table:
+                cursor = conn.execute('SELECT hull_idx, las_path FROM ' +
+                                      STR_HULL_TILE_TABLE + ' ORDER BY hull_idx, rowid')
+                for int_hull_idx, str_las_path in cursor:
+                    dict_hull_clouds.setdefault(int_hull_idx, []).append(str_las_path)
+        finally:
+            conn.close()
+
+    if not b_has_table and gdf_bridge_ar is not None:
+        # older hull file - parse the stringified list
+        for int_hull_idx, str_las_paths in enumerate(gdf_bridge_ar['las_paths']):
+            dict_hull_clouds[int_hull_idx] = ast.literal_eval(str_las_paths)
+
+    return dict_hull_clouds
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ..........................................................
+def fn_group_hulls_by_tiles(list_hull_clouds, int_max_hulls=INT_MAX_HULLS_PER_GROUP):
+
+    """
+    Group the hulls for the step 5 tasks.  Hulls that need exactly the
+    same las tiles are grouped so the tiles are read once for all of them;
+    a group is split every int_max_hulls hulls.  Hulls that straddle a tile
+    edge are not chained to their neighbors, so the groups (and the tiles
+    each task reads) stay small on contiguous tiling and the pool keeps
+    enough tasks for its workers.
+
+    Args:
+        list_hull_clouds: list (one per hull) of lists of las file paths
+        int_max_hulls: maximum number of hulls in a group
+
+    Returns:
+        list of tuples (list of hull positions, sorted list of las paths)
+    """
+
+    int_max_hulls = max(int(int_max_hulls), 1)
+
+    # hulls keyed by the set of las tiles they need
+    dict_tiles_hulls = {}
+    for int_pos, list_clouds in enumerate(list_hull_clouds):
+        tup_clouds = tuple(sorted(set(list_clouds)))
+        dict_tiles_hulls.setdefault(tup_clouds, []).append(int_pos)
+
+    list_groups = []
+    for tup_clouds, list_pos in dict_tiles_hulls.items():
+        for int_start in range(0, len(list_pos), int_max_hulls):
+            list_groups.append((list_pos[int_start:int_start + int_max_hulls],
+                                list(tup_clouds)))
+
+    return list_groups
+# ..........................................................
@@ -0,0 +1,302 @@
+# Similarity of road and stream names (NBI, OpenStreetMap and NHD).  Names
+# are normalized first ('Farm to Market 1826', 'FM-1826' and 'FM1826' are
+# all 'fm 1826') and the normalized names are cached.  Lists of name pairs
+# are scored together: the ratio 2 * (longest common subsequence) / (total
+# length) is computed for all of the pairs at once with a bit-parallel
+# numpy kernel - one metric for names of every length.  The ratio is never
+# below the difflib ratio (difflib's matching blocks are a common
+# subsequence); difflib is kept as a backend for comparison.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.10
+# Last revised - 2023.03.11
+#
+# tx-bridge - shared by the sub-processes of the 8th processing script
+# (conflate nbi, plot cross sections)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import difflib # compare two string and score
+import functools
+import numpy as np
+import re
+
+import time
+# ************************************************************
+
+
+INT_WORD_BITS = 64 # characters of a name per word of the numpy kernel
+
+# single words to a common form
+DICT_NAME_WORDS = {'interstate': 'ih',
+                   'i': 'ih',
+                   'hwy': 'highway',
+                   'hiway': 'highway',
+                   'rd': 'road',
+                   'st': 'street',
+                   'ave': 'avenue',
+                   'av': 'avenue',
+                   'blvd': 'boulevard',
+                   'dr': 'drive',
+                   'ln': 'lane',
+                   'pkwy': 'parkway',
+                   'fwy': 'freeway',
+                   'expy': 'expressway',
+                   'north': 'n',
+                   'south': 's',
+                   'east': 'e',
+                   'west': 'w',
+                   'bus': 'business',
+                   'crk': 'creek',
+                   'ck': 'creek',
+                   'trib': 'tributary',
+                   'trb': 'tributary',
+                   'br': 'branch',
+                   'bra': 'branch',
+                   'riv': 'river',
+                   'rvr': 'river'}
+
+# phrases (of common form words) to a route abbreviation - longest first
+LIST_NAME_PHRASES = [('farm to market road', 'fm'),
+                     ('farm to market', 'fm'),
+                     ('ranch to market road', 'rm'),
+                     ('ranch to market', 'rm'),
+                     ('ranch road', 'rm'),
+                     ('state highway', 'sh'),
+                     ('us highway', 'us'),
+                     ('u s highway', 'us'),
+                     ('u s', 'us'),
+                     ('ih highway', 'ih'),
+                     ('county road', 'cr'),
+                     ('park road', 'pr'),
+                     ('state loop', 'loop'),
+                     ('state spur', 'spur')]
+
+
+# ..........................................................
+@functools.lru_cache(maxsize=65536)
+def fn_normalize_name(str_name):
+
+    """
+    Lower case name with the road and stream words in a common form
+
+    Args:
+        str_name: road or stream name (e.g. 'FM0969', 'Farm-to-Market 969')
+
+    Returns:
+        normalized name (e.g. 'fm 969')
+    """
+
+    str_norm = str_name.lower()
+
+    # punctuation to spaces
+    str_norm = re.sub(r'[^a-z0-9 ]+', ' ', str_norm)
+
+    # split route letters from numbers and drop leading zeros: fm0969 = fm 969
+    str_norm = re.sub(r'([a-z])([0-9])', r'\1 \2', str_norm)
+    str_norm = re.sub(r'([0-9])([a-z])', r'\1 \2', str_norm)
+    str_norm = re.sub(r'\b0+([0-9])', r'\1', str_norm)
+
+    list_words = [DICT_NAME_WORDS.get(str_word, str_word) for str_word in str_norm.split()]
+    str_norm = ' ' + ' '.join(list_words) + ' '
+
+    for str_phrase, str_abbrev in LIST_NAME_PHRASES:
+        str_norm = str_norm.replace(' ' + str_phrase + ' ', ' ' + str_abbrev + ' ')
+
+    return str_norm.strip()
+# ..........................................................
+
+
+# ..........................................................
+def fn_popcount(arr_uint64):
+
+    """
+    Number of set bits of each value of a uint64 array
+    """
+
+    arr_bytes = arr_uint64.reshape(-1, 1).view(np.uint8)
+    return np.unpackbits(arr_bytes, axis=1).sum(axis=1).astype(np.int64)
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_lcs_length(list_a, list_b):
+
+    """
+    Length of the longest common subsequence of each pair of strings - all
+    pairs at once (bit-parallel, Hyyro 2004).  The characters of a are the
+    bits of INT_WORD_BITS wide words, so strings of any length are scored
+    the same way.
+
+    Args:
+        list_a, list_b: lists of strings of the same length
+
+    Returns:
+        numpy array of int64
+    """
+
+    int_pairs = len(list_a)
+    if int_pairs == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    arr_len_a = np.array([len(str_a) for str_a in list_a], dtype=np.int64)
+    arr_len_b = np.array([len(str_b) for str_b in list_b], dtype=np.int64)
+    int_max_a = max(int(arr_len_a.max()), 1)
+    int_max_b = max(int(arr_len_b.max()), 1)
+    int_words = (int_max_a + INT_WORD_BITS - 1) // INT_WORD_BITS
+
+    # characters as code points - padding never matches (-1 vs -2)
+    arr_a = np.full((int_pairs, int_words * INT_WORD_BITS), -1, dtype=np.int64)
+    arr_b = np.full((int_pairs, int_max_b), -2, dtype=np.int64)
+    for int_row in range(int_pairs):
+        arr_a[int_row, :arr_len_a[int_row]] = [ord(c) for c in list_a[int_row]]
+        arr_b[int_row, :arr_len_b[int_row]] = [ord(c) for c in list_b[int_row]]
+
+    # (pair, word, bit)
+    arr_a = arr_a.reshape(int_pairs, int_words, INT_WORD_BITS)
+    arr_bit = np.left_shift(np.uint64(1), np.arange(INT_WORD_BITS, dtype=np.uint64))
+
+    arr_v = np.full((int_pairs, int_words), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for int_col in range(int_max_b):
+        # positions in a that match the character of b
+        arr_match = np.where(arr_a == arr_b[:, int_col, np.newaxis, np.newaxis], arr_bit, np.uint64(0))
+        arr_match = np.bitwise_or.reduce(arr_match, axis=2)
+
+        arr_u = arr_v & arr_match
+
+        # v + u with the carry passed from the lower to the higher words
+        arr_sum = np.empty_like(arr_v)
+        arr_carry = np.zeros(int_pairs, dtype=np.uint64)
+        for int_word in range(int_words):
+            arr_sum_word = arr_v[:, int_word] + arr_u[:, int_word]
+            arr_carry_word = arr_sum_word < arr_v[:, int_word]
+            arr_sum[:, int_word] = arr_sum_word + arr_carry
+            arr_carry = (arr_carry_word | (arr_sum[:, int_word] < arr_sum_word)).astype(np.uint64)
+
+        # u is a subset of the bits of v - v - u has no borrow
+        arr_v = arr_sum | (arr_v ^ arr_u)
+
+    # bits of a that are zero = matched characters
+    arr_bits_in_word = np.clip(arr_len_a[:, np.newaxis] - INT_WORD_BITS * np.arange(int_words), 0, INT_WORD_BITS)
+    arr_mask_a = np.where(arr_bits_in_word >= INT_WORD_BITS,
+                          np.iinfo(np.uint64).max,
+                          np.left_shift(np.uint64(1), np.minimum(arr_bits_in_word, INT_WORD_BITS - 1).astype(np.uint64)) - np.uint64(1))
+    arr_mask_a = arr_mask_a.astype(np.uint64)
+
+    return fn_popcount(~arr_v & arr_mask_a).reshape(int_pairs, int_words).sum(axis=1)
+# ----------------------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_name_similarity(list_a, list_b, b_normalize=True, str_backend='lcs'):
+
+    """
+    Similarity (0 to 1) of each pair of names
+
+    Args:
+        list_a, list_b: lists (or arrays) of names of the same length
+        b_normalize: compare the normalized names (fn_normalize_name),
+            otherwise the lower case names
+        str_backend: 'lcs' = numpy kernel, 'difflib' = difflib
+            SequenceMatcher ratio
+
+    Returns:
+        numpy array of float64 - 2 * matches / (len_a + len_b), 1 where both
+        names are empty
+    """
+
+    if b_normalize:
+        list_a = [fn_normalize_name(str_a) for str_a in list_a]
+        list_b = [fn_normalize_name(str_b) for str_b in list_b]
+    else:
+        list_a = [str_a.lower() for str_a in list_a]
+        list_b = [str_b.lower() for str_b in list_b]
+
+    # each unique pair is scored once
+    dict_pair_pos = {}
+    list_pair_pos = []
+    for tup_pair in zip(list_a, list_b):
+        list_pair_pos.append(dict_pair_pos.setdefault(tup_pair, len(dict_pair_pos)))
+
+    list_unique_a = [tup_pair[0] for tup_pair in dict_pair_pos]
+    list_unique_b = [tup_pair[1] for tup_pair in dict_pair_pos]
+
+    arr_total = np.array([len(str_a) + len(str_b) for str_a, str_b in dict_pair_pos], dtype=np.float64)
+    arr_matches = np.zeros(len(dict_pair_pos), dtype=np.float64)
+
+    if str_backend == 'lcs':
+        arr_matches[:] = fn_lcs_length(list_unique_a, list_unique_b)
+    else:
+        for int_pos, (str_a, str_b) in enumerate(dict_pair_pos):
+            seq = difflib.SequenceMatcher(a=str_a, b=str_b)
+            arr_matches[int_pos] = sum(block.size for block in seq.get_matching_blocks())
+
+    arr_ratio = np.ones(len(dict_pair_pos), dtype=np.float64)
+    arr_has_chars = arr_total > 0
+    arr_ratio[arr_has_chars] = 2.0 * arr_matches[arr_has_chars] / arr_total[arr_has_chars]
+
+    return arr_ratio[np.array(list_pair_pos, dtype=np.int64)]
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ..........................................................
+def fn_benchmark_name_similarity(list_a, list_b):
+
+    """
+    Compare fn_name_similarity (without normalization) to difflib ratio of
+    the lower case names - scores and time
+
+    Returns:
+        dictionary of the max and mean score difference and the seconds of
+        each method
+    """
+
+    flt_start = time.time()
+    arr_difflib = np.array([difflib.SequenceMatcher(a=str_a.lower(), b=str_b.lower()).ratio()
+                            for str_a, str_b in zip(list_a, list_b)])
+    flt_difflib_sec = time.time() - flt_start
+
+    flt_start = time.time()
+    arr_lcs = fn_name_similarity(list_a, list_b, b_normalize=False)
+    flt_lcs_sec = time.time() - flt_start
+
+    arr_diff = np.abs(arr_lcs - arr_difflib)
+
+    return {'pairs': len(list_a),
+            'max_diff': float(arr_diff.max()) if len(arr_diff) > 0 else 0.0,
+            'mean_diff': float(arr_diff.mean()) if len(arr_diff) > 0 else 0.0,
+            'share_equal': float((arr_diff < 1e-9).mean()) if len(arr_diff) > 0 else 1.0,
+            'difflib_sec': flt_difflib_sec,
+            'lcs_sec': flt_lcs_sec}
+# ..........................................................
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+
+    # parity and speed of the numpy kernel against difflib on a sample of
+    # road and stream names
+    list_names = ['FM 1826', 'Farm to Market 1826', 'FM1826', 'RM 2222', 'Ranch Road 2222',
+                  'IH0035', 'Interstate 35', 'I-35', 'SH 71', 'State Highway 71',
+                  'US 290', 'US Highway 290', 'W William Cannon Dr', 'West William Cannon Drive',
+                  'Onion Creek', 'ONION CRK', 'Trib to Onion Creek', 'Barton Creek',
+                  'Slaughter Creek', 'Colorado River', 'Brushy Creek', 'CR 110', 'County Road 110',
+                  'Loop 1', 'MoPac Expressway', 'S Congress Ave', 'South Congress Avenue']
+
+    rng = np.random.default_rng(0)
+    arr_pick = rng.integers(0, len(list_names), size=(20000, 2))
+
+    list_a = [list_names[i] for i in arr_pick[:, 0]]
+    list_b = [list_names[i] for i in arr_pick[:, 1]]
+
+    dict_bench = fn_benchmark_name_similarity(list_a, list_b)
+
+    print('  Pairs: ' + str(dict_bench['pairs']))
+    print('  difflib: ' + str(round(dict_bench['difflib_sec'], 3)) + ' sec')
+    print('  lcs kernel: ' + str(round(dict_bench['lcs_sec'], 3)) + ' sec')
+    print('  Share of equal scores: ' + str(round(dict_bench['share_equal'], 3)))
+    print('  Max / mean difference: ' + str(round(dict_bench['max_diff'], 3)) +
+          ' / ' + str(round(dict_bench['mean_diff'], 4)))
+
+    print('  Normalized: ' + fn_normalize_name('Farm-to-Market Rd 0969') + ' | ' + fn_normalize_name('FM0969'))
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -0,0 +1,190 @@
+# Indexed access to the National Bridge Inventory (nbi) points.  The
+# statewide nbi shapefile is converted once into a GeoPackage in the
+# pipeline crs holding only the fields the pipeline uses.  The points are
+# written in grid cell order and the GeoPackage keeps its spatial (rtree)
+# index, so the points of an area of interest are read with a bounding box
+# query instead of reading, projecting and clipping the whole state.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.10
+# Last revised - 2023.03.10
+#
+# tx-bridge - used by the sub-processes of the 8th processing script
+# (conflate nbi)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import argparse
+import geopandas as gpd
+import numpy as np
+import os
+
+import time
+import datetime
+# ************************************************************
+
+
+STR_NBI_LAYER = 'nbi_bridges'
+LIST_NBI_FIELDS = ['Asset_Name', 'Bridge_Thi', 'Facility_C', 'Feature_In', 'Structur_1']
+
+
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+def is_valid_file(parser, arg):
+    if not os.path.exists(arg):
+        parser.error("The file %s does not exist" % arg)
+    else:
+        # File exists so return the directory
+        return arg
+        return open(arg, 'r')  # return an open file handle
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+
+# ..........................................................
+def fn_nbi_store_path(str_nbi_shp_path):
+
+    """
+    Default path of the nbi store of a statewide nbi shapefile
+    """
+
+    return os.path.splitext(str_nbi_shp_path)[0] + '_store.gpkg'
+# ..........................................................
+
+
+# ..........................................................
+def fn_is_nbi_store(str_path):
+
+    """
+    Is the path an nbi store (GeoPackage from fn_build_nbi_store)
+    """
+
+    return str_path.lower().endswith('.gpkg') and os.path.isfile(str_path)
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_build_nbi_store(str_nbi_shp_path,
+                       str_store_path,
+                       str_store_crs='EPSG:3857',
+                       flt_cell_size=10000.0):
+
+    """
+    One-time conversion of the statewide nbi points to an indexed GeoPackage
+
+    Args:
+        str_nbi_shp_path: path to the statewide nbi shapefile
+        str_store_path: path of the GeoPackage to write
+        str_store_crs: crs of the store (crs of the pipeline)
+        flt_cell_size: width of the grid cells used to order the points
+
+    Returns:
+        nothing
+    """
+
+    gdf_nbi_pnt = gpd.read_file(str_nbi_shp_path)
+    gdf_nbi_pnt = gdf_nbi_pnt[LIST_NBI_FIELDS + ['geometry']]
+    gdf_nbi_pnt = gdf_nbi_pnt[~gdf_nbi_pnt.geometry.is_empty & gdf_nbi_pnt.geometry.notna()]
+    gdf_nbi_pnt = gdf_nbi_pnt.to_crs(str_store_crs)
+
+    # points that are near each other are written near each other
+    arr_cell_x = np.floor(gdf_nbi_pnt.geometry.x.values / flt_cell_size).astype(np.int64)
+    arr_cell_y = np.floor(gdf_nbi_pnt.geometry.y.values / flt_cell_size).astype(np.int64)
+    arr_order = np.lexsort((gdf_nbi_pnt.geometry.x.values, arr_cell_x, arr_cell_y))
+
+    gdf_nbi_pnt = gdf_nbi_pnt.iloc[arr_order].reset_index(drop=True)
+
+    # GeoPackage is written with its rtree spatial index
+    gdf_nbi_pnt.to_file(str_store_path, driver='GPKG', layer=STR_NBI_LAYER)
+
+    print('  NBI points written: ' + str(len(gdf_nbi_pnt)))
+# ----------------------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_read_nbi_in_aoi(str_nbi_path, gdf_aoi_ar, crs_out):
+
+    """
+    NBI points within the area of interest
+
+    Args:
+        str_nbi_path: nbi store (GeoPackage) or statewide nbi shapefile - a
+            store next to the shapefile (fn_nbi_store_path) is used if found
+        gdf_aoi_ar: geodataframe of the area of interest polygon(s)
+        crs_out: crs of the returned points
+
+    Returns:
+        geodataframe of the nbi points clipped to the area of interest
+    """
+
+    gdf_aoi_ar_local_prj = gdf_aoi_ar.to_crs(crs_out)
+
+    str_store_path = str_nbi_path
+    if not fn_is_nbi_store(str_store_path):
+        str_store_path = fn_nbi_store_path(str_nbi_path)
+
+    if fn_is_nbi_store(str_store_path):
+        # only the points in the bounding box of the aoi are read (rtree)
+        gdf_nbi_pnt = gpd.read_file(str_store_path,
+                                    layer=STR_NBI_LAYER,
+                                    bbox=gdf_aoi_ar)
+    else:
+        # no store - read the statewide shapefile
+        gdf_nbi_pnt = gpd.read_file(str_nbi_path)
+
+    gdf_nbi_pnt_local_prj = gdf_nbi_pnt.to_crs(crs_out)
+
+    # clip the nbi points to the area-of-interest
+    gdf_nbi_pnts_in_aoi_local_prj = gpd.clip(
+        gdf_nbi_pnt_local_prj,  gdf_aoi_ar_local_prj, keep_geom_type=True)
+
+    return gdf_nbi_pnts_in_aoi_local_prj
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+
+    flt_start_run = time.time()
+
+    parser = argparse.ArgumentParser(description='============= INDEXED STORE OF NATIONAL BRIDGE INVENTORY =============')
+
+    parser.add_argument('-i',
+                        dest = "str_nbi_shp_path",
+                        help=r'REQUIRED: path to statewide nbi shapefile Example: G:\X-NBI\nbi_bridges_texas_4326.shp',
+                        required=True,
+                        metavar='FILE',
+                        type=lambda x: is_valid_file(parser, x))
+
+    parser.add_argument('-o',
+                        dest = "str_store_path",
+                        help=r'OPTIONAL: GeoPackage to write: Default=next to the shapefile Example: G:\X-NBI\nbi_bridges_texas_4326_store.gpkg',
+                        required=False,
+                        default='',
+                        metavar='FILE',
+                        type=str)
+
+    parser.add_argument('-c',
+                        dest = "str_store_crs",
+                        help='OPTIONAL: crs of the store: Default=EPSG:3857',
+                        required=False,
+                        default='EPSG:3857',
+                        metavar='STRING',
+                        type=str)
+
+    args = vars(parser.parse_args())
+
+    str_store_path = args['str_store_path']
+    if str_store_path == '':
+        str_store_path = fn_nbi_store_path(args['str_nbi_shp_path'])
+
+    fn_build_nbi_store(args['str_nbi_shp_path'],
+                       str_store_path,
+                       args['str_store_crs'])
+
+    print('  Store written: ' + str_store_path)
+
+    flt_end_run = time.time()
+    flt_time_pass = (flt_end_run - flt_start_run) // 1
+    time_pass = datetime.timedelta(seconds=flt_time_pass)
+
+    print('Compute Time: ' + str(time_pass))
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -0,0 +1,129 @@
+# Nearest stream (or any other feature, such as nbi points) to each major axis line in
+# one spatial-index query, instead of measuring the distance to every
+# stream for every axis.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.09
+# Last revised - 2023.03.11
+#
+# tx-bridge - shared by the sub-processes of the 8th processing script
+# (assign feature id, fetch hand rating curves, conflate nbi)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from shapely.strtree import STRtree
+# ************************************************************
+
+
+STR_DIST_FIELD = 'dist_nearest'
+FLT_NEAREST_STREAM_SEARCH = 500 # first search radius for the nearest stream (crs units)
+
+
+# .........................................................
+def fn_nearest_feature_strtree(gdf_mjr_axis_ln, gdf_features, flt_max_distance=None):
+
+    """
+    Position (iloc) in gdf_features of the nearest feature to each axis and
+    its distance - with the shapely STRtree (geopandas without sjoin_nearest)
+
+    Returns:
+        arr_pos (-1 where none within flt_max_distance), arr_dist
+    """
+
+    list_geom = list(gdf_features.geometry)
+    tree = STRtree(list_geom, items=list(range(len(list_geom))))
+
+    arr_pos = np.full(len(gdf_mjr_axis_ln), -1, dtype=np.int64)
+    arr_dist = np.full(len(gdf_mjr_axis_ln), np.nan)
+
+    for int_row, shp_axis in enumerate(gdf_mjr_axis_ln.geometry):
+        int_pos = tree.nearest_item(shp_axis)
+        if int_pos is None:
+            continue
+
+        flt_dist = shp_axis.distance(list_geom[int_pos])
+        if flt_max_distance is None or flt_dist <= flt_max_distance:
+            arr_pos[int_row] = int_pos
+            arr_dist[int_row] = flt_dist
+
+    return arr_pos, arr_dist
+# .........................................................
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_nearest_feature(gdf_mjr_axis_ln,
+                       gdf_features,
+                       list_fields,
+                       flt_max_distance=None,
+                       b_search_beyond=True):
+
+    """
+    Attributes of, and distance to, the nearest feature of each axis line
+
+    Args:
+        gdf_mjr_axis_ln: geodataframe of the major axis lines
+        gdf_features: geodataframe of the features (streams) - same crs
+        list_fields: fields of gdf_features to return
+        flt_max_distance: search radius (crs units) (None = no radius)
+        b_search_beyond: axes with nothing within the radius are searched
+            again without a limit, so every axis gets a feature
+
+    Returns:
+        pandas dataframe on the index of gdf_mjr_axis_ln with list_fields,
+        STR_DIST_FIELD and 'pos_nearest' (iloc of the feature, -1 if none)
+    """
+
+    df_nearest = pd.DataFrame(index=gdf_mjr_axis_ln.index,
+                              columns=list_fields + [STR_DIST_FIELD],
+                              dtype=object)
+
+    if len(gdf_mjr_axis_ln) == 0 or len(gdf_features) == 0:
+        df_nearest[STR_DIST_FIELD] = np.nan
+        df_nearest['pos_nearest'] = -1
+        return df_nearest
+
+    gdf_left = gpd.GeoDataFrame(geometry=gdf_mjr_axis_ln.geometry.values,
+                                crs=gdf_mjr_axis_ln.crs)
+    gdf_right = gpd.GeoDataFrame(geometry=gdf_features.geometry.values,
+                                 crs=gdf_features.crs)
+
+    try:
+        # one vectorized query (needs pygeos or shapely 2)
+        gdf_join = gpd.sjoin_nearest(gdf_left, gdf_right,
+                                     how='left',
+                                     max_distance=flt_max_distance,
+                                     distance_col=STR_DIST_FIELD)
+
+        # equidistant features - keep the first
+        gdf_join = gdf_join[~gdf_join.index.duplicated(keep='first')].sort_index()
+
+        arr_pos = gdf_join['index_right'].fillna(-1).astype(np.int64).values
+        arr_dist = gdf_join[STR_DIST_FIELD].astype(float).values
+    except NotImplementedError:
+        arr_pos, arr_dist = fn_nearest_feature_strtree(gdf_left, gdf_right, flt_max_distance)
+
+    # nothing within the radius - search again without a limit
+    arr_missing = arr_pos < 0
+    if b_search_beyond and flt_max_distance is not None and arr_missing.any():
+        df_beyond = fn_nearest_feature(gdf_mjr_axis_ln.iloc[np.flatnonzero(arr_missing)],
+                                       gdf_features,
+                                       [],
+                                       None)
+        arr_pos[arr_missing] = df_beyond['pos_nearest'].values
+        arr_dist[arr_missing] = df_beyond[STR_DIST_FIELD].values
+
+    arr_found = arr_pos >= 0
+    for str_field in list_fields:
+        arr_values = np.full(len(arr_pos), np.nan, dtype=object)
+        arr_values[arr_found] = gdf_features[str_field].values[arr_pos[arr_found]]
+        df_nearest[str_field] = arr_values
+
+    df_nearest[STR_DIST_FIELD] = arr_dist
+    df_nearest['pos_nearest'] = arr_pos
+
+    return df_nearest
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -0,0 +1,267 @@
+# Indexed access to the NHD flowlines.  The statewide NHD GeoPackage is
+# converted once into a folder of spatially partitioned GeoPackages (grid
+# cells) in the pipeline crs holding only the fields the pipeline uses.
+# Bounding box queries only open the partitions they touch and recently
+# loaded partitions are kept in memory, so batch runs over many areas of
+# interest do not re-read and re-project the statewide file.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.07
+# Last revised - 2023.03.07
+#
+# tx-bridge - shared by the 6th processing scripts (flip major axis)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import argparse
+import functools
+import geopandas as gpd
+import json
+import os
+import pandas as pd
+from pyproj import Transformer
+from shapely.geometry import box
+
+import time
+import datetime
+# ************************************************************
+
+
+STR_STORE_INDEX = 'nhd_flowline_index.json'
+STR_FLOWLINE_LAYER = 'NHDFlowline'
+LIST_NHD_FIELDS = ['GNIS_NAME', 'REACHCODE']
+INT_PARTITION_CACHE = 32 # number of partitions kept in memory
+
+
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+def is_valid_file(parser, arg):
+    if not os.path.exists(arg):
+        parser.error("The file %s does not exist" % arg)
+    else:
+        # File exists so return the directory
+        return arg
+        return open(arg, 'r')  # return an open file handle
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+
+# ..........................................................
+def fn_is_nhd_store(str_path):
+
+    """
+    Is the path a partitioned nhd flowline store (from fn_build_nhd_store)
+    """
+
+    return os.path.isfile(os.path.join(str_path, STR_STORE_INDEX))
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_build_nhd_store(str_nhd_gpkg_path,
+                       str_store_dir,
+                       str_store_crs='EPSG:3857',
+                       flt_cell_size=50000.0,
+                       int_rows_per_read=200000):
+
+    """
+    One-time conversion of the NHD flowlines to grid cell partitions
+
+    Args:
+        str_nhd_gpkg_path: path to the statewide NHD GeoPackage
+        str_store_dir: folder to write the partitions and the index
+        str_store_crs: crs of the partitions (crs of the pipeline)
+        flt_cell_size: width of the grid cells (store crs units)
+        int_rows_per_read: flowlines read from the source at a time
+
+    Returns:
+        nothing
+    """
+
+    os.makedirs(str_store_dir, exist_ok=True)
+
+    # partition id to bounds of the flowlines written to it
+    dict_partition_bounds = {}
+
+    int_start = 0
+    while True:
+        gdf_chunk = gpd.read_file(str_nhd_gpkg_path,
+                                  layer=STR_FLOWLINE_LAYER,
+                                  rows=slice(int_start, int_start + int_rows_per_read))
+        if len(gdf_chunk) == 0:
+            break
+        int_start += int_rows_per_read
+
+        # TODO - 2022.12.30 - are the field names of NHD serivce lower case?
+        gdf_chunk.columns = [str_col.upper() if str_col.upper() in LIST_NHD_FIELDS else str_col
+                             for str_col in gdf_chunk.columns]
+        gdf_chunk = gdf_chunk[LIST_NHD_FIELDS + ['geometry']]
+        gdf_chunk = gdf_chunk[~gdf_chunk.geometry.is_empty & gdf_chunk.geometry.notna()]
+        gdf_chunk = gdf_chunk.to_crs(str_store_crs)
+
+        # a flowline belongs to the cell of its lower left corner - the
+        # partition bounds (not the cell) are used to answer queries
+        df_bounds = gdf_chunk.bounds
+        ser_cell_x = (df_bounds['minx'] // flt_cell_size).astype(int)
+        ser_cell_y = (df_bounds['miny'] // flt_cell_size).astype(int)
+        ser_partition = ser_cell_x.astype(str) + '_' + ser_cell_y.astype(str)
+
+        for str_partition, arr_idx in gdf_chunk.groupby(ser_partition.values).indices.items():
+            gdf_part = gdf_chunk.iloc[arr_idx]
+            str_part_path = os.path.join(str_store_dir, 'nhd_' + str_partition + '.gpkg')
+
+            if str_partition in dict_partition_bounds:
+                gdf_part.to_file(str_part_path, driver='GPKG', mode='a')
+                list_prev = dict_partition_bounds[str_partition]
+                list_new = gdf_part.total_bounds.tolist()
+                dict_partition_bounds[str_partition] = [min(list_prev[0], list_new[0]),
+                                                        min(list_prev[1], list_new[1]),
+                                                        max(list_prev[2], list_new[2]),
+                                                        max(list_prev[3], list_new[3])]
+            else:
+                gdf_part.to_file(str_part_path, driver='GPKG')
+                dict_partition_bounds[str_partition] = gdf_part.total_bounds.tolist()
+
+        print('  Flowlines partitioned: ' + str(int_start))
+
+    dict_index = {'crs': str_store_crs,
+                  'cell_size': flt_cell_size,
+                  'partitions': {'nhd_' + str_part + '.gpkg': list_bounds
+                                 for str_part, list_bounds in dict_partition_bounds.items()}}
+
+    # index last - a folder without the index is not a usable store
+    with open(os.path.join(str_store_dir, STR_STORE_INDEX), 'w') as f:
+        json.dump(dict_index, f, indent=1)
+
+    print('  Partitions written: ' + str(len(dict_partition_bounds)))
+# ----------------------------------------------------------
+
+
+# ..........................................................
+@functools.lru_cache(maxsize=8)
+def fn_read_nhd_store_index(str_store_dir):
+
+    """
+    Read (once) the index of a partitioned nhd flowline store
+
+    Returns:
+        dictionary with 'crs', 'cell_size' and 'partitions' (file name to
+        [minx, miny, maxx, maxy])
+    """
+
+    with open(os.path.join(str_store_dir, STR_STORE_INDEX)) as f:
+        return json.load(f)
+# ..........................................................
+
+
+# ..........................................................
+@functools.lru_cache(maxsize=INT_PARTITION_CACHE)
+def fn_load_nhd_partition(str_partition_path):
+
+    """
+    Read one partition - the most recently used are kept in memory.  The
+    returned geodataframe is shared; do not modify it in place.
+    """
+
+    return gpd.read_file(str_partition_path)
+# ..........................................................
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_query_nhd_flowlines(str_store_dir, tup_bbox, crs_bbox=None):
+
+    """
+    NHD flowlines that intersect a bounding box
+
+    Args:
+        str_store_dir: folder of the partitioned store
+        tup_bbox: (minx, miny, maxx, maxy)
+        crs_bbox: crs of the bounding box (None = crs of the store)
+
+    Returns:
+        geodataframe of GNIS_NAME, REACHCODE and geometry in the store crs
+    """
+
+    dict_index = fn_read_nhd_store_index(str_store_dir)
+    str_store_crs = dict_index['crs']
+
+    if crs_bbox is not None:
+        transformer = Transformer.from_crs(crs_bbox, str_store_crs, always_xy=True)
+        tup_bbox = transformer.transform_bounds(*tup_bbox)
+
+    flt_minx, flt_miny, flt_maxx, flt_maxy = tup_bbox
+
+    list_gdf = []
+    for str_part_file, list_bounds in dict_index['partitions'].items():
+        if (list_bounds[0] > flt_maxx or list_bounds[2] < flt_minx or
+                list_bounds[1] > flt_maxy or list_bounds[3] < flt_miny):
+            continue
+
+        gdf_part = fn_load_nhd_partition(os.path.join(str_store_dir, str_part_file))
+
+        # uses the spatial index of the partition
+        arr_idx = gdf_part.sindex.query(box(flt_minx, flt_miny, flt_maxx, flt_maxy))
+        if len(arr_idx) > 0:
+            list_gdf.append(gdf_part.iloc[arr_idx])
+
+    if len(list_gdf) == 0:
+        return gpd.GeoDataFrame(columns=LIST_NHD_FIELDS + ['geometry'],
+                                geometry='geometry',
+                                crs=str_store_crs)
+
+    gdf_flowlines = gpd.GeoDataFrame(pd.concat(list_gdf, ignore_index=True),
+                                     geometry='geometry',
+                                     crs=str_store_crs)
+
+    return gdf_flowlines[LIST_NHD_FIELDS + ['geometry']]
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+
+    flt_start_run = time.time()
+
+    parser = argparse.ArgumentParser(description='============ PARTITION NHD FLOWLINES FOR INDEXED QUERIES ============')
+
+    parser.add_argument('-i',
+                        dest = "str_nhd_gpkg_path",
+                        help=r'REQUIRED: path to nhd GeoPackage Example: D:\tx_bridge_input_datasets\nhd\NHD_H_Texas_State_GPKG\NHD_H_Texas_State_GPKG.gpkg',
+                        required=True,
+                        metavar='FILE',
+                        type=lambda x: is_valid_file(parser, x))
+
+    parser.add_argument('-o',
+                        dest = "str_store_dir",
+                        help=r'REQUIRED: directory to write the partitioned flowlines: Example: D:\tx_bridge_input_datasets\nhd\nhd_flowline_store',
+                        required=True,
+                        metavar='DIR',
+                        type=str)
+
+    parser.add_argument('-c',
+                        dest = "str_store_crs",
+                        help='OPTIONAL: crs of the partitions: Default=EPSG:3857',
+                        required=False,
+                        default='EPSG:3857',
+                        metavar='STRING',
+                        type=str)
+
+    parser.add_argument('-s',
+                        dest = "flt_cell_size",
+                        help='OPTIONAL: width of a partition grid cell: Default=50000 (crs units)',
+                        required=False,
+                        default=50000.0,
+                        metavar='FLOAT',
+                        type=float)
+
+    args = vars(parser.parse_args())
+
+    fn_build_nhd_store(args['str_nhd_gpkg_path'],
+                       args['str_store_dir'],
+                       args['str_store_crs'],
+                       args['flt_cell_size'])
+
+    flt_end_run = time.time()
+    flt_time_pass = (flt_end_run - flt_start_run) // 1
+    time_pass = datetime.timedelta(seconds=flt_time_pass)
+
+    print('Compute Time: ' + str(time_pass))
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -0,0 +1,165 @@
+# Recurrence flows of National Water Model streams for a set of feature_ids.
+# The national netCDF is opened lazily and only the requested feature_ids
+# are read.  Optionally a one-time sidecar folder of feature_id-sorted numpy
+# arrays is written next to the netCDF; lookups then use a binary search on
+# memory-mapped arrays and nothing else is loaded.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.09
+# Last revised - 2023.03.09
+#
+# tx-bridge - used by the 8th processing script (assign feature id)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import argparse
+import json
+import numpy as np
+import os
+import pandas as pd
+import xarray as xr
+
+import time
+import datetime
+# ************************************************************
+
+
+STR_SIDECAR_INDEX = 'variables.json'
+
+
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+def is_valid_file(parser, arg):
+    if not os.path.exists(arg):
+        parser.error("The file %s does not exist" % arg)
+    else:
+        # File exists so return the directory
+        return arg
+        return open(arg, 'r')  # return an open file handle
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+
+# ..........................................................
+def fn_recurrence_sidecar_dir(str_netcdf_path):
+
+    """
+    Folder of the feature_id-sorted arrays of a recurrence flow netCDF
+    """
+
+    return os.path.splitext(str_netcdf_path)[0] + '_by_feature_id'
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_build_recurrence_sidecar(str_netcdf_path):
+
+    """
+    One-time conversion of the recurrence flow netCDF to a folder of
+    feature_id-sorted numpy arrays (one .npy per variable)
+
+    Args:
+        str_netcdf_path: path to nwm_v20_recurrence_flows.nc
+
+    Returns:
+        path to the sidecar folder
+    """
+
+    str_sidecar_dir = fn_recurrence_sidecar_dir(str_netcdf_path)
+    os.makedirs(str_sidecar_dir, exist_ok=True)
+
+    with xr.open_dataset(str_netcdf_path) as ds:
+        arr_feature_id = ds['feature_id'].values
+        arr_order = np.argsort(arr_feature_id, kind='stable')
+
+        np.save(os.path.join(str_sidecar_dir, 'feature_id.npy'), arr_feature_id[arr_order])
+
+        # only the variables along feature_id - as in ds.to_dataframe()
+        list_variables = [str_var for str_var in ds.data_vars
+                          if ds[str_var].dims == ('feature_id',)]
+
+        for str_var in list_variables:
+            np.save(os.path.join(str_sidecar_dir, str_var + '.npy'),
+                    ds[str_var].values[arr_order])
+
+    # index last - a folder without the index is not used
+    with open(os.path.join(str_sidecar_dir, STR_SIDECAR_INDEX), 'w') as f:
+        json.dump(list_variables, f)
+
+    return str_sidecar_dir
+# ----------------------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_get_recurrence_flows(str_netcdf_path, arr_feature_id):
+
+    """
+    Recurrence flows of the requested streams
+
+    Args:
+        str_netcdf_path: path to nwm_v20_recurrence_flows.nc
+        arr_feature_id: feature_ids needed (duplicates and nan are ignored)
+
+    Returns:
+        pandas dataframe indexed by feature_id (as ds.to_dataframe()) of
+        only the requested feature_ids that are in the dataset
+    """
+
+    ser_feature_id = pd.Series(arr_feature_id).dropna()
+    arr_feature_id = np.unique(ser_feature_id.astype(np.int64).values)
+
+    str_sidecar_dir = fn_recurrence_sidecar_dir(str_netcdf_path)
+    str_sidecar_index = os.path.join(str_sidecar_dir, STR_SIDECAR_INDEX)
+
+    if os.path.isfile(str_sidecar_index):
+        # binary search of the sorted, memory-mapped feature_ids
+        with open(str_sidecar_index) as f:
+            list_variables = json.load(f)
+
+        arr_sorted_id = np.load(os.path.join(str_sidecar_dir, 'feature_id.npy'), mmap_mode='r')
+
+        arr_pos = np.searchsorted(arr_sorted_id, arr_feature_id)
+        arr_pos = np.minimum(arr_pos, len(arr_sorted_id) - 1)
+        arr_found = arr_sorted_id[arr_pos] == arr_feature_id
+        arr_pos = arr_pos[arr_found]
+
+        dict_columns = {}
+        for str_var in list_variables:
+            arr_var = np.load(os.path.join(str_sidecar_dir, str_var + '.npy'), mmap_mode='r')
+            dict_columns[str_var] = np.asarray(arr_var[arr_pos])
+
+        df_flows = pd.DataFrame(dict_columns,
+                                index=pd.Index(np.asarray(arr_sorted_id[arr_pos]), name='feature_id'))
+    else:
+        # lazy open - only the feature_id coordinate and the selected rows are read
+        with xr.open_dataset(str_netcdf_path) as ds:
+            arr_in_dataset = np.isin(arr_feature_id, ds['feature_id'].values)
+            df_flows = ds.sel(feature_id=arr_feature_id[arr_in_dataset]).to_dataframe()
+
+    return df_flows
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+
+    flt_start_run = time.time()
+
+    parser = argparse.ArgumentParser(description='====== SORTED SIDECAR OF NATIONAL WATER MODEL RECURRENCE FLOWS ======')
+
+    parser.add_argument('-i',
+                        dest = "str_netcdf_path",
+                        help=r'REQUIRED: path to recurrence flow netCDF Example: G:\X-NWS\X-National_Datasets\nwm_v20_recurrence_flows.nc',
+                        required=True,
+                        metavar='FILE',
+                        type=lambda x: is_valid_file(parser, x))
+
+    args = vars(parser.parse_args())
+
+    str_sidecar_dir = fn_build_recurrence_sidecar(args['str_netcdf_path'])
+    print('  Sidecar written: ' + str_sidecar_dir)
+
+    flt_end_run = time.time()
+    flt_time_pass = (flt_end_run - flt_start_run) // 1
+    time_pass = datetime.timedelta(seconds=flt_time_pass)
+
+    print('Compute Time: ' + str(time_pass))
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -3,7 +3,7 @@
 #
 # Created by: Andy Carter, PE
 # Created - 2022.11.18
-# Last revised - 2022.12.06
+# Last revised - 2023.03.11
 #
 # tx-bridge - sub-process of the 8th processing script
 # Uses the 'pdal' conda environment
@@ -12,13 +12,17 @@
 
 # ************************************************************
 import argparse
+import difflib # compare two string and score
 
 import geopandas as gpd
-import pandas as pd
-import ast # converting sting of list to list
-import difflib # compare two string and score
+import hashlib
+import json
+import multiprocessing as mp
+import numpy as np
 
-import matplotlib.pyplot as plt
+# Agg canvas - no interactive backend, safe in worker processes
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib.ticker as tick
 
 import os
@@ -26,51 +30,205 @@ import os
 import time
 import datetime
 from datetime import date
+
+from profile_store import fn_profile_store_path, fn_read_profiles, fn_get_profile
+from progress import fn_progress
 # ************************************************************
 
 
-# ----------------------------------------------  
-# Print iterations progress
-def fn_print_progress_bar (iteration,
-                           total,
-                           prefix = '', suffix = '',
-                           decimals = 0,
-                           length = 100, fill = '█',
-                           printEnd = "\r"):
+STR_PLOT_HASH_FILE = 'plot_hashes.json' # input hash of each saved plot
+STR_PLOT_VERSION = '2023.03.10' # change to redraw every plot
+
+# figure of this process (fn_get_plot_template)
+DICT_PLOT_TEMPLATE = {}
+
+
+# ..................................................
+def fn_get_plot_template():
+    
+    """
+    Figure of this process that every cross section is drawn on (Agg
+    canvas, no pyplot) - created on the first call.  The lines and labels
+    are kept and updated for each bridge; only the fills are redrawn.
+    """
+    
+    if len(DICT_PLOT_TEMPLATE) > 0:
+        return DICT_PLOT_TEMPLATE
+    
+    fig = Figure(figsize=(8,4), dpi = 300)
+    FigureCanvasAgg(fig)
+    fig.patch.set_facecolor('gainsboro')
+    
+    ax = fig.add_subplot(111)
+    
+    # positions of the first text (lower right)
+    flt_y_location = 0.04
+    flt_y_delta = 0.03
+    int_font_size = 4
+    
+    # date, created by, lat/long, COMID, deck thickness and nbi labels
+    list_text = []
+    for int_label in range(6):
+        list_text.append(ax.text(0.98, flt_y_location, '',
+                                 verticalalignment='bottom',
+                                 horizontalalignment='right',
+                                 backgroundcolor='w',
+                                 transform=ax.transAxes,
+                                 fontsize=int_font_size,
+                                 style='italic'))
+        flt_y_location += flt_y_delta
+    
+    DICT_PLOT_TEMPLATE['fig'] = fig
+    DICT_PLOT_TEMPLATE['ax'] = ax
+    DICT_PLOT_TEMPLATE['title'] = fig.suptitle('', fontsize=14, fontweight='bold')
+    DICT_PLOT_TEMPLATE['list_text'] = list_text
+    DICT_PLOT_TEMPLATE['line_wsel'] = ax.plot([], [], label = "wsel", linewidth=2, linestyle="-", c="b")[0]
+    DICT_PLOT_TEMPLATE['line_low_chord'] = ax.plot([], [], label = "low_chord", linewidth=1, linestyle="-", c="k")[0]
+    DICT_PLOT_TEMPLATE['line_high_chord'] = ax.plot([], [], label = "high_chord", linewidth=1, linestyle="-", c="k")[0]
+    DICT_PLOT_TEMPLATE['line_ground'] = ax.plot([], [], label = "ground", linewidth=2, linestyle="-", c="k")[0]
+    DICT_PLOT_TEMPLATE['list_fill'] = []
+    
+    ax.grid(True)
+    
+    return DICT_PLOT_TEMPLATE
+# ..................................................
+
+
+# ``````````````````````````````````````````````````
+def fn_plot_input_hash(dict_params):
+    
     """
-    from: https://stackoverflow.com/questions/3173320/text-progress-bar-in-the-console
-    Call in a loop to create terminal progress bar
-    Keyword arguments:
-        iteration   - Required  : current iteration (Int)
-        total       - Required  : total iterations (Int)
-        prefix      - Optional  : prefix string (Str)
-        suffix      - Optional  : suffix string (Str)
-        decimals    - Optional  : positive number of decimals in percent complete (Int)
-        length      - Optional  : character length of bar (Int)
-        fill        - Optional  : bar fill character (Str)
-        printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
+    Hash of everything drawn on a cross section plot (but the date) - a plot
+    with the same hash is up to date
     """
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filledLength = int(length * iteration // total)
-    bar = fill * filledLength + '-' * (length - filledLength)
-    print(f'\r{prefix} |{bar}| {percent}% {suffix}', end = printEnd)
-    # Print New Line on Complete
-    if iteration == total: 
-        print()
-# ----------------------------------------------  
+    
+    hash_inputs = hashlib.sha1(STR_PLOT_VERSION.encode())
+    
+    for str_key in sorted(dict_params):
+        if str_key in ('str_xs_plot_filepath', 'str_hash'):
+            continue
+        hash_inputs.update(str_key.encode())
+        obj_value = dict_params[str_key]
+        if isinstance(obj_value, np.ndarray):
+            hash_inputs.update(np.ascontiguousarray(obj_value, dtype=np.float64).tobytes())
+        else:
+            hash_inputs.update(repr(obj_value).encode())
+    
+    return hash_inputs.hexdigest()
+# ``````````````````````````````````````````````````
 
 
 # ..................................................
-def fn_process_all_cross_sections(list_input_files, str_flow_csv_filename):
+def fn_plot_cross_section(dict_params):
+    
+    """
+    Draw and save the cross section plot of one bridge
+    
+    Args:
+        dict_params: dictionary from fn_process_all_cross_sections
+        
+    Returns:
+        tuple of uuid and input hash of the saved plot
+    """
     
-    # *****
-    # constants
     b_is_feet = True # vertical units are in feet
     int_padding = 1 # vertical padding below the lowest elevation when plotting
+    flt_min_conveyance_area = 1.0 # minimum allowable conveyance area
+    
+    dict_template = fn_get_plot_template()
+    fig = dict_template['fig']
+    ax = dict_template['ax']
+    
+    list_station = dict_params['arr_station'].tolist()
+    list_ground_elv = dict_params['arr_ground_elv'].tolist()
+    list_deck_elev = dict_params['arr_deck_elev'].tolist()
+    list_low_chord = dict_params['arr_low_chord'].tolist()
+    
+    b_valid_comid = dict_params['b_valid_comid']
+    b_valid_nbi_thickness = dict_params['b_valid_nbi_thickness']
+    flt_conveyance_area = dict_params['flt_conveyance_area']
+    
+    # max of ground and low chord (nan skipped)
+    list_max_ground_low_chord = np.fmax(dict_params['arr_ground_elv'], dict_params['arr_low_chord']).tolist()
+    
+    # for now - using the average gound elevation as the water surface
+    flt_wsel = sum(list_ground_elv) / len(list_ground_elv)
+    list_max_wsel_ground = np.fmax(dict_params['arr_ground_elv'], flt_wsel).tolist()
+    
+    # ---- Labels for the plot ----
+    dict_template['title'].set_text(dict_params['str_title_label'])
+    
+    list_labels = [('Created: ' + str(date.today()), 'k'),
+                   ('Created by: University of Texas', 'k'),
+                   ('Lat/Long: '+ dict_params['str_coords'], 'k'),
+                   ('NWM COMID: '+ dict_params['str_comid'], 'k' if b_valid_comid else 'r'),
+                   ('Est. deck thickness: '+ dict_params['str_thickness'], 'k' if b_valid_nbi_thickness else 'r'),
+                   ('NBI: '+ dict_params['str_nbi_asset'], dict_params['str_nbi_color'])]
+    
+    for text_label, (str_label, str_color) in zip(dict_template['list_text'], list_labels):
+        text_label.set_text(str_label)
+        text_label.set_color(str_color)
+    
+    # ---- lines ----
+    # create WSEL line if there is a valid COMID and the conyenace area
+    # under the low chord is greater than zero
+    b_show_wsel = b_valid_comid and flt_conveyance_area > flt_min_conveyance_area
+    dict_template['line_wsel'].set_data(list_station, list_max_wsel_ground)
+    dict_template['line_wsel'].set_visible(b_show_wsel)
+    
+    dict_template['line_low_chord'].set_data(list_station, list_max_ground_low_chord)
+    dict_template['line_low_chord'].set_color('k' if b_valid_nbi_thickness else 'r')
+    
+    dict_template['line_high_chord'].set_data(list_station, list_deck_elev)
+    dict_template['line_ground'].set_data(list_station, list_ground_elv)
+    
+    ax.relim(visible_only=True)
+    
+    # ---- fills (added after relim - they extend the data limits) ----
+    for collection_fill in dict_template['list_fill']:
+        collection_fill.remove()
+    list_fill = []
+    
+    # bridge deck fill
+    if b_valid_nbi_thickness:
+        list_fill.append(ax.fill_between(list_station, list_deck_elev, list_max_ground_low_chord, color='grey', alpha=0.4))
+    else:
+        list_fill.append(ax.fill_between(list_station, list_deck_elev, list_max_ground_low_chord, color='red', alpha=0.4))
+
+    if b_valid_comid:
+        # wsel fill if there is a valid COMID
+        if flt_conveyance_area > 1:
+            list_fill.append(ax.fill_between(list_station, list_max_wsel_ground, list_ground_elv, color='cyan', alpha=0.25))
+    
+    # --- hatching areas below gound profile
+    list_lowest = [min(list_ground_elv) - int_padding ] * len(list_ground_elv)
+    list_fill.append(ax.fill_between(list_station, list_ground_elv, list_lowest, color='saddlebrown', alpha=0.20))
+    
+    dict_template['list_fill'] = list_fill
+    
+    ax.autoscale_view()
+    
+    if b_is_feet:
+        ax.set_ylabel('Elevation (ft)')
+        ax.set_xlabel('Station (ft)')
+    else:
+        ax.set_ylabel('Elevation (m)')
+        ax.set_xlabel('Station (m)')
     
+    # Save the plot
+    fig.savefig(dict_params['str_xs_plot_filepath'], bbox_inches="tight")
+    
+    return (dict_params['uuid'], dict_params['str_hash'])
+# ..................................................
+
+
+# ..................................................
+def fn_process_all_cross_sections(list_input_files, str_flow_csv_filename, int_workers=0, b_skip_current=True):
+    
+    # *****
+    # constants
     flt_comid_snap_dist = 200 # hard coded distance for valid COMID
     #flt_default_thickness = 0.5 # hard coded thickness if there isn't a value
-    flt_min_conveyance_area = 1.0 # minimum allowable conveyance area
     
     str_no_nbi_label = 'None Found' # hard coded value to plot when no nbi found
     str_no_comid = 'None within distance'
@@ -87,26 +245,28 @@ def fn_process_all_cross_sections(list_input_files, str_flow_csv_filename):
         
     gdf_mjr_axis_envelopes = gpd.read_file(str_majr_axis_filename)
     
+    # 2023.03.10 - profiles as float arrays (profile_store.py)
+    dict_profiles = fn_read_profiles(fn_profile_store_path(str_input_dir))
     
-    # ----plotting cross sections ----
-    int_count = 0
-    l = len(gdf_mjr_axis_envelopes)
-    str_prefix = "Plotting XS " + str(int_count) + ' of ' + str(l)
-    fn_print_progress_bar(0, l, prefix = str_prefix , suffix = 'Complete', length = 29)
+    # input hash of each plot that is already saved
+    str_hash_path = os.path.join(str_xs_folder, STR_PLOT_HASH_FILE)
+    dict_plot_hash = {}
+    if os.path.isfile(str_hash_path):
+        with open(str_hash_path) as f:
+            dict_plot_hash = json.load(f)
+    
+    # ---- everything each plot needs ----
+    list_of_dict = []
+    int_current = 0
     
     for index, row in gdf_mjr_axis_envelopes.iterrows():
-        # -- update progress bar --
-        time.sleep(0.02)
-        int_count += 1
-        str_prefix = "Plotting XS " + str(int_count) + ' of ' + str(l)
-        fn_print_progress_bar(int_count, l, prefix = str_prefix , suffix = 'Complete', length = 29)
         
-        str_bridge_thickness = gdf_mjr_axis_envelopes.loc[index]['nbi_thick']
-        str_nbi_asset = gdf_mjr_axis_envelopes.loc[index]['nbi_asset']
+        str_bridge_thickness = row['nbi_thick']
+        str_nbi_asset = row['nbi_asset']
         
         # determine if there is a valid comid
         b_valid_comid = False
-        str_comid_dist =  gdf_mjr_axis_envelopes.loc[index]['dist_river']
+        str_comid_dist =  row['dist_river']
         if str_comid_dist != '':
             flt_comid_dist = float(str_comid_dist)
             # if stream close enough set as True
@@ -120,41 +280,15 @@ def fn_process_all_cross_sections(list_input_files, str_flow_csv_filename):
         else:
             b_valid_nbi_thickness = True
         
-            
-        # convert strings back to lists
-        list_station = ast.literal_eval(gdf_mjr_axis_envelopes.loc[index]['sta'])
-        list_ground_elv = ast.literal_eval(gdf_mjr_axis_envelopes.loc[index]['ground_elv'])
-        list_deck_elev = ast.literal_eval(gdf_mjr_axis_envelopes.loc[index]['deck_elev'])
-        list_low_chord = ast.literal_eval(gdf_mjr_axis_envelopes.loc[index]['low_ch_elv'])
-        
-        flt_conveyance_area = float(row['convey_ar'])
-        
-        # create a pandas dataframe of lists
-        df_bridge = pd.DataFrame(list(zip(list_station,
-                                          list_ground_elv,
-                                          list_deck_elev,
-                                          list_low_chord)),columns =['sta', 'ground_elv', 'deck_elev', 'low_chord'])
-        
-        df_bridge["max_ground_low_chord"] = df_bridge[["ground_elv", "low_chord"]].max(axis=1)
-        
-        # for now - using the average gound elevation as the water surface
-        df_bridge["wsel"] = sum(list_ground_elv) / len(list_ground_elv)
-        df_bridge["max_wsel_ground"] = df_bridge[["ground_elv", "wsel"]].max(axis=1)
-        
-        
-        # create lists of max_wsel_ground and max_ground_low_chord
-        list_max_wsel_ground = df_bridge['max_wsel_ground'].tolist()
-        list_max_ground_low_chord = df_bridge['max_ground_low_chord'].tolist()
-        
         # ------- lat / Long -------
-        str_lon = str(gdf_mjr_axis_envelopes.loc[index]['longitude'])
-        str_lat = str(gdf_mjr_axis_envelopes.loc[index]['latitude'])
+        str_lon = str(row['longitude'])
+        str_lat = str(row['latitude'])
         str_coords = '(' + str_lat + ',' + str_lon + ')'
         
         # -------Get the title text -----
-        str_nhd_name = gdf_mjr_axis_envelopes.loc[index]['nhd_name']
-        str_road_name = gdf_mjr_axis_envelopes.loc[index]['name']
-        str_road_ref_name = gdf_mjr_axis_envelopes.loc[index]['ref']
+        str_nhd_name = row['nhd_name']
+        str_road_name = row['name']
+        str_road_ref_name = row['ref']
     
         b_have_road_name = False
         b_have_ref_name = False
@@ -170,7 +304,9 @@ def fn_process_all_cross_sections(list_input_files, str_flow_csv_filename):
             if b_have_road_name:
                 # have a road name and a reference name
                 # check to see haow similar the two strings are
-                seq=difflib.SequenceMatcher(a=str_road_name, b=str_road_ref_name)
+                # difflib ratio of the names as written - the 0.9 threshold
+                # is set on this score
+                seq = difflib.SequenceMatcher(a=str_road_name, b=str_road_ref_name)
                 flt_name_match_score = seq.ratio()
                 if flt_name_match_score < 0.9:
                     # name and ref are different enough
@@ -184,164 +320,86 @@ def fn_process_all_cross_sections(list_input_files, str_flow_csv_filename):
                     str_title_label += ' @ ' + str_nhd_name
                 else:
                     str_title_label = str_nhd_name
-                    
-                    
-        # ---- Labels for the plot ----
-        fig = plt.figure(figsize=(8,4), dpi = 300)
-        fig.patch.set_facecolor('gainsboro')
-    
-        fig.suptitle(str_title_label, fontsize=14, fontweight='bold')
-    
-        ax = plt.gca()
-        today = date.today()
-        
-        # positions of the first text (lower right)
-        flt_y_location = 0.04
-        flt_y_delta = 0.03
-        int_font_size = 4
-        
-        # ------
-        # date created label
-        ax.text(0.98, flt_y_location, 'Created: ' + str(today),
-                    verticalalignment='bottom',
-                    horizontalalignment='right',
-                    backgroundcolor='w',
-                    transform=ax.transAxes,
-                    fontsize=int_font_size,
-                    style='italic')
-        flt_y_location += flt_y_delta
-        # ------
-    
-        # ------
-        # created by label
-        ax.text(0.98, flt_y_location, 'Created by: University of Texas',
-                verticalalignment='bottom',
-                horizontalalignment='right',
-                backgroundcolor='w',
-                transform=ax.transAxes, fontsize=int_font_size, style='italic')
-        flt_y_location += flt_y_delta
-        # ------
-        
-        # ------
-        # location lat/long label
-        ax.text(0.98, flt_y_location, 'Lat/Long: '+ str_coords,
-                verticalalignment='bottom',
-                horizontalalignment='right',
-                backgroundcolor='w',
-                transform=ax.transAxes, fontsize=int_font_size, style='italic')
-        flt_y_location += flt_y_delta
-        # ------
         
-        # ------
-        # location COMID b_valid_comid
+        # ------ labels ------
         if b_valid_comid:
-            str_comid = str(gdf_mjr_axis_envelopes.loc[index]['feature_id'])
-            str_color = 'k'
+            str_comid = str(row['feature_id'])
         else:
             str_comid = str_no_comid
-            str_color = 'r'
         
-        ax.text(0.98, flt_y_location, 'NWM COMID: '+ str_comid,
-                verticalalignment='bottom',
-                horizontalalignment='right',
-                backgroundcolor='w',
-                color=str_color,
-                transform=ax.transAxes, fontsize=int_font_size, style='italic')
-        flt_y_location += flt_y_delta
-        # ------
-    
-        # ------
-        # deck thickness label
         if b_valid_nbi_thickness:
-            str_color = 'k'
-            str_thickness = str(gdf_mjr_axis_envelopes.loc[index]['nbi_thick'])
+            str_thickness = str(row['nbi_thick'])
         else:
-            str_color = 'r'
             str_thickness = 'None - Default Value'
         
-        ax.text(0.98, flt_y_location, 'Est. deck thickness: '+ str_thickness,
-                verticalalignment='bottom',
-                horizontalalignment='right',
-                color=str_color,
-                backgroundcolor='w',
-                transform=ax.transAxes, fontsize=int_font_size, style='italic')
-        flt_y_location += flt_y_delta
-        # ------
-        
-        # ------
         if str_nbi_asset != '':
-            str_color = 'k'
+            str_nbi_color = 'k'
         else:
-            str_color = 'r'
+            str_nbi_color = 'r'
             str_nbi_asset = str_no_nbi_label
         
-        # nbi asset number label
-        ax.text(0.98, flt_y_location, 'NBI: '+ str_nbi_asset,
-                verticalalignment='bottom',
-                horizontalalignment='right',
-                backgroundcolor='w',
-                color=str_color,
-                transform=ax.transAxes, fontsize=int_font_size, style='italic')
-        flt_y_location += flt_y_delta
-    
-
-        # ------
+        # the deck with the fixed abutments (compute low chord step) - the
+        # 'deck_elev' text of the geopackage when there is no store
+        dict_params = {'uuid': row['uuid'],
+                       'str_xs_plot_filepath': os.path.join(str_xs_folder, row['uuid'] + '.png'),
+                       'arr_station': fn_get_profile(dict_profiles, row, 'sta'),
+                       'arr_ground_elv': fn_get_profile(dict_profiles, row, 'ground_elv'),
+                       'arr_deck_elev': fn_get_profile(dict_profiles, row, 'deck_elev_fixed', 'deck_elev'),
+                       'arr_low_chord': fn_get_profile(dict_profiles, row, 'low_ch_elv'),
+                       'flt_conveyance_area': float(row['convey_ar']),
+                       'b_valid_comid': b_valid_comid,
+                       'b_valid_nbi_thickness': b_valid_nbi_thickness,
+                       'str_title_label': str_title_label,
+                       'str_coords': str_coords,
+                       'str_comid': str_comid,
+                       'str_thickness': str_thickness,
+                       'str_nbi_asset': str_nbi_asset,
+                       'str_nbi_color': str_nbi_color}
         
-        # ---- Labels for the plot ----
-        if b_valid_comid:
-            # create WSEL line if there is a valid COMID
-            if flt_conveyance_area > flt_min_conveyance_area:
-                # and the conyenace area under the low chord is greater than zero
-                plt.plot(list_station, list_max_wsel_ground, label = "wsel", linewidth=2, linestyle="-", c="b")  # creates the line
+        dict_params['str_hash'] = fn_plot_input_hash(dict_params)
         
-        if b_valid_nbi_thickness:
-            plt.plot(list_station, list_max_ground_low_chord, label = "low_chord", linewidth=1, linestyle="-", c="k")  # creates the line
+        # skip the plots that are up to date
+        if (b_skip_current and
+                dict_plot_hash.get(dict_params['uuid']) == dict_params['str_hash'] and
+                os.path.isfile(dict_params['str_xs_plot_filepath'])):
+            int_current += 1
         else:
-            plt.plot(list_station, list_max_ground_low_chord, label = "low_chord", linewidth=1, linestyle="-", c="r")  # creates the line
-        
-        plt.plot(list_station, list_deck_elev, label = "high_chord", linewidth=1, linestyle="-", c="k")  # creates the line
-        plt.plot(list_station, list_ground_elv, label = "ground", linewidth=2, linestyle="-", c="k")  # creates the line
+            list_of_dict.append(dict_params)
     
-        # bridge deck fill
-        if b_valid_nbi_thickness:
-            plt.fill_between(list_station, list_deck_elev, list_max_ground_low_chord, color='grey', alpha=0.4)
-        else:
-            plt.fill_between(list_station, list_deck_elev, list_max_ground_low_chord, color='red', alpha=0.4)
+    if int_current > 0:
+        print('  Cross sections up to date: ' + str(int_current))
     
-        if b_valid_comid:
-            # wsel fill if there is a valid COMID
-            if flt_conveyance_area > 1:
-                plt.fill_between(list_station, list_max_wsel_ground, list_ground_elv, color='cyan', alpha=0.25)
+    # ----plotting cross sections ----
+    l = len(list_of_dict)
     
-        if b_is_feet:
-            plt.ylabel('Elevation (ft)')
-            plt.xlabel('Station (ft)')
-        else:
-            plt.ylabel('Elevation (m)')
-            plt.xlabel('Station (m)')
+    # one task per bridge - serial and multiprocessing share the same code path
+    if int_workers == 1 or l <= 1:
+        p = None
+        iter_results = map(fn_plot_cross_section, list_of_dict)
+    else:
+        p = mp.Pool(processes = min(int_workers, l))
+        iter_results = p.imap_unordered(fn_plot_cross_section,
+                                        list_of_dict,
+                                        chunksize = max(l // (int_workers * 4), 1))
     
-        # --- hatching areas below gound profile
-        list_lowest = [min(list_ground_elv) - int_padding ] * len(list_ground_elv)
-        plt.fill_between(list_station, list_ground_elv, list_lowest, color='saddlebrown', alpha=0.20)
+    for str_uuid, str_hash in fn_progress(iter_results, l, 'Plotting XS'):
+        dict_plot_hash[str_uuid] = str_hash
     
-        plt.grid(True)
-        
-        
-        # Save the plot
-        str_xs_file_name = gdf_mjr_axis_envelopes.loc[index]['uuid'] + '.png'
-        
-        str_xs_plot_filepath = os.path.join(str_xs_folder, str_xs_file_name)
-        
-        plt.savefig(str_xs_plot_filepath,bbox_inches="tight")
+    if p is not None:
+        p.close()
+        p.join()
     
-        plt.cla()
-        plt.close('all')
+    with open(str_hash_path, 'w') as f:
+        json.dump(dict_plot_hash, f, indent=1)
         
 # ..................................................
 
 
 # ----------------------------------------------------
-def fn_plot_cross_sections(str_input_dir, str_majr_axis_filename, str_flow_csv_filename):
+def fn_plot_cross_sections(str_input_dir, str_majr_axis_filename, str_flow_csv_filename, int_workers=0, b_skip_current=True):
+    
+    if int_workers <= 0 or int_workers >= mp.cpu_count():
+        int_workers = max(mp.cpu_count() - 1, 1)
     
     # --- build file paths to the required input folders ---
     str_major_axis_lines = os.path.join(str_input_dir, '08_cross_sections', str_majr_axis_filename)
@@ -357,7 +415,7 @@ def fn_plot_cross_sections(str_input_dir, str_majr_axis_filename, str_flow_csv_f
         # all input files were found
         list_input_files.append(str_input_dir)
         
-        fn_process_all_cross_sections(list_input_files, str_flow_csv_filename)
+        fn_process_all_cross_sections(list_input_files, str_flow_csv_filename, int_workers, b_skip_current)
     else:
         int_item = 0
         for item in list_files_exist:
@@ -398,11 +456,27 @@ if __name__ == '__main__':
                     metavar='STRING',
                     type=str)
     
+    parser.add_argument('-p', '--workers',
+                        dest = "int_workers",
+                        help='OPTIONAL: number of worker processes (-p here as -n and -w are taken; --workers as the other scripts): Default=0 (will deploy all cores, less one for overhead), 1=serial',
+                        required=False,
+                        default=0,
+                        metavar='INTEGER',
+                        type=int)
+    
+    parser.add_argument('-a',
+                        dest = "b_redraw_all",
+                        help='OPTIONAL: redraw every plot, even the ones that are up to date',
+                        required=False,
+                        action='store_true')
+    
     args = vars(parser.parse_args())
     
     str_input_dir = args['str_input_dir']
     str_majr_axis_filename = args['str_majr_axis_filename']
     str_flow_csv_filename = args['str_flow_csv_filename']
+    int_workers = args['int_workers']
+    b_skip_current = not args['b_redraw_all']
 
     print(" ")
     print("+=================================================================+")
@@ -415,11 +489,13 @@ if __name__ == '__main__':
     print("  ---(i) PATH TO INPUT FOLDERS: " + str_input_dir)
     print("  ---[n]   Optional: MAJOR AXIS FILE NAME: " + str_majr_axis_filename )
     print("  ---[w]   Optional: FLOW PER SEGMENT FILE: " + str_flow_csv_filename )
+    print("  ---[p]   Optional: NUMBER OF WORKERS: " + str(int_workers) )
+    print("  ---[a]   Optional: REDRAW ALL PLOTS: " + str(not b_skip_current) )
     print("===================================================================")
 
     # TODO - check to see if str_flow_csv_filename exists
     
-    fn_plot_cross_sections(str_input_dir, str_majr_axis_filename,str_flow_csv_filename)
+    fn_plot_cross_sections(str_input_dir, str_majr_axis_filename, str_flow_csv_filename, int_workers, b_skip_current)
     
     flt_end_run = time.time()
     flt_time_pass = (flt_end_run - flt_start_run) // 1
@@ -21,13 +21,14 @@ import os
 import shapely.geometry.multipolygon as sh
 
 import multiprocessing as mp
-import tqdm
-from time import sleep
 
 import time
 import datetime
 
 import pylas # to read in the point cloud
+
+from hull_tile_table import fn_write_hull_tile_table
+from progress import fn_progress
 # ************************************************************
 
 
@@ -138,7 +139,6 @@ def fn_get_hull_polygons(dict_params):
         # append this polygon to the geodataframe
         gdf_bridge_hulls = gdf_bridge_hulls.append(dict_bridge_hull, ignore_index = True)
     
-    sleep(0.01) # this allows the tqdm progress bar to update
     
     return gdf_bridge_hulls
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -204,11 +204,7 @@ def fn_polygonize_point_groups(str_las_input_directory, str_output_dir, int_clas
         l = len(list_files_with_points)
         p = mp.Pool(processes = (mp.cpu_count() - 1))
             
-        list_gdf_hulls = list(tqdm.tqdm(p.imap(fn_get_hull_polygons, list_of_dict),
-                                            total = l,
-                                            desc='Processing LAS',
-                                            bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                            ncols=65))
+        list_gdf_hulls = list(fn_progress(p.imap(fn_get_hull_polygons, list_of_dict), l, 'Processing LAS'))
         p.close()
         p.join()
         
@@ -276,8 +272,8 @@ def fn_polygonize_point_groups(str_las_input_directory, str_output_dir, int_clas
         # delete the 'temp_id' coloumn
         del gdf_merge_polygons['temp_id']
         
-        # stringify list
-        # TODO - 2022.07.21 - what if the list_clouds_per_poly is too long to fit into a field?
+        # stringify list - kept only as an export view, the shapefile may
+        # truncate this field.  Step 5 reads the hull-tile table instead.
         gdf_merge_polygons['las_paths'] = gdf_merge_polygons['las_paths'].astype(str)
         
         str_file_shp_to_write = os.path.join(str_output_dir, 'class_' + str(int_class) +'_ar_3857.shp')
@@ -286,6 +282,11 @@ def fn_polygonize_point_groups(str_las_input_directory, str_output_dir, int_clas
         # the geopackage does not truncate the 'las_path' field name converted from list
         str_file_gpkg_to_write = os.path.join(str_output_dir, 'class_' + str(int_class) +'_ar_3857.gpkg')
         gdf_merge_polygons.to_file(str_file_gpkg_to_write, driver='GPKG')
+        
+        # 2023.03.06 - write the hull to las tile relation into the geopackage
+        # (unique tiles per hull, in hull row order)
+        list_unique_clouds = [list(dict.fromkeys(list_tiles)) for list_tiles in list_clouds_per_poly]
+        fn_write_hull_tile_table(str_file_gpkg_to_write, list_unique_clouds)
         print("+-----------------------------------------------------------------+")
         
         return(True)
@@ -0,0 +1,239 @@
+# Numpy kernels of the bridge profile computations: low chord, conveyance
+# area under the low chord, where the deck starts and ends, and extending
+# the deck abutments to the ground.  Each kernel works on the whole profile
+# (arrays of station, ground and deck elevation) at once.
+# fn_low_chord_profile chains them for one bridge and never changes the
+# deck it is given - the fixed deck is a separate output.
+#
+# The kernels give the same results as the pandas functions they replaced
+# in compute_low_chord_attributes.py - checked against frozen outputs in
+# tests/test_profile_kernels.py.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.10
+# Last revised - 2023.03.11
+#
+# tx-bridge - used by the sub-processes of the 8th processing script
+# (compute low chord attributes)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import numpy as np
+# ************************************************************
+
+
+# ..........................................................
+def fn_max_ground_low_chord(arr_ground, arr_deck, flt_bridge_thickness):
+
+    """
+    Low chord (deck minus the thickness) but never below the ground - nan
+    is skipped, as pandas max(axis=1)
+    """
+
+    return np.fmax(arr_ground, arr_deck - flt_bridge_thickness)
+# ..........................................................
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_area_under_profile(arr_sta, arr_ground, arr_max_ground_low_chord):
+
+    """
+    Area under the low chord and above the ground (trapezoids).  As before,
+    the first trapezoid starts at station 0 with a height of 0.
+
+    Returns:
+        float of area under low chord and above the ground
+    """
+
+    arr_height = arr_max_ground_low_chord - arr_ground
+
+    arr_sta_ext = np.concatenate(([0.0], arr_sta))
+    arr_height_ext = np.concatenate(([0.0], arr_height))
+
+    arr_area = np.diff(arr_sta_ext) * (arr_height_ext[1:] + arr_height_ext[:-1]) / 2
+
+    return float(np.sum(arr_area))
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ============================================================
+def fn_start_end_deck_index(arr_ground, arr_deck):
+
+    """
+    Where the deck leaves the ground (start) and returns to it (end)
+
+    Returns:
+        arr_start: indecies of the first deck point above the ground
+        arr_end: indecies of the last deck point above the ground
+    """
+
+    arr_delta = arr_deck - arr_ground
+
+    arr_this = arr_delta[:-1]
+    arr_next = arr_delta[1:]
+
+    arr_start = np.flatnonzero((arr_this == 0) & (arr_next > 0)) + 1
+    arr_end = np.flatnonzero((arr_this > 0) & (arr_next == 0))
+
+    return arr_start, arr_end
+# ============================================================
+
+
+# ..........................................................
+def fn_interpolate_nan(arr_values):
+
+    """
+    Linear interpolation of nan by position - as pandas interpolate():
+    nan before the first value are kept, nan after the last value are set
+    to the last value
+    """
+
+    arr_values = np.array(arr_values, dtype=np.float64)
+    arr_valid = ~np.isnan(arr_values)
+
+    if not arr_valid.any():
+        return arr_values
+
+    arr_pos = np.arange(len(arr_values))
+    arr_fill = ~arr_valid & (arr_pos > np.flatnonzero(arr_valid)[0])
+
+    arr_values[arr_fill] = np.interp(arr_pos[arr_fill], arr_pos[arr_valid], arr_values[arr_valid])
+
+    return arr_values
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_connect_deck(arr_ground, arr_deck, int_first_nan, int_last_nan):
+
+    """
+    Interpolate the deck over [int_first_nan, int_last_nan) and keep it at
+    or above the ground
+    """
+
+    arr_deck_interp = np.array(arr_deck, dtype=np.float64)
+    arr_deck_interp[int_first_nan:int_last_nan] = np.nan
+
+    return np.fmax(arr_ground, fn_interpolate_nan(arr_deck_interp))
+# ----------------------------------------------------------
+
+
+# ------------------------------------------------------------
+def fn_fix_deck_left_abut(arr_ground, arr_deck, flt_tolerance, int_start_index):
+
+    """
+    extend the left abutment to the ground if a ground elevation point is
+    found within the specified vertical tolerance
+
+    Args:
+        arr_ground, arr_deck: profile elevations
+        flt_tolerance: maximum vertical difference between deck and ground where a connection is valid
+        int_start_index: index of the left most point on deck
+
+    Returns:
+        numpy array of deck elevations
+    """
+
+    arr_delta_abut = np.abs(arr_deck[int_start_index] - arr_ground)
+
+    if arr_delta_abut[int_start_index] > flt_tolerance:
+        # closest ground point on the left within tolerance of the abutment
+        arr_connect = np.flatnonzero(arr_delta_abut[:int_start_index + 1] < flt_tolerance)
+
+        if len(arr_connect) > 0:
+            return fn_connect_deck(arr_ground, arr_deck, arr_connect[-1], int_start_index)
+
+    return np.array(arr_deck, dtype=np.float64)
+# ------------------------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_fix_deck_right_abut(arr_ground, arr_deck, flt_tolerance, int_end_index):
+
+    """
+    extend the right abutment to the ground if a ground elevation point is
+    found within the specified vertical tolerance
+
+    Args:
+        arr_ground, arr_deck: profile elevations
+        flt_tolerance: maximum vertical difference between deck and ground where a connection is valid
+        int_end_index: index of the right most point on deck
+
+    Returns:
+        numpy array of deck elevations
+    """
+
+    arr_delta_abut = np.abs(arr_deck[int_end_index] - arr_ground)
+
+    if arr_delta_abut[int_end_index] > flt_tolerance:
+        # closest ground point on the right within tolerance of the abutment
+        arr_connect = np.flatnonzero(arr_delta_abut[int_end_index:] < flt_tolerance)
+
+        if len(arr_connect) > 0:
+            return fn_connect_deck(arr_ground, arr_deck, int_end_index, int_end_index + arr_connect[0])
+
+    return np.array(arr_deck, dtype=np.float64)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ----------------------------------------------------------
+def fn_low_chord_profile(arr_sta, arr_ground, arr_deck, flt_bridge_thickness, flt_tolerance):
+
+    """
+    Low chord attributes of one bridge profile - the deck is not changed,
+    the fixed deck is returned as its own array
+
+    Args:
+        arr_sta, arr_ground, arr_deck: profile from the 8th step (sampled deck)
+        flt_bridge_thickness: deck thickness
+        flt_tolerance: maximum vertical difference between deck and ground where a connection is valid
+
+    Returns:
+        dictionary of 'deck_elev_fixed' and 'low_ch_elv' (numpy arrays
+        rounded to 0.01), 'convey_ar', 'min_low_ch' and 'min_ground'
+    """
+
+    # low chord and area under the bridge - before fixing abutments
+    arr_low_chord = fn_max_ground_low_chord(arr_ground, arr_deck, flt_bridge_thickness)
+    flt_conveyance_area = round(fn_area_under_profile(arr_sta, arr_ground, arr_low_chord), 1)
+
+    arr_new_deck = np.array(arr_deck, dtype=np.float64)
+    flt_min_low_chord = -99.0
+
+    if flt_conveyance_area > 0:
+        # fixing the right and left abutments (armpit) where the ground does not meet the bridge deck
+        arr_start_index, arr_end_index = fn_start_end_deck_index(arr_ground, arr_deck)
+
+        if len(arr_start_index) > 0:
+            arr_new_deck = fn_fix_deck_left_abut(arr_ground, arr_new_deck, flt_tolerance, arr_start_index[0])
+
+        if len(arr_end_index) > 0:
+            arr_new_deck = fn_fix_deck_right_abut(arr_ground, arr_new_deck, flt_tolerance, arr_end_index[-1])
+
+        # given the new deck, get the low chord and the area - after fixing abutments
+        arr_low_chord = fn_max_ground_low_chord(arr_ground, arr_new_deck, flt_bridge_thickness)
+        flt_conveyance_area = round(fn_area_under_profile(arr_sta, arr_ground, arr_low_chord), 2)
+
+        # minimum low chord elevation where the low chord is above the ground
+        arr_low_above_ground = (arr_low_chord - arr_ground) > 0.01
+
+        if arr_low_above_ground.any():
+            flt_min_low_chord = round(float(arr_low_chord[arr_low_above_ground].min()), 2)
+        else:
+            flt_min_low_chord = np.nan
+
+        arr_new_deck = np.array([round(flt_elev, 2) for flt_elev in arr_new_deck.tolist()], dtype=np.float64)
+
+    # minimum ground elevation
+    arr_ground_valid = arr_ground[~np.isnan(arr_ground)]
+    if len(arr_ground_valid) > 0:
+        flt_min_ground = round(float(arr_ground_valid.min()), 2)
+    else:
+        flt_min_ground = np.nan
+
+    return {'deck_elev_fixed': arr_new_deck,
+            'low_ch_elv': np.array([round(flt_elev, 2) for flt_elev in arr_low_chord.tolist()], dtype=np.float64),
+            'convey_ar': flt_conveyance_area,
+            'min_low_ch': flt_min_low_chord,
+            'min_ground': flt_min_ground}
+# ----------------------------------------------------------
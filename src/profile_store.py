@@ -0,0 +1,165 @@
+# Bridge profiles (station, ground, deck and low chord elevations) stored as
+# typed float arrays keyed by the uuid of the major axis line.  The 8th
+# processing scripts share one HDF5 file in '08_cross_sections'; the
+# profiles are written and read as whole arrays instead of being converted
+# to and from text.  The str(list) fields of the GeoPackages are only an
+# export view of these arrays.
+#
+# Layout of the HDF5 file: 'uuid' (one per profile), 'offset' (start of each
+# profile in the flat arrays, one more than the profiles) and one flat
+# float64 array per profile field.
+#
+# 'sta', 'ground_elv' and 'deck_elev' are written by the attribute major
+# axis step and only read after it; the compute low chord step adds the
+# fixed deck ('deck_elev_fixed') and the low chord ('low_ch_elv').
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.10
+# Last revised - 2023.03.11
+#
+# tx-bridge - shared by the sub-processes of the 8th processing script
+# (attribute major axis, compute low chord, plot cross sections)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import ast # converting sting of list to list
+import h5py
+import numpy as np
+import os
+# ************************************************************
+
+
+STR_PROFILE_FILE = '08_profiles.h5'
+LIST_PROFILE_FIELDS = ['sta', 'ground_elv', 'deck_elev', 'deck_elev_fixed', 'low_ch_elv']
+
+
+# ..........................................................
+def fn_profile_store_path(str_input_dir):
+
+    """
+    Path of the profile store of an area of interest
+    """
+
+    return os.path.join(str_input_dir, '08_cross_sections', STR_PROFILE_FILE)
+# ..........................................................
+
+
+# ..........................................................
+def fn_profile_to_text(arr_profile):
+
+    """
+    Export view of a profile - the str(list) written to the GeoPackages
+    """
+
+    return str(np.asarray(arr_profile, dtype=np.float64).tolist())
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_write_profiles(str_store_path, dict_profiles):
+
+    """
+    Write (replace) the profile store
+
+    Args:
+        str_store_path: path of the HDF5 file
+        dict_profiles: {uuid: {field: array}} - every profile needs 'sta';
+            fields that a profile does not have are written as nan
+
+    Returns:
+        nothing
+    """
+
+    list_uuid = list(dict_profiles.keys())
+    arr_len = np.array([len(dict_profiles[str_uuid]['sta']) for str_uuid in list_uuid], dtype=np.int64)
+
+    arr_offset = np.zeros(len(list_uuid) + 1, dtype=np.int64)
+    arr_offset[1:] = np.cumsum(arr_len)
+
+    list_fields = [str_field for str_field in LIST_PROFILE_FIELDS
+                   if any(str_field in dict_item for dict_item in dict_profiles.values())]
+
+    os.makedirs(os.path.dirname(str_store_path), exist_ok=True)
+
+    # written to a temporary file first - a failed write keeps the old store
+    str_temp_path = str_store_path + '.tmp'
+
+    with h5py.File(str_temp_path, 'w') as h5_store:
+        h5_store.create_dataset('uuid', data=np.array(list_uuid, dtype='S'))
+        h5_store.create_dataset('offset', data=arr_offset)
+
+        for str_field in list_fields:
+            arr_flat = np.full(int(arr_offset[-1]), np.nan)
+            for int_pos, str_uuid in enumerate(list_uuid):
+                if str_field in dict_profiles[str_uuid]:
+                    arr_flat[arr_offset[int_pos]:arr_offset[int_pos + 1]] = dict_profiles[str_uuid][str_field]
+            h5_store.create_dataset(str_field, data=arr_flat)
+
+    os.replace(str_temp_path, str_store_path)
+# ----------------------------------------------------------
+
+
+# ----------------------------------------------------------
+def fn_read_profiles(str_store_path):
+
+    """
+    Read the profile store ({} if there is none)
+
+    Returns:
+        dictionary {uuid: {field: numpy array of float64}}
+    """
+
+    dict_profiles = {}
+
+    if not os.path.isfile(str_store_path):
+        return dict_profiles
+
+    with h5py.File(str_store_path, 'r') as h5_store:
+        list_uuid = [b_uuid.decode() for b_uuid in h5_store['uuid'][()]]
+        arr_offset = h5_store['offset'][()]
+
+        dict_flat = {str_field: h5_store[str_field][()]
+                     for str_field in LIST_PROFILE_FIELDS if str_field in h5_store}
+
+    for int_pos, str_uuid in enumerate(list_uuid):
+        int_start = arr_offset[int_pos]
+        int_end = arr_offset[int_pos + 1]
+        dict_profiles[str_uuid] = {str_field: arr_flat[int_start:int_end]
+                                   for str_field, arr_flat in dict_flat.items()}
+
+    return dict_profiles
+# ----------------------------------------------------------
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_get_profile(dict_profiles, row, str_field, str_text_field=None):
+
+    """
+    One profile field of a major axis line - from the store, else parsed
+    from the GeoPackage text (files written before the store existed)
+
+    Args:
+        dict_profiles: from fn_read_profiles
+        row: row of the major axis geodataframe (needs 'uuid' and str_field)
+        str_field: one of LIST_PROFILE_FIELDS
+        str_text_field: GeoPackage field parsed when the store does not
+            have str_field (default: str_field)
+
+    Returns:
+        numpy array of float64 (empty if there is no profile)
+    """
+
+    str_uuid = row['uuid'] if 'uuid' in row.index else None
+
+    if str_uuid in dict_profiles and str_field in dict_profiles[str_uuid]:
+        return dict_profiles[str_uuid][str_field]
+
+    if str_text_field is None:
+        str_text_field = str_field
+
+    str_profile = row[str_text_field]
+    if not isinstance(str_profile, str) or str_profile == '':
+        return np.zeros(0, dtype=np.float64)
+
+    return np.array(ast.literal_eval(str_profile), dtype=np.float64)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -0,0 +1,248 @@
+# Progress bars of the tx-bridge steps.  One bar format for every step
+# ("desc:(n/total)|████    | 45.0%") that is redrawn at most every
+# FLT_PROGRESS_INTERVAL seconds - the loops never wait on the console.
+#
+# Worker processes can report their own progress through a queue
+# (fn_progress_queue / fn_report_progress / fn_progress_from_queue /
+# fn_close_progress_queue) - used by the pool of step 5 (create_hull_dem)
+# to count the hulls done inside each group task.
+#
+# Quiet mode (batch and cluster runs): no bars, only one line per step
+# with the count and the time.  Set with fn_set_progress_quiet or with the
+# environment variable TX_BRIDGE_QUIET=1 (inherited by worker processes).
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.10
+# Last revised - 2023.03.11
+#
+# tx-bridge - shared by the processing scripts
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+# ************************************************************
+
+
+STR_QUIET_ENV = 'TX_BRIDGE_QUIET'
+FLT_PROGRESS_INTERVAL = 0.5 # minimum seconds between redraws
+INT_PROGRESS_WIDTH = 65 # characters of the whole bar line
+FLT_QUEUE_TIMEOUT = 600.0 # seconds without a report before the queue bar gives up
+
+
+# ..........................................................
+def fn_set_progress_quiet(b_quiet=True):
+
+    """
+    Turn the bars off (True) or on (False) - for this process and the
+    worker processes started after this call
+    """
+
+    os.environ[STR_QUIET_ENV] = '1' if b_quiet else '0'
+# ..........................................................
+
+
+# ..........................................................
+def fn_is_progress_quiet():
+
+    """
+    Are the bars turned off
+    """
+
+    return os.environ.get(STR_QUIET_ENV, '0').lower() in ('1', 'true', 'yes')
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_draw_progress_bar(int_count, int_total, str_desc, b_newline=False):
+
+    """
+    Draw (overwrite) the bar line
+    """
+
+    if int_total > 0:
+        flt_fraction = min(int_count / int_total, 1.0)
+    else:
+        flt_fraction = 1.0
+
+    str_left = str_desc + ':(' + str(int_count) + '/' + str(int_total) + ')|'
+    str_right = '| ' + '{:.1f}'.format(100 * flt_fraction) + '%'
+
+    int_bar_length = max(INT_PROGRESS_WIDTH - len(str_left) - len(str_right), 10)
+    int_filled = int(int_bar_length * flt_fraction)
+
+    str_bar = '█' * int_filled + ' ' * (int_bar_length - int_filled)
+
+    sys.stdout.write('\r' + str_left + str_bar + str_right + ('\n' if b_newline else ''))
+    sys.stdout.flush()
+# ----------------------------------------------------------
+
+
+# ..........................................................
+def fn_print_progress_summary(int_count, str_desc, flt_start):
+
+    """
+    Quiet mode - one line with the count and the time of the step
+    """
+
+    flt_seconds = time.time() - flt_start
+    print('  ' + str_desc + ': ' + str(int_count) + ' items in ' +
+          str(round(flt_seconds, 1)) + ' sec')
+# ..........................................................
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_progress(iterable, int_total=None, str_desc='Progress', flt_interval=None):
+
+    """
+    Yield the items of iterable and show the progress of the loop
+
+    Args:
+        iterable: items to loop over (list, iterrows, pool.imap ...)
+        int_total: number of items (default: len(iterable))
+        str_desc: name of the step shown on the bar
+        flt_interval: minimum seconds between redraws
+
+    Returns:
+        generator of the items of iterable
+    """
+
+    if int_total is None:
+        int_total = len(iterable)
+
+    if flt_interval is None:
+        flt_interval = FLT_PROGRESS_INTERVAL
+
+    b_quiet = fn_is_progress_quiet()
+
+    flt_start = time.time()
+    flt_last_draw = flt_start
+    int_count = 0
+
+    if not b_quiet:
+        fn_draw_progress_bar(0, int_total, str_desc)
+
+    for item in iterable:
+        yield item
+        int_count += 1
+
+        if not b_quiet:
+            flt_now = time.time()
+            if flt_now - flt_last_draw >= flt_interval:
+                fn_draw_progress_bar(int_count, int_total, str_desc)
+                flt_last_draw = flt_now
+
+    if b_quiet:
+        fn_print_progress_summary(int_count, str_desc, flt_start)
+    else:
+        fn_draw_progress_bar(int_count, int_total, str_desc, b_newline=True)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ..........................................................
+def fn_progress_queue():
+
+    """
+    Queue that worker processes report their progress to - can be passed
+    to the workers of a multiprocessing pool (in their dict_params)
+
+    Returns:
+        tuple of the manager (close with fn_close_progress_queue) and the queue
+    """
+
+    obj_manager = mp.Manager()
+
+    return obj_manager, obj_manager.Queue()
+# ..........................................................
+
+
+# ..........................................................
+def fn_close_progress_queue(obj_manager):
+
+    """
+    Stop the manager process of fn_progress_queue
+    """
+
+    if obj_manager is not None:
+        obj_manager.shutdown()
+# ..........................................................
+
+
+# ..........................................................
+def fn_report_progress(queue_progress, int_count=1):
+
+    """
+    Report int_count more items done from a worker - never blocks the
+    worker; does nothing without a queue
+    """
+
+    if queue_progress is None:
+        return
+
+    try:
+        queue_progress.put_nowait(int_count)
+    except queue.Full:
+        pass
+# ..........................................................
+
+
+# ----------------------------------------------------------
+def fn_progress_from_queue(queue_progress, int_total, str_desc='Progress', async_result=None,
+                           flt_timeout=FLT_QUEUE_TIMEOUT):
+
+    """
+    Show the progress reported by the workers until int_total items are
+    done, async_result (from pool.map_async) is ready or nothing has been
+    reported for flt_timeout seconds - never waits forever on a worker
+    that died or reports less than int_total
+
+    Args:
+        queue_progress: from fn_progress_queue
+        int_total: number of items the workers will report
+        str_desc: name of the step shown on the bar
+        async_result: optional result of the pool - stop when it is ready
+        flt_timeout: seconds without a report before giving up
+
+    Returns:
+        int of the items reported
+    """
+
+    b_quiet = fn_is_progress_quiet()
+
+    flt_start = time.time()
+    flt_last_draw = flt_start
+    flt_last_report = flt_start
+    int_count = 0
+
+    if not b_quiet:
+        fn_draw_progress_bar(0, int_total, str_desc)
+
+    while int_count < int_total:
+        try:
+            int_count += queue_progress.get(timeout=min(FLT_PROGRESS_INTERVAL, flt_timeout))
+            flt_last_report = time.time()
+        except queue.Empty:
+            if async_result is not None and async_result.ready():
+                break
+            if time.time() - flt_last_report >= flt_timeout:
+                print('\n  WARNING: ' + str_desc + ' - no progress reported for ' +
+                      str(round(flt_timeout, 1)) + ' sec')
+                break
+            continue
+
+        if not b_quiet:
+            flt_now = time.time()
+            if flt_now - flt_last_draw >= FLT_PROGRESS_INTERVAL:
+                fn_draw_progress_bar(int_count, int_total, str_desc)
+                flt_last_draw = flt_now
+
+    if b_quiet:
+        fn_print_progress_summary(int_count, str_desc, flt_start)
+    else:
+        fn_draw_progress_bar(int_count, int_total, str_desc, b_newline=True)
+
+    return int_count
+# ----------------------------------------------------------
@@ -10,15 +10,15 @@ import argparse
 
 import pdal
 import json
-import tqdm
 
 import os
 import multiprocessing as mp
 
 import time
 import datetime
-from time import sleep
 from datetime import date
+
+from progress import fn_progress
 # ************************************************************
 
 
@@ -31,7 +31,6 @@ def fn_reproject_single_las(dict_current_pipeline):
     except:
         print('File with issues: ' + dict_current_pipeline['pipeline'][0]['filename'])
         
-    sleep(0.01) # this allows the tqdm progress bar to update
         
     return 1
 # **********************************
@@ -115,11 +114,7 @@ def fn_reproject_las_in_dir(str_input_las_dir,
         
     l = len(list_pipeline_dict)
     
-    list_return_values = list(tqdm.tqdm(p.imap(fn_reproject_single_las, list_pipeline_dict),
-                                        total = l,
-                                        desc='Re-projecting',
-                                        bar_format = "{desc}:({n_fmt}/{total_fmt})|{bar}| {percentage:.1f}%",
-                                        ncols=65))
+    list_return_values = list(fn_progress(p.imap(fn_reproject_single_las, list_pipeline_dict), l, 'Re-projecting'))
     
     p.close()
     p.join()
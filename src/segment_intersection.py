@@ -0,0 +1,271 @@
+# Determine where two polylines cross.  Every edge of a major axis line is
+# tested against every edge of a stream line at once with NumPy.  The
+# scalar functions are the original per-edge tests - kept as the reference
+# for the parity benchmark in __main__.
+#
+# Created by: Andy Carter, PE
+# Created - 2023.03.06
+# Last revised - 2023.03.06
+#
+# tx-bridge - shared by the 6th processing scripts (flip major axis)
+# Uses the 'pdal' conda environment
+
+# ************************************************************
+import argparse
+import numpy as np
+
+import time
+# ************************************************************
+
+
+# =========================================================
+#Functions to determine if two lines cross
+#https://www.kite.com/python/answers/how-to-check-if-two-line-segments-intersect-in-python
+
+def fn_on_segment(p, q, r):
+    if r[0] <= max(p[0], q[0]) and r[0] >= min(p[0], q[0]) and r[1] <= max(p[1], q[1]) and r[1] >= min(p[1], q[1]):
+        return True
+    return False
+
+def fn_orientation(p, q, r):
+    val = ((q[1] - p[1]) * (r[0] - q[0])) - ((q[0] - p[0]) * (r[1] - q[1]))
+    if val == 0 : return 0
+    return 1 if val > 0 else -1
+
+def fn_intersects(seg1, seg2):
+    p1, q1 = seg1
+    p2, q2 = seg2
+
+    o1 = fn_orientation(p1, q1, p2)
+    o2 = fn_orientation(p1, q1, q2)
+    o3 = fn_orientation(p2, q2, p1)
+    o4 = fn_orientation(p2, q2, q1)
+
+    if o1 != o2 and o3 != o4:
+        return True
+
+    if o1 == 0 and fn_on_segment(p1, q1, p2) : return True
+    if o2 == 0 and fn_on_segment(p1, q1, q2) : return True
+    if o3 == 0 and fn_on_segment(p2, q2, p1) : return True
+    if o4 == 0 and fn_on_segment(p2, q2, q1) : return True
+    return False
+# =========================================================
+
+
+# ---------------------------------------------------------
+def fn_orientation_array(p, q, r):
+
+    """
+    Vectorized fn_orientation - arrays of points with x, y in the last axis
+
+    Returns:
+        array of -1, 0, 1
+    """
+
+    val = ((q[..., 1] - p[..., 1]) * (r[..., 0] - q[..., 0])) - ((q[..., 0] - p[..., 0]) * (r[..., 1] - q[..., 1]))
+    return np.sign(val).astype(np.int8)
+# ---------------------------------------------------------
+
+
+# ---------------------------------------------------------
+def fn_on_segment_array(p, q, r):
+
+    """
+    Vectorized fn_on_segment - arrays of points with x, y in the last axis
+
+    Returns:
+        boolean array
+    """
+
+    return ((r[..., 0] <= np.maximum(p[..., 0], q[..., 0])) &
+            (r[..., 0] >= np.minimum(p[..., 0], q[..., 0])) &
+            (r[..., 1] <= np.maximum(p[..., 1], q[..., 1])) &
+            (r[..., 1] >= np.minimum(p[..., 1], q[..., 1])))
+# ---------------------------------------------------------
+
+
+# .........................................................
+def fn_segment_crossings(list_road_points, list_river_points):
+
+    """
+    Test all of the road edge and river edge pairs at once
+
+    Args:
+        list_road_points: coordinates of the road (major axis) line
+        list_river_points: coordinates of the river line
+
+    Returns:
+        arr_road_edge: index of the road edge of each crossing
+        arr_river_edge: index of the river edge of each crossing
+        arr_cross_sign: sign of the cross product (river x road) of each
+            crossing - positive is right-to-left looking downstream
+
+        crossings are ordered by road edge, then river edge (the order of
+        the nested loop over fn_intersects)
+    """
+
+    # only x and y - the nhd lines may carry z / m values
+    arr_road = np.asarray(list_road_points, dtype=np.float64)[:, :2]
+    arr_river = np.asarray(list_river_points, dtype=np.float64)[:, :2]
+
+    if len(arr_road) < 2 or len(arr_river) < 2:
+        arr_empty = np.empty(0, dtype=np.intp)
+        return arr_empty, arr_empty, np.empty(0, dtype=np.int8)
+
+    # road edges down the rows, river edges across the columns
+    p1 = arr_road[:-1][:, None, :]
+    q1 = arr_road[1:][:, None, :]
+    p2 = arr_river[:-1][None, :, :]
+    q2 = arr_river[1:][None, :, :]
+
+    o1 = fn_orientation_array(p1, q1, p2)
+    o2 = fn_orientation_array(p1, q1, q2)
+    o3 = fn_orientation_array(p2, q2, p1)
+    o4 = fn_orientation_array(p2, q2, q1)
+
+    arr_mask = (o1 != o2) & (o3 != o4)
+
+    # collinear special cases
+    arr_mask |= (o1 == 0) & fn_on_segment_array(p1, q1, p2)
+    arr_mask |= (o2 == 0) & fn_on_segment_array(p1, q1, q2)
+    arr_mask |= (o3 == 0) & fn_on_segment_array(p2, q2, p1)
+    arr_mask |= (o4 == 0) & fn_on_segment_array(p2, q2, q1)
+
+    arr_road_edge, arr_river_edge = np.nonzero(arr_mask)
+
+    # cross product of the river vector and the road vector
+    arr_road_vec = (arr_road[1:] - arr_road[:-1])[arr_road_edge]
+    arr_river_vec = (arr_river[1:] - arr_river[:-1])[arr_river_edge]
+
+    arr_cross = arr_river_vec[:, 0] * arr_road_vec[:, 1] - arr_river_vec[:, 1] * arr_road_vec[:, 0]
+
+    return arr_road_edge, arr_river_edge, np.sign(arr_cross).astype(np.int8)
+# .........................................................
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def fn_segment_crossings_loop(list_road_points, list_river_points):
+
+    """
+    Reference - the original nested loop over fn_intersects with the
+    same return values as fn_segment_crossings
+    """
+
+    list_road_edge = []
+    list_river_edge = []
+    list_cross_sign = []
+
+    for i in range(len(list_road_points) - 1):
+        road_edge = tuple(list_road_points[i:i+2])
+
+        for j in range(len(list_river_points) - 1):
+            river_edge = tuple(list_river_points[j:j+2])
+
+            if fn_intersects(road_edge, river_edge):
+                river_vector = [river_edge[1][0] - river_edge[0][0], river_edge[1][1] - river_edge[0][1]]
+                bridge_vector = [road_edge[1][0] - road_edge[0][0], road_edge[1][1] - road_edge[0][1]]
+
+                # cross product (np.cross of the two 2d vectors)
+                a = river_vector[0] * bridge_vector[1] - river_vector[1] * bridge_vector[0]
+
+                list_road_edge.append(i)
+                list_river_edge.append(j)
+                list_cross_sign.append(int(np.sign(a)))
+
+    return list_road_edge, list_river_edge, list_cross_sign
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+def fn_benchmark_segment_crossings(int_road_pts, int_river_pts, int_trials):
+
+    """
+    Check that the vectorized crossings match the nested loop and time both
+    on random wandering lines
+
+    Args:
+        int_road_pts: number of points on each road line
+        int_river_pts: number of points on each river line
+        int_trials: number of random line pairs
+
+    Returns:
+        T/F all trials matched
+    """
+
+    rng = np.random.default_rng(0)
+
+    flt_time_loop = 0.0
+    flt_time_vector = 0.0
+    b_all_match = True
+    int_crossings = 0
+
+    for int_trial in range(int_trials):
+        # road runs west-east, river wanders south-north through it
+        arr_road = np.column_stack((np.linspace(0, 100, int_road_pts),
+                                    np.cumsum(rng.normal(0, 1, int_road_pts)) + 50))
+        arr_river = np.column_stack((np.cumsum(rng.normal(0, 2, int_river_pts)) + 50,
+                                     np.linspace(0, 100, int_river_pts)))
+
+        list_road = [tuple(pt) for pt in arr_road.tolist()]
+        list_river = [tuple(pt) for pt in arr_river.tolist()]
+
+        flt_start = time.perf_counter()
+        tup_loop = fn_segment_crossings_loop(list_road, list_river)
+        flt_time_loop += time.perf_counter() - flt_start
+
+        flt_start = time.perf_counter()
+        tup_vector = fn_segment_crossings(list_road, list_river)
+        flt_time_vector += time.perf_counter() - flt_start
+
+        int_crossings += len(tup_loop[0])
+
+        for list_loop, arr_vector in zip(tup_loop, tup_vector):
+            if list(list_loop) != arr_vector.tolist():
+                b_all_match = False
+
+    print('Trials: ' + str(int_trials) + '  Crossings: ' + str(int_crossings))
+    print('Nested loop (s): ' + str(round(flt_time_loop, 4)))
+    print('Vectorized (s):  ' + str(round(flt_time_vector, 4)))
+    if flt_time_vector > 0:
+        print('Speed up: ' + str(round(flt_time_loop / flt_time_vector, 1)) + 'x')
+    print('Results match: ' + str(b_all_match))
+
+    return b_all_match
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='========= BENCHMARK - VECTORIZED SEGMENT CROSSING KERNEL ==========')
+
+    parser.add_argument('-r',
+                        dest = "int_road_pts",
+                        help='OPTIONAL: points on each road line: Default=10',
+                        required=False,
+                        default=10,
+                        metavar='INTEGER',
+                        type=int)
+
+    parser.add_argument('-s',
+                        dest = "int_river_pts",
+                        help='OPTIONAL: points on each stream line: Default=2000',
+                        required=False,
+                        default=2000,
+                        metavar='INTEGER',
+                        type=int)
+
+    parser.add_argument('-t',
+                        dest = "int_trials",
+                        help='OPTIONAL: number of random line pairs: Default=20',
+                        required=False,
+                        default=20,
+                        metavar='INTEGER',
+                        type=int)
+
+    args = vars(parser.parse_args())
+
+    fn_benchmark_segment_crossings(args['int_road_pts'],
+                                   args['int_river_pts'],
+                                   args['int_trials'])
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
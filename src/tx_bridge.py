@@ -34,6 +34,7 @@ from assign_osm_names_major_axis import fn_assign_osm_names_major_axis
 from attribute_major_axis import fn_attribute_mjr_axis
 from get_usgs_dem_from_shape import fn_get_usgs_dem_from_shape
 from composite_terrain import fn_composite_terrain
+from progress import fn_set_progress_quiet
 
 import argparse
 import os
@@ -89,11 +90,18 @@ def fn_run_tx_bridge(str_input_shp_path_arg,
                      str_out_arg,
                      int_class,
                      b_is_feet,
-                     int_start_step):
+                     int_start_step,
+                     int_workers=0,
+                     b_quiet=False):
     
     # mannualy setting the step to start computations
     int_step = int_start_step
     
+    # no progress bars (batch / cluster runs) - one line per step instead
+    # (also set with the environment variable TX_BRIDGE_QUIET=1)
+    if b_quiet:
+        fn_set_progress_quiet(True)
+    
     flt_start_run_tx_bridge = time.time()
     
     print(" ")
@@ -109,6 +117,8 @@ def fn_run_tx_bridge(str_input_shp_path_arg,
     print("  ---[c]   Optional: Point Classification: " + str(int_class))
     print("  ---[v]   Optional: Vertical in feet: " + str(b_is_feet))
     print("  ---[s]   Optional: Starting step: " + str(int_start_step))
+    print("  ---[n]   Optional: Number of workers: " + str(int_workers))
+    print("  ---[q]   Optional: Quiet (no progress bars): " + str(b_quiet))
 
     print("===================================================================")
     print(" ")
@@ -223,6 +233,8 @@ def fn_run_tx_bridge(str_input_shp_path_arg,
         
         # ---- Step 5: create DEM raster for each hull ----
         flt_dem_resolution = 0.3 # resolution of dem in meters
+        flt_crop_buffer = 5 # distance to buffer hull when cropping points (meters)
+        int_chunksize = 1 # tile groups sent to a worker at a time
         
         # create a folder for major axis lines
         str_deck_dem_dir = os.path.join(str_out_arg, "05_bridge_deck_dems") 
@@ -233,7 +245,10 @@ def fn_run_tx_bridge(str_input_shp_path_arg,
             fn_create_hull_dems(str_bridge_polygons_path,
                                 str_deck_dem_dir,
                                 flt_dem_resolution,
-                                b_is_feet)
+                                b_is_feet,
+                                flt_crop_buffer,
+                                int_workers,
+                                int_chunksize)
             '''
             # delete the extra dems
             fn_delete_files(str_deck_dem_dir)
@@ -286,7 +301,7 @@ def fn_run_tx_bridge(str_input_shp_path_arg,
             os.mkdir(str_deck_profiles_dir)
         
         if int_step <= 8:
-            fn_attribute_mjr_axis(str_out_arg, int_class)
+            fn_attribute_mjr_axis(str_out_arg, int_class, int_workers)
         '''
         if int_step <= 8:
             fn_extract_deck_profile(str_mjr_axis_shp_path,
@@ -326,6 +341,7 @@ def fn_run_tx_bridge(str_input_shp_path_arg,
         
         # ---- Step 10: merge the dems (bridge and bare earth) ----
         str_output_dem_name = ''
+        str_output_format = 'tif' # tif (tiled geotiff), cog (with overviews) or vrt (no copy)
         
         str_healed_dem_dir = os.path.join(str_out_arg, "10_healed_dem") 
         if not os.path.exists(str_healed_dem_dir):
@@ -337,7 +353,8 @@ def fn_run_tx_bridge(str_input_shp_path_arg,
             fn_composite_terrain(str_input_path_step_10,
                                  str_deck_dem_dir,
                                  str_healed_dem_dir,
-                                 str_output_dem_name)
+                                 str_output_dem_name,
+                                 str_output_format)
     
     
         # --------------------------------------------------
@@ -400,6 +417,22 @@ if __name__ == '__main__':
                     metavar='INTEGER',
                     type=int)
     
+    parser.add_argument('-n', '--workers',
+                    dest = "int_workers",
+                    help='OPTIONAL: number of worker processes: Default=0 (will deploy all cores, less one for overhead)',
+                    required=False,
+                    default=0,
+                    metavar='INTEGER',
+                    type=int)
+    
+    parser.add_argument('-q',
+                    dest = "b_quiet",
+                    help='OPTIONAL: no progress bars, for batch runs: Default=False',
+                    required=False,
+                    default=False,
+                    metavar='T/F',
+                    type=str2bool)
+    
     args = vars(parser.parse_args())
     
     str_input_shp_path_arg = args['str_input_shp_path_arg']
@@ -407,9 +440,13 @@ if __name__ == '__main__':
     int_class = args['int_class']
     b_is_feet = args['b_is_feet']
     int_start_step = args['int_start_step']
+    int_workers = args['int_workers']
+    b_quiet = args['b_quiet']
     
     fn_run_tx_bridge(str_input_shp_path_arg,
                      str_out_arg,
                      int_class,
                      b_is_feet,
-                     int_start_step)
\ No newline at end of file
+                     int_start_step,
+                     int_workers,
+                     b_quiet)
\ No newline at end of file
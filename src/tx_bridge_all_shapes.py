@@ -46,7 +46,8 @@ def fn_run_multiple_tx_bridge(str_input_shp_path_arg,
                               str_out_arg,
                               int_class,
                               b_is_feet,
-                              str_field_name):
+                              str_field_name,
+                              int_workers=0):
     
 
     flt_start_run_tx_bridge = time.time()
@@ -64,6 +65,7 @@ def fn_run_multiple_tx_bridge(str_input_shp_path_arg,
     print("  ---[c]   Optional: Point Classification: " + str(int_class))
     print("  ---[v]   Optional: Vertical in feet: " + str(b_is_feet))
     print("  ---[f]   Optional: Naming Field: " + str(str_field_name))
+    print("  ---[n]   Optional: Number of workers: " + str(int_workers))
 
     print("===================================================================")
     print(" ")
@@ -100,7 +102,8 @@ def fn_run_multiple_tx_bridge(str_input_shp_path_arg,
                          str_sub_folder,
                          int_class,
                          b_is_feet,
-                         int_start_step)
+                         int_start_step,
+                         int_workers)
         
     flt_end_run_run_tx_bridge = time.time()
     flt_time_pass_tx_bridge = (flt_end_run_run_tx_bridge - flt_start_run_tx_bridge) // 1
@@ -152,6 +155,13 @@ if __name__ == '__main__':
                         metavar='T/F',
                         type=str2bool)
     
+    parser.add_argument('-n', '--workers',
+                        dest = "int_workers",
+                        help='OPTIONAL: number of worker processes: Default=0 (will deploy all cores, less one for overhead)',
+                        required=False,
+                        default=0,
+                        metavar='INTEGER',
+                        type=int)
     
     args = vars(parser.parse_args())
     
@@ -160,6 +170,7 @@ if __name__ == '__main__':
     int_class = args['int_class']
     b_is_feet = args['b_is_feet']
     str_field_name = args['str_field_name']
+    int_workers = args['int_workers']
     
     int_start_step = 1
     
@@ -167,4 +178,5 @@ if __name__ == '__main__':
                               str_out_arg,
                               int_class,
                               b_is_feet,
-                              str_field_name)
\ No newline at end of file
+                              str_field_name,
+                              int_workers)
\ No newline at end of file
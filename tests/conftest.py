@@ -0,0 +1,7 @@
+# The processing scripts are run from 'src' and import each other as
+# top-level modules - the tests do the same.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
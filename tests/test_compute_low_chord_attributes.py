@@ -0,0 +1,70 @@
+# Re-running the compute low chord step (compute_low_chord_attributes.py)
+# on the same area of interest gives the same output - the deck of the 8th
+# step is not overwritten in the profile store.
+
+import os
+
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip('geopandas')
+pytest.importorskip('h5py')
+
+from shapely.geometry import LineString
+
+from compute_low_chord_attributes import fn_compute_low_chord_attributes
+from profile_store import fn_profile_store_path, fn_read_profiles, fn_write_profiles, fn_profile_to_text
+
+
+# deck on the ground off the bridge (as sampled by the 8th step), the
+# abutments are not within the tolerance of the ground - they get fixed
+ARR_STA = np.arange(0.0, 20.0)
+ARR_GROUND = np.array([110, 109, 108, 107.5, 106, 104, 102, 100, 99, 98,
+                       98, 99, 100, 102, 104, 106, 107.0, 108.1, 109, 110], dtype=np.float64)
+ARR_DECK = ARR_GROUND.copy()
+ARR_DECK[4:17] = 108.0
+
+
+def fn_make_input(str_input_dir):
+    str_xs_folder = os.path.join(str_input_dir, '08_cross_sections')
+    os.makedirs(str_xs_folder)
+
+    gdf_mjr = gpd.GeoDataFrame({'uuid': ['bridge_a'],
+                                'nbi_thick': [''],
+                                'sta': [fn_profile_to_text(ARR_STA)],
+                                'ground_elv': [fn_profile_to_text(ARR_GROUND)],
+                                'deck_elev': [fn_profile_to_text(ARR_DECK)]},
+                               geometry=[LineString([(0, 0), (19, 0)])],
+                               crs='EPSG:3857')
+    gdf_mjr.to_file(os.path.join(str_xs_folder, '08_05_mjr_axis_xs_w_feature_id_nbi.gpkg'), driver='GPKG')
+
+    fn_write_profiles(fn_profile_store_path(str_input_dir),
+                      {'bridge_a': {'sta': ARR_STA, 'ground_elv': ARR_GROUND, 'deck_elev': ARR_DECK}})
+
+
+def fn_run_step(str_input_dir):
+    fn_compute_low_chord_attributes(str_input_dir)
+
+    str_out = os.path.join(str_input_dir, '08_cross_sections', '08_06_mjr_axis_xs_w_feature_id_nbi_low.gpkg')
+    gdf_out = gpd.read_file(str_out)
+    dict_profiles = fn_read_profiles(fn_profile_store_path(str_input_dir))
+
+    return gdf_out, dict_profiles
+
+
+def test_rerun_gives_the_same_output(tmp_path):
+    str_input_dir = str(tmp_path)
+    fn_make_input(str_input_dir)
+
+    gdf_first, dict_first = fn_run_step(str_input_dir)
+    gdf_second, dict_second = fn_run_step(str_input_dir)
+
+    # the deck of the 8th step is kept, the fixed deck is its own field
+    np.testing.assert_array_equal(dict_second['bridge_a']['deck_elev'], ARR_DECK)
+    assert not np.array_equal(dict_first['bridge_a']['deck_elev_fixed'], ARR_DECK)
+
+    for str_field in dict_first['bridge_a']:
+        np.testing.assert_array_equal(dict_first['bridge_a'][str_field], dict_second['bridge_a'][str_field])
+
+    for str_column in ['deck_elev', 'low_ch_elv', 'convey_ar', 'min_low_ch', 'min_ground']:
+        assert gdf_first[str_column].tolist() == gdf_second[str_column].tolist()
@@ -0,0 +1,58 @@
+# Tests of sampling a raster at the points of a profile (ground_dem_sampler.py)
+
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip('rasterio')
+
+from rasterio.io import MemoryFile
+from rasterio.transform import from_origin
+
+from ground_dem_sampler import fn_sample_raster_at_points
+
+
+# 3 rows x 4 columns of 1 x 1 cells - x from 100 to 104, y from 200 to 197
+ARR_RASTER = np.arange(12, dtype=np.float32).reshape(3, 4)
+TRANSFORM = from_origin(100.0, 200.0, 1.0, 1.0)
+STR_CRS = 'EPSG:3857'
+
+
+@pytest.fixture
+def src():
+    with MemoryFile() as memfile:
+        with memfile.open(driver='GTiff', height=3, width=4, count=1,
+                          dtype='float32', crs=STR_CRS, transform=TRANSFORM,
+                          nodata=-9999.0) as dst:
+            dst.write(ARR_RASTER, 1)
+        with memfile.open() as src:
+            yield src
+
+
+def test_points_inside(src):
+    arr_values = fn_sample_raster_at_points(src, [100.5, 103.5, 101.2], [199.5, 197.5, 198.1], STR_CRS)
+
+    np.testing.assert_array_equal(arr_values, [0.0, 11.0, 5.0])
+
+
+def test_point_just_outside_is_nan(src):
+    arr_values = fn_sample_raster_at_points(src, [100.5, 104.2], [199.5, 198.5], STR_CRS)
+
+    assert arr_values[0] == 0.0
+    assert np.isnan(arr_values[1])
+
+
+def test_point_just_outside_takes_nearest_edge_cell(src):
+    # right of the raster, below it and past a corner
+    arr_values = fn_sample_raster_at_points(src,
+                                            [104.2, 101.5, 99.7],
+                                            [198.5, 196.9, 200.3],
+                                            STR_CRS,
+                                            b_nearest_edge=True)
+
+    np.testing.assert_array_equal(arr_values, [7.0, 9.0, 0.0])
+
+
+def test_all_points_outside_with_nearest_edge(src):
+    arr_values = fn_sample_raster_at_points(src, [110.0], [198.5], STR_CRS, b_nearest_edge=True)
+
+    np.testing.assert_array_equal(arr_values, [7.0])
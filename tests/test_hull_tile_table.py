@@ -0,0 +1,81 @@
+# Tests of the step 5 grouping of hulls by las tiles (hull_tile_table.py)
+
+from hull_tile_table import fn_group_hulls_by_tiles, INT_MAX_HULLS_PER_GROUP
+
+
+def fn_tile(int_col, int_row):
+    return 'tile_' + str(int_col) + '_' + str(int_row) + '.las'
+
+
+def fn_contiguous_hulls(int_tiles=10, int_hulls_per_tile=3):
+    """
+    Hulls on a contiguous int_tiles x int_tiles tiling: some inside one
+    tile, one straddling each vertical and horizontal tile edge - the
+    straddling hulls chain every tile together
+    """
+    list_hull_clouds = []
+    for int_col in range(int_tiles):
+        for int_row in range(int_tiles):
+            for _ in range(int_hulls_per_tile):
+                list_hull_clouds.append([fn_tile(int_col, int_row)])
+            if int_col + 1 < int_tiles:
+                list_hull_clouds.append([fn_tile(int_col, int_row), fn_tile(int_col + 1, int_row)])
+            if int_row + 1 < int_tiles:
+                list_hull_clouds.append([fn_tile(int_col, int_row + 1), fn_tile(int_col, int_row)])
+    return list_hull_clouds
+
+
+def test_every_hull_in_one_group_with_its_tiles():
+    list_hull_clouds = fn_contiguous_hulls()
+    list_groups = fn_group_hulls_by_tiles(list_hull_clouds)
+
+    list_all_pos = sorted(int_pos for list_pos, _ in list_groups for int_pos in list_pos)
+    assert list_all_pos == list(range(len(list_hull_clouds)))
+
+    for list_pos, list_clouds in list_groups:
+        assert list_clouds == sorted(set(list_clouds))
+        for int_pos in list_pos:
+            assert set(list_hull_clouds[int_pos]) <= set(list_clouds)
+
+
+def test_groups_do_not_collapse_on_contiguous_tiling():
+    list_hull_clouds = fn_contiguous_hulls(int_tiles=10)
+    list_groups = fn_group_hulls_by_tiles(list_hull_clouds)
+
+    # one group per tile and per tile edge - not one chained group
+    assert len(list_groups) == 100 + 2 * 90
+
+    # a task reads at most the two tiles of an edge
+    assert max(len(list_clouds) for _, list_clouds in list_groups) <= 2
+
+    # each tile is read by a bounded number of tasks (itself + 4 edges)
+    dict_tile_tasks = {}
+    for _, list_clouds in list_groups:
+        for str_tile in list_clouds:
+            dict_tile_tasks[str_tile] = dict_tile_tasks.get(str_tile, 0) + 1
+    assert max(dict_tile_tasks.values()) <= 5
+
+
+def test_hulls_sharing_tiles_are_read_together():
+    list_hull_clouds = [['a.las'], ['a.las'], ['b.las', 'a.las'], ['a.las', 'b.las']]
+    list_groups = fn_group_hulls_by_tiles(list_hull_clouds)
+
+    assert list_groups == [([0, 1], ['a.las']), ([2, 3], ['a.las', 'b.las'])]
+
+
+def test_group_size_is_capped():
+    list_hull_clouds = [['a.las']] * (2 * INT_MAX_HULLS_PER_GROUP + 1)
+    list_groups = fn_group_hulls_by_tiles(list_hull_clouds)
+
+    assert [len(list_pos) for list_pos, _ in list_groups] == [INT_MAX_HULLS_PER_GROUP,
+                                                              INT_MAX_HULLS_PER_GROUP,
+                                                              1]
+
+    list_groups = fn_group_hulls_by_tiles(list_hull_clouds, int_max_hulls=4)
+    assert max(len(list_pos) for list_pos, _ in list_groups) == 4
+
+
+def test_hull_without_tiles():
+    list_groups = fn_group_hulls_by_tiles([[], ['a.las']])
+
+    assert list_groups == [([0], []), ([1], ['a.las'])]
@@ -0,0 +1,145 @@
+# Tests of the road / stream name similarity (name_match.py) - one LCS
+# metric for every name length - and of the nbi conflation winner it feeds
+# (conflate_nbi.py).  The scores below are frozen: a change of the metric
+# must show up here.
+
+import difflib
+import random
+
+import numpy as np
+import pytest
+
+from name_match import fn_name_similarity, fn_lcs_length
+
+
+# (osm / nhd name, nbi name, frozen score of the normalized names)
+LIST_FROZEN_PAIRS = [
+    ('FM 1826', 'Farm to Market 1826', 1.0),
+    ('FM0969', 'Farm-to-Market Rd 0969', 1.0),
+    ('IH0035', 'Interstate 35', 1.0),
+    ('I-35', 'IH 35', 1.0),
+    ('SH 71', 'State Highway 71', 1.0),
+    ('US 290', 'US Highway 290', 1.0),
+    ('W William Cannon Dr', 'West William Cannon Drive', 1.0),
+    ('Onion Creek', 'ONION CRK', 1.0),
+    ('Trib to Onion Creek', 'Onion Creek', 0.6285714285714286),
+    ('Barton Creek', 'Brushy Creek', 0.6666666666666666),
+    ('Slaughter Creek', 'Colorado River', 0.3448275862068966),
+    ('S Congress Ave', 'South Congress Avenue', 1.0),
+    ('CR 110', 'County Road 110', 1.0),
+    ('Loop 1', 'MoPac Expressway', 0.2727272727272727),
+    ('', '', 1.0),
+    ('RM 2222', '', 0.0),
+]
+
+
+def fn_lcs_ratio_dp(str_a, str_b):
+    # reference: 2 * longest common subsequence / total length
+    list_prev = [0] * (len(str_b) + 1)
+    for char_a in str_a:
+        list_curr = [0]
+        for int_j, char_b in enumerate(str_b):
+            if char_a == char_b:
+                list_curr.append(list_prev[int_j] + 1)
+            else:
+                list_curr.append(max(list_prev[int_j + 1], list_curr[int_j]))
+        list_prev = list_curr
+
+    int_total = len(str_a) + len(str_b)
+    return 1.0 if int_total == 0 else 2.0 * list_prev[-1] / int_total
+
+
+def test_frozen_pair_scores():
+    list_a = [tup_pair[0] for tup_pair in LIST_FROZEN_PAIRS]
+    list_b = [tup_pair[1] for tup_pair in LIST_FROZEN_PAIRS]
+    arr_expected = np.array([tup_pair[2] for tup_pair in LIST_FROZEN_PAIRS])
+
+    np.testing.assert_allclose(fn_name_similarity(list_a, list_b), arr_expected, rtol=0, atol=1e-12)
+
+
+def test_one_metric_for_every_length():
+    # names past one 64 character word of the kernel are scored by the same
+    # LCS metric as short names - never by a different (difflib) score
+    obj_random = random.Random(42)
+    list_a = []
+    list_b = []
+    for int_len in [1, 5, 63, 64, 65, 127, 128, 129, 200]:
+        for _ in range(10):
+            list_a.append(''.join(obj_random.choice('abc ') for _ in range(int_len)))
+            list_b.append(''.join(obj_random.choice('abc ') for _ in range(obj_random.randint(1, 200))))
+
+    arr_score = fn_name_similarity(list_a, list_b, b_normalize=False)
+
+    for str_a, str_b, flt_score in zip(list_a, list_b, arr_score):
+        assert flt_score == pytest.approx(fn_lcs_ratio_dp(str_a, str_b), abs=1e-12)
+        # difflib counts a subset of the common subsequence
+        assert flt_score >= difflib.SequenceMatcher(a=str_a, b=str_b).ratio() - 1e-12
+
+
+def test_long_name_is_not_penalized():
+    str_short = 'Farm to Market 1826'
+    str_long = str_short + ' ' + 'Frontage Road Northbound Service Lane To Interstate Highway 35'
+
+    str_lower_short = str_short.lower()
+    str_lower_long = str_long.lower()
+    assert len(str_lower_long) > 64
+
+    # every character of the short name is in the long name, in order
+    assert fn_lcs_length([str_lower_short], [str_lower_long])[0] == len(str_lower_short)
+    assert fn_lcs_length([str_lower_long], [str_lower_long])[0] == len(str_lower_long)
+
+    arr_score = fn_name_similarity([str_long], [str_long + ' Bridge'], b_normalize=False)
+    assert arr_score[0] == pytest.approx(2.0 * len(str_long) / (2 * len(str_long) + 7))
+
+
+def test_name_winner():
+    # the nbi name that an osm name conflates to (highest score)
+    list_nbi_names = ['Farm to Market 1826', 'State Highway 71', 'US Highway 290', 'Loop 1']
+
+    for str_osm, str_winner in [('FM 1826', 'Farm to Market 1826'),
+                                ('SH 71', 'State Highway 71'),
+                                ('US 290', 'US Highway 290'),
+                                ('LP 1', 'Loop 1')]:
+        arr_score = fn_name_similarity([str_osm] * len(list_nbi_names), list_nbi_names)
+        assert list_nbi_names[int(np.argmax(arr_score))] == str_winner
+
+
+def test_conflation_winner():
+    pytest.importorskip('geopandas')
+    import pandas as pd
+    from conflate_nbi import fn_calc_match_score, fn_best_line_per_asset
+
+    # two nbi points, three major axis lines each - same distance and span,
+    # only the names tell the lines apart
+    df_nbi_pnts = pd.DataFrame({'Asset_Name': ['A', 'B'],
+                                'Facility_C': ['Farm to Market 1826', 'US Highway 290'],
+                                'Feature_In': ['Onion Creek', 'Barton Creek'],
+                                'Structur_1': [100.0, 100.0]})
+
+    df_mjr = pd.DataFrame({'nbi_asset': ['A', 'A', 'A', 'B', 'B', 'B'],
+                           'nbi_dist': [10.0] * 6,
+                           'hull_len': [100.0] * 6,
+                           'name': ['Slaughter Creek Rd', 'FM 1826', None,
+                                    'Loop 1', None, 'US 290'],
+                           'ref': [None, None, 'SH 71', None, 'MoPac Expressway', None],
+                           'nhd_name': ['Onion Creek', 'Onion Creek', 'Onion Creek',
+                                        'Barton Creek', 'Barton Creek', 'Barton Creek'],
+                           'dist_river': [5.0] * 6},
+                          index=[10, 11, 12, 20, 21, 22])
+
+    df_scores = fn_calc_match_score(df_mjr, df_nbi_pnts, 300)
+    df_best = fn_best_line_per_asset(df_scores)
+
+    assert sorted(df_best.index.tolist()) == [11, 22]
+    np.testing.assert_allclose(df_scores.loc[[11, 22], 'score_road'], [1.0, 1.0])
+
+
+def test_conflation_tie_takes_last_line():
+    pytest.importorskip('geopandas')
+    import pandas as pd
+    from conflate_nbi import fn_best_line_per_asset
+
+    df_scores = pd.DataFrame({'nbi_asset': ['A', 'A', 'B'], 'score': [0.8, 0.8, 0.5]},
+                             index=[3, 1, 2])
+
+    assert sorted(fn_best_line_per_asset(df_scores).index.tolist()) == [1, 2]
@@ -0,0 +1,131 @@
+# Parity of the numpy profile kernels (profile_kernels.py) with the pandas
+# functions they replaced in compute_low_chord_attributes.py.  The expected
+# values in data/profile_kernels_expected.json were frozen from the pandas
+# functions: random synthetic profiles and edge cases (no deck start or
+# end, nan ground, abutment out of tolerance, deck above all of the
+# ground, two spans).
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from profile_kernels import (fn_max_ground_low_chord, fn_area_under_profile, fn_start_end_deck_index,
+                             fn_fix_deck_left_abut, fn_fix_deck_right_abut, fn_interpolate_nan,
+                             fn_low_chord_profile)
+
+
+STR_EXPECTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'data', 'profile_kernels_expected.json')
+
+with open(STR_EXPECTED_PATH) as f:
+    DICT_EXPECTED = json.load(f)
+
+FLT_TOLERANCE = DICT_EXPECTED['flt_tolerance']
+FLT_THICKNESS = DICT_EXPECTED['flt_thickness']
+LIST_PROFILES = DICT_EXPECTED['profiles']
+
+
+def fn_profile_arrays(dict_profile):
+    return (np.array(dict_profile['sta'], dtype=np.float64),
+            np.array(dict_profile['ground_elv'], dtype=np.float64),
+            np.array(dict_profile['deck_elev'], dtype=np.float64))
+
+
+def fn_fixed_deck(arr_ground, arr_deck):
+    # as fn_compute_low_chord_attributes - left abutment, then right
+    arr_start, arr_end = fn_start_end_deck_index(arr_ground, arr_deck)
+
+    arr_new_deck = arr_deck
+    if len(arr_start) > 0:
+        arr_new_deck = fn_fix_deck_left_abut(arr_ground, arr_new_deck, FLT_TOLERANCE, arr_start[0])
+    if len(arr_end) > 0:
+        arr_new_deck = fn_fix_deck_right_abut(arr_ground, arr_new_deck, FLT_TOLERANCE, arr_end[-1])
+
+    return arr_new_deck
+
+
+@pytest.fixture(params=LIST_PROFILES, ids=[dict_profile['name'] for dict_profile in LIST_PROFILES])
+def dict_profile(request):
+    return request.param
+
+
+def test_start_end_deck_index(dict_profile):
+    arr_sta, arr_ground, arr_deck = fn_profile_arrays(dict_profile)
+    arr_start, arr_end = fn_start_end_deck_index(arr_ground, arr_deck)
+
+    assert arr_start.tolist() == dict_profile['start_index']
+    assert arr_end.tolist() == dict_profile['end_index']
+
+
+def test_fix_deck_abutments(dict_profile):
+    arr_sta, arr_ground, arr_deck = fn_profile_arrays(dict_profile)
+    arr_new_deck = fn_fixed_deck(arr_ground, arr_deck)
+
+    np.testing.assert_allclose(arr_new_deck,
+                               np.array(dict_profile['fixed_deck_elev'], dtype=np.float64),
+                               rtol=0, atol=1e-9)
+
+
+def test_conveyance_area(dict_profile):
+    arr_sta, arr_ground, arr_deck = fn_profile_arrays(dict_profile)
+    arr_new_deck = fn_fixed_deck(arr_ground, arr_deck)
+
+    arr_low = fn_max_ground_low_chord(arr_ground, arr_new_deck, FLT_THICKNESS)
+    flt_area = fn_area_under_profile(arr_sta, arr_ground, arr_low)
+
+    np.testing.assert_allclose(flt_area, dict_profile['convey_ar'], rtol=1e-12, atol=1e-9)
+
+
+def test_fixtures_cover_the_abutment_fixes():
+    int_left = 0
+    int_right = 0
+    for dict_profile in LIST_PROFILES:
+        arr_sta, arr_ground, arr_deck = fn_profile_arrays(dict_profile)
+        arr_start, arr_end = fn_start_end_deck_index(arr_ground, arr_deck)
+        if len(arr_start) > 0:
+            arr_left = fn_fix_deck_left_abut(arr_ground, arr_deck, FLT_TOLERANCE, arr_start[0])
+            int_left += not np.array_equal(arr_left, arr_deck, equal_nan=True)
+        if len(arr_end) > 0:
+            arr_right = fn_fix_deck_right_abut(arr_ground, arr_deck, FLT_TOLERANCE, arr_end[-1])
+            int_right += not np.array_equal(arr_right, arr_deck, equal_nan=True)
+
+    assert int_left > 0
+    assert int_right > 0
+
+
+def test_interpolate_nan_as_pandas():
+    # pandas interpolate(): leading nan kept, trailing nan set to the last value
+    arr_values = np.array([np.nan, 1.0, np.nan, 3.0, np.nan, np.nan])
+
+    np.testing.assert_array_equal(fn_interpolate_nan(arr_values),
+                                  [np.nan, 1.0, 2.0, 3.0, 3.0, 3.0])
+    np.testing.assert_array_equal(fn_interpolate_nan(np.full(3, np.nan)), np.full(3, np.nan))
+
+
+def test_low_chord_profile_keeps_the_deck(dict_profile):
+    arr_sta, arr_ground, arr_deck = fn_profile_arrays(dict_profile)
+    arr_deck_before = arr_deck.copy()
+
+    dict_first = fn_low_chord_profile(arr_sta, arr_ground, arr_deck, FLT_THICKNESS, FLT_TOLERANCE)
+    dict_second = fn_low_chord_profile(arr_sta, arr_ground, arr_deck, FLT_THICKNESS, FLT_TOLERANCE)
+
+    # the deck is only read - a second run gives the same output
+    np.testing.assert_array_equal(arr_deck, arr_deck_before)
+    for str_key in dict_first:
+        np.testing.assert_array_equal(dict_first[str_key], dict_second[str_key])
+
+
+def test_low_chord_profile_fixed_deck(dict_profile):
+    arr_sta, arr_ground, arr_deck = fn_profile_arrays(dict_profile)
+    dict_low_chord = fn_low_chord_profile(arr_sta, arr_ground, arr_deck, FLT_THICKNESS, FLT_TOLERANCE)
+
+    if dict_low_chord['convey_ar'] > 0:
+        np.testing.assert_allclose(dict_low_chord['deck_elev_fixed'],
+                                   np.array(dict_profile['fixed_deck_elev'], dtype=np.float64),
+                                   rtol=0, atol=0.005 + 1e-9)
+        assert dict_low_chord['convey_ar'] == round(dict_profile['convey_ar'], 2)
+    else:
+        np.testing.assert_array_equal(dict_low_chord['deck_elev_fixed'], arr_deck)
+        assert dict_low_chord['min_low_ch'] == -99.0
@@ -0,0 +1,123 @@
+# Tests of the progress bars of the tx-bridge steps (progress.py) - the
+# bar, quiet mode and the queue that worker processes report to.
+
+import queue
+import time
+
+import pytest
+
+from progress import (fn_progress, fn_set_progress_quiet, fn_is_progress_quiet, fn_progress_queue,
+                      fn_close_progress_queue, fn_report_progress, fn_progress_from_queue,
+                      STR_QUIET_ENV)
+
+
+class FakeAsyncResult:
+    # stands in for the result of pool.map_async
+    def __init__(self, b_ready):
+        self.b_ready = b_ready
+
+    def ready(self):
+        return self.b_ready
+
+
+@pytest.fixture
+def b_quiet(request, monkeypatch):
+    monkeypatch.setenv(STR_QUIET_ENV, '1' if request.param else '0')
+    return request.param
+
+
+@pytest.mark.parametrize('b_quiet', [False], indirect=True)
+def test_progress_yields_every_item(b_quiet, capsys):
+    list_items = list(fn_progress(iter(['a', 'b', 'c']), 3, 'Test Step'))
+
+    assert list_items == ['a', 'b', 'c']
+
+    str_out = capsys.readouterr().out
+    assert str_out.startswith('\rTest Step:(0/3)|')
+    assert str_out.endswith('| 100.0%\n')
+    assert 'Test Step:(3/3)|' + '█' in str_out
+
+
+@pytest.mark.parametrize('b_quiet', [False], indirect=True)
+def test_progress_total_from_len(b_quiet, capsys):
+    assert list(fn_progress([1, 2], str_desc='Len')) == [1, 2]
+    assert 'Len:(2/2)|' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('b_quiet', [False], indirect=True)
+def test_progress_redraw_is_throttled(b_quiet, capsys):
+    list(fn_progress(range(1000), str_desc='Fast', flt_interval=60))
+
+    # the first and the last bar only
+    assert capsys.readouterr().out.count('\r') == 2
+
+
+@pytest.mark.parametrize('b_quiet', [True], indirect=True)
+def test_quiet_prints_one_summary_line(b_quiet, capsys):
+    assert list(fn_progress(range(5), str_desc='Quiet Step')) == list(range(5))
+
+    str_out = capsys.readouterr().out
+    assert '█' not in str_out and '\r' not in str_out
+    assert str_out.count('\n') == 1
+    assert str_out.startswith('  Quiet Step: 5 items in ')
+
+
+def test_set_progress_quiet(monkeypatch):
+    monkeypatch.delenv(STR_QUIET_ENV, raising=False)
+    assert not fn_is_progress_quiet()
+
+    fn_set_progress_quiet()
+    assert fn_is_progress_quiet()
+
+    fn_set_progress_quiet(False)
+    assert not fn_is_progress_quiet()
+
+
+@pytest.mark.parametrize('b_quiet', [True], indirect=True)
+def test_progress_from_queue(b_quiet, capsys):
+    queue_progress = queue.Queue()
+    for int_count in [1, 2, 3]:
+        fn_report_progress(queue_progress, int_count)
+
+    assert fn_progress_from_queue(queue_progress, 6, 'Queue Step') == 6
+    assert capsys.readouterr().out.startswith('  Queue Step: 6 items in ')
+
+
+@pytest.mark.parametrize('b_quiet', [True], indirect=True)
+def test_progress_from_queue_stops_when_pool_is_done(b_quiet):
+    queue_progress = queue.Queue()
+    fn_report_progress(queue_progress)
+
+    # fewer items reported than expected - the pool is done
+    assert fn_progress_from_queue(queue_progress, 5, 'Done', FakeAsyncResult(True)) == 1
+
+
+@pytest.mark.parametrize('b_quiet', [True], indirect=True)
+def test_progress_from_queue_does_not_hang(b_quiet, capsys):
+    queue_progress = queue.Queue()
+    fn_report_progress(queue_progress)
+
+    flt_start = time.time()
+    int_count = fn_progress_from_queue(queue_progress, 5, 'Stalled', FakeAsyncResult(False), flt_timeout=0.2)
+
+    assert int_count == 1
+    assert time.time() - flt_start < 5
+    assert 'no progress reported' in capsys.readouterr().out
+
+
+def test_report_progress_without_queue():
+    fn_report_progress(None)
+    fn_report_progress(None, 5)
+
+
+@pytest.mark.parametrize('b_quiet', [True], indirect=True)
+def test_manager_queue_is_closed(b_quiet):
+    obj_manager, queue_progress = fn_progress_queue()
+    try:
+        fn_report_progress(queue_progress, 2)
+        assert fn_progress_from_queue(queue_progress, 2, 'Manager') == 2
+    finally:
+        fn_close_progress_queue(obj_manager)
+
+    assert obj_manager._process is None or not obj_manager._process.is_alive()
+    fn_close_progress_queue(None)